@@ -1,12 +1,22 @@
 #!/usr/bin/env python3
-"""Script pour ajouter des créneaux horaires pour les 15 prochains jours"""
+"""Script pour générer les créneaux horaires manquants des prochains jours.
 
+Les créneaux suivent le modèle de planning de chaque parcours (horaires
+d'ouverture, intervalle, jours de fermeture, saisons) - voir schedule.py.
+
+    python add_tee_times.py --days 180
+    python add_tee_times.py --from 2025-04-01 --days 30 --course <id> --dry-run
+"""
+
+import argparse
 import asyncio
-from datetime import datetime, timedelta
-from motor.motor_asyncio import AsyncIOMotorClient
 import os
 from dotenv import load_dotenv
-import uuid
+
+from database import create_client
+from schedule import (
+    GENERATION_BATCH_SIZE, GENERATION_CONCURRENCY, generate_tee_times, horizon
+)
 
 # Charger les variables d'environnement
 load_dotenv()
@@ -15,75 +25,44 @@ load_dotenv()
 MONGO_URL = os.environ['MONGO_URL']
 DB_NAME = os.environ['DB_NAME']
 
-# Créneaux horaires disponibles (matin et après-midi)
-TIME_SLOTS = [
-    "07:00", "07:30", "08:00", "08:30", "09:00", "09:30", 
-    "10:00", "10:30", "11:00", "11:30", "12:00",
-    "14:00", "14:30", "15:00", "15:30", "16:00", "16:30", "17:00", "17:30"
-]
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--days", type=int, default=15, help="nombre de jours à générer")
+    parser.add_argument("--from", dest="date_from", help="premier jour (YYYY-MM-DD), aujourd'hui par défaut")
+    parser.add_argument("--course", dest="course_ids", action="append", help="id du parcours (répétable), tous par défaut")
+    parser.add_argument("--dry-run", action="store_true", help="calculer sans rien écrire")
+    parser.add_argument("--batch-size", type=int, default=GENERATION_BATCH_SIZE, help="opérations par lot")
+    parser.add_argument("--concurrency", type=int, default=GENERATION_CONCURRENCY, help="lots écrits en parallèle")
+    return parser.parse_args()
+
+async def add_tee_times(args):
+    try:
+        days = horizon(args.date_from, args.days)
+    except ValueError as exc:
+        print(f"❌ {exc}")
+        return
 
-async def add_tee_times():
     # Connexion MongoDB
-    client = AsyncIOMotorClient(MONGO_URL)
+    client = create_client(MONGO_URL)
     db = client[DB_NAME]
-    
-    print("🔍 Récupération des parcours...")
-    courses = await db.courses.find().to_list(None)
-    
-    if not courses:
+
+    print(f"📅 Génération des créneaux du {days[0]} au {days[-1]}...")
+    report = await generate_tee_times(
+        db, days, args.course_ids, args.dry_run,
+        batch_size=args.batch_size, concurrency=args.concurrency
+    )
+
+    if not report["courseIds"]:
         print("❌ Aucun parcours trouvé!")
-        return
-    
-    print(f"✅ {len(courses)} parcours trouvés")
-    
-    # Date de début (aujourd'hui)
-    start_date = datetime.now().date()
-    
-    total_added = 0
-    
-    for day in range(15):
-        current_date = start_date + timedelta(days=day)
-        date_str = current_date.strftime("%Y-%m-%d")
-        
-        print(f"\n📅 Ajout des créneaux pour {date_str}...")
-        
-        for course in courses:
-            course_id = course['id']
-            course_name = course['name']
-            
-            # Vérifier si des créneaux existent déjà pour ce jour/parcours
-            existing_count = await db.tee_times.count_documents({
-                "courseId": course_id,
-                "date": date_str
-            })
-            
-            if existing_count > 0:
-                print(f"  ⏭️  {course_name}: {existing_count} créneaux déjà existants")
-                continue
-            
-            # Ajouter tous les créneaux horaires
-            tee_times = []
-            for time_slot in TIME_SLOTS:
-                tee_time = {
-                    "id": str(uuid.uuid4()),
-                    "courseId": course_id,
-                    "date": date_str,
-                    "time": time_slot,
-                    "maxSlots": 4,
-                    "bookedSlots": 0,
-                    "availableSlots": 4,
-                    "createdAt": datetime.utcnow()
-                }
-                tee_times.append(tee_time)
-            
-            # Insertion en masse
-            if tee_times:
-                await db.tee_times.insert_many(tee_times)
-                total_added += len(tee_times)
-                print(f"  ✅ {course_name}: {len(tee_times)} créneaux ajoutés")
-    
-    print(f"\n🎉 Terminé! {total_added} créneaux ajoutés au total")
+    else:
+        print(f"✅ {len(report['courseIds'])} parcours trouvés")
+        print(f"  ⏭️  {report['existing']} créneaux déjà existants")
+        if args.dry_run:
+            print(f"  🔎 {report['missing']} créneaux à ajouter (simulation, rien n'a été écrit)")
+        else:
+            print(f"\n🎉 Terminé! {report['created']} créneaux ajoutés au total en {report['elapsedMs'] / 1000:.2f}s")
+
     client.close()
 
 if __name__ == "__main__":
-    asyncio.run(add_tee_times())
+    asyncio.run(add_tee_times(parse_args()))
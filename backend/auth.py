@@ -1,20 +1,49 @@
 from datetime import datetime, timedelta
 from typing import Optional
+import asyncio
+import hashlib
+import logging
+import time
+import uuid
 from jose import JWTError, jwt
 from passlib.context import CryptContext
 from fastapi import Depends, HTTPException, status
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 import os
 
-from models import User, TokenData, UserRole
+from models import TokenData, UserRole, Principal
+from hashing import HashingPool, HashingPoolFull
+from cache import TTLCache
+from revocation import RevocationList
+
+logger = logging.getLogger(__name__)
 
 # Security configuration
 SECRET_KEY = os.getenv("SECRET_KEY", "your-secret-key-change-this-in-production")
 ALGORITHM = "HS256"
 ACCESS_TOKEN_EXPIRE_MINUTES = 30 * 24 * 60  # 30 days
+TOKEN_FORMAT_VERSION = 2
+REVOCATION_REFRESH_SECONDS = float(os.getenv("REVOCATION_REFRESH_SECONDS", "30"))
+
+# Password hashing pool
+HASHING_WORKERS = int(os.getenv("HASHING_WORKERS", "4"))
+HASHING_QUEUE_DEPTH = int(os.getenv("HASHING_QUEUE_DEPTH", "32"))
+HASHING_RETRY_AFTER_SECONDS = int(os.getenv("HASHING_RETRY_AFTER_SECONDS", "2"))
+
+# Identity cache
+IDENTITY_CACHE_SIZE = int(os.getenv("IDENTITY_CACHE_SIZE", "10000"))
+IDENTITY_CACHE_TTL_SECONDS = float(os.getenv("IDENTITY_CACHE_TTL_SECONDS", "60"))
+
+# Decoded token cache
+TOKEN_CACHE_SIZE = int(os.getenv("TOKEN_CACHE_SIZE", "50000"))
+TOKEN_CACHE_TTL_SECONDS = float(os.getenv("TOKEN_CACHE_TTL_SECONDS", "3600"))
 
 pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 security = HTTPBearer()
+hashing_pool = HashingPool(HASHING_WORKERS, HASHING_QUEUE_DEPTH)
+identity_cache = TTLCache(IDENTITY_CACHE_SIZE, IDENTITY_CACHE_TTL_SECONDS)
+revocation_list = RevocationList()
+token_cache = TTLCache(TOKEN_CACHE_SIZE, TOKEN_CACHE_TTL_SECONDS)
 
 def verify_password(plain_password: str, hashed_password: str) -> bool:
     return pwd_context.verify(plain_password, hashed_password)
@@ -22,6 +51,22 @@ def verify_password(plain_password: str, hashed_password: str) -> bool:
 def get_password_hash(password: str) -> str:
     return pwd_context.hash(password)
 
+async def _run_hashing(fn, *args):
+    try:
+        return await hashing_pool.run(fn, *args)
+    except HashingPoolFull:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Server is busy, please try again shortly",
+            headers={"Retry-After": str(HASHING_RETRY_AFTER_SECONDS)},
+        )
+
+async def verify_password_async(plain_password: str, hashed_password: str) -> bool:
+    return await _run_hashing(verify_password, plain_password, hashed_password)
+
+async def hash_password_async(password: str) -> str:
+    return await _run_hashing(get_password_hash, password)
+
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
     to_encode = data.copy()
     if expires_delta:
@@ -32,39 +77,133 @@ def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
     encoded_jwt = jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
     return encoded_jwt
 
+def create_user_access_token(user_dict: dict) -> str:
+    """Issue a token carrying enough claims to authorize without a database hit"""
+    return create_access_token(data={
+        "sub": user_dict["email"],
+        "uid": user_dict["id"],
+        "role": UserRole(user_dict["role"]).value,
+        "ver": user_dict.get("tokenVersion", 0),
+        "jti": uuid.uuid4().hex,
+        "fmt": TOKEN_FORMAT_VERSION,
+    })
+
+def decode_access_token_cached(token: str) -> Optional[TokenData]:
+    """Verify a token once, then serve its claims from memory until it expires"""
+    key = hashlib.sha256(token.encode()).digest()
+    token_data = token_cache.get(key)
+    if token_data is not None:
+        return token_data
+
+    token_data = decode_access_token(token)
+    if token_data is not None:
+        ttl = None
+        if token_data.exp is not None:
+            ttl = token_data.exp - time.time()
+        token_cache.set(key, token_data, ttl)
+    return token_data
+
 def decode_access_token(token: str) -> Optional[TokenData]:
     try:
         payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
         email: str = payload.get("sub")
         if email is None:
             return None
-        return TokenData(email=email)
-    except JWTError:
+        return TokenData(
+            email=email,
+            userId=payload.get("uid"),
+            role=payload.get("role"),
+            tokenVersion=payload.get("ver", 0),
+            jti=payload.get("jti"),
+            exp=payload.get("exp"),
+        )
+    except (JWTError, ValueError):
         return None
 
-async def get_current_user(credentials: HTTPAuthorizationCredentials = Depends(security)):
-    credentials_exception = HTTPException(
+def _credentials_exception():
+    return HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Could not validate credentials",
         headers={"WWW-Authenticate": "Bearer"},
     )
-    
+
+async def get_current_token(credentials: HTTPAuthorizationCredentials = Depends(security)) -> TokenData:
     token = credentials.credentials
-    token_data = decode_access_token(token)
+    token_data = decode_access_token_cached(token)
     
     if token_data is None or token_data.email is None:
-        raise credentials_exception
+        raise _credentials_exception()
+
+    if token_data.userId and revocation_list.is_revoked(
+        token_data.userId, token_data.tokenVersion, token_data.jti
+    ):
+        raise _credentials_exception()
     
+    return token_data
+
+async def get_current_user(token_data: TokenData = Depends(get_current_token)):
     return token_data.email
 
-async def get_current_admin(current_user_email: str = Depends(get_current_user)):
-    from server import db
-    
-    user_dict = await db.users.find_one({"email": current_user_email})
-    if not user_dict or user_dict.get("role") != UserRole.ADMIN:
+async def get_current_principal(token_data: TokenData = Depends(get_current_token)) -> Principal:
+    if token_data.userId and token_data.role:
+        return Principal(id=token_data.userId, email=token_data.email, role=token_data.role)
+
+    # Legacy tokens only carry the email, resolve the rest through the identity cache
+    principal = identity_cache.get(token_data.email)
+    if principal is None:
+        from server import users
+
+        user_dict = await users.find_principal(token_data.email)
+        if not user_dict:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="User not found"
+            )
+
+        principal = Principal(**user_dict)
+        identity_cache.set(token_data.email, principal)
+
+    if revocation_list.is_revoked(principal.id, 0, None):
+        raise _credentials_exception()
+    return principal
+
+def invalidate_identity(email: str):
+    """Drop a cached principal after its role, status or profile changed"""
+    identity_cache.pop(email)
+
+async def revoke_user_tokens(user_id: str) -> Optional[dict]:
+    """Invalidate every token issued to a user so far (role change, account disabled)"""
+    from server import users
+
+    user_dict = await users.bump_token_version(user_id)
+    if user_dict:
+        revocation_list.revoke_user(user_id, user_dict["tokenVersion"])
+        invalidate_identity(user_dict["email"])
+    return user_dict
+
+async def revoke_access_token(token_data: TokenData):
+    """Invalidate a single token until it expires (logout)"""
+    from server import token_revocations
+
+    if not token_data.jti or not token_data.exp:
+        return
+
+    await token_revocations.revoke(token_data.jti, token_data.userId, datetime.utcfromtimestamp(token_data.exp))
+    revocation_list.revoke_token(token_data.jti, token_data.exp)
+
+async def refresh_revocations_periodically(users, token_revocations):
+    while True:
+        try:
+            await revocation_list.refresh(users, token_revocations)
+        except Exception:
+            logger.exception("Failed to refresh token revocation list")
+        await asyncio.sleep(REVOCATION_REFRESH_SECONDS)
+
+async def get_current_admin(principal: Principal = Depends(get_current_principal)):
+    if principal.role != UserRole.ADMIN:
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
             detail="Not authorized to access this resource"
         )
     
-    return current_user_email
+    return principal.email
@@ -0,0 +1,153 @@
+"""Tee-time availability search backed by per-day bitmaps.
+
+Each (course, day) is loaded once into a ``DayAvailability`` holding the day's
+tee times in time order plus one bitmap per party size: bit ``i`` of
+``masks[k]`` is set when slot ``i`` still has at least ``k`` free places. A
+search for a 4-ball only has to test the ``masks[4]`` word of each day and
+walk its set bits. Bookings and cancellations patch the cached day in place;
+entries also expire after ``AVAILABILITY_CACHE_TTL_SECONDS`` to bound
+staleness when several workers share the database.
+"""
+
+import os
+from datetime import datetime, timedelta
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from cache import TTLCache
+
+AVAILABILITY_CACHE_SIZE = int(os.getenv("AVAILABILITY_CACHE_SIZE", "20000"))
+AVAILABILITY_CACHE_TTL_SECONDS = float(os.getenv("AVAILABILITY_CACHE_TTL_SECONDS", "30"))
+AVAILABILITY_SEARCH_MAX_DAYS = int(os.getenv("AVAILABILITY_SEARCH_MAX_DAYS", "31"))
+
+DayKey = Tuple[str, str]
+
+
+class DayAvailability:
+    __slots__ = ("slots", "positions", "masks")
+
+    def __init__(self, tee_times: Iterable[dict]):
+        self.slots = sorted(tee_times, key=lambda tee_time: (tee_time["time"], tee_time["id"]))
+        self.positions = {tee_time["id"]: i for i, tee_time in enumerate(self.slots)}
+        capacity = max((tee_time["maxSlots"] for tee_time in self.slots), default=0)
+        # masks[k] for k in 1..capacity, masks[0] is unused
+        self.masks = [0] * (capacity + 1)
+        for i, tee_time in enumerate(self.slots):
+            self._set_bits(i, tee_time["availableSlots"])
+
+    def _set_bits(self, position: int, available: int) -> None:
+        bit = 1 << position
+        for k in range(1, len(self.masks)):
+            if available >= k:
+                self.masks[k] |= bit
+            else:
+                self.masks[k] &= ~bit
+
+    def apply(self, tee_time_id: str, delta: int, booked_delta: Optional[int] = None) -> None:
+        """Shift a slot's availability by ``delta`` players (negative when booking).
+
+        Booked slots move the other way unless ``booked_delta`` says otherwise,
+        as for slots held for the waitlist.
+        """
+        position = self.positions.get(tee_time_id)
+        if position is None:
+            return
+        tee_time = self.slots[position]
+        tee_time["availableSlots"] += delta
+        tee_time["bookedSlots"] += -delta if booked_delta is None else booked_delta
+        self._set_bits(position, tee_time["availableSlots"])
+
+    def bookable(self, min_slots: int, time_from: Optional[str], time_to: Optional[str]) -> List[dict]:
+        if min_slots >= len(self.masks):
+            return []
+        mask = self.masks[min_slots]
+        results = []
+        while mask:
+            low_bit = mask & -mask
+            tee_time = self.slots[low_bit.bit_length() - 1]
+            mask ^= low_bit
+            if time_from and tee_time["time"] < time_from:
+                continue
+            if time_to and tee_time["time"] > time_to:
+                break
+            results.append(tee_time)
+        return results
+
+
+class AvailabilityIndex:
+    def __init__(self, maxsize: int, ttl: float):
+        self._days = TTLCache(maxsize, ttl)
+
+    async def _load(self, tee_times, course_ids: List[str], dates: List[str]) -> Dict[DayKey, DayAvailability]:
+        grouped: Dict[DayKey, list] = {(course_id, date): [] for course_id in course_ids for date in dates}
+        for tee_time in await tee_times.days(course_ids, dates):
+            key = (tee_time["courseId"], tee_time["date"])
+            if key in grouped:
+                grouped[key].append(tee_time)
+
+        days = {}
+        for key, tee_times in grouped.items():
+            days[key] = DayAvailability(tee_times)
+            self._days.set(key, days[key])
+        return days
+
+    async def search(
+        self,
+        tee_times,
+        course_ids: List[str],
+        dates: List[str],
+        min_slots: int,
+        time_from: Optional[str] = None,
+        time_to: Optional[str] = None,
+        limit: Optional[int] = None,
+    ) -> List[dict]:
+        days: Dict[DayKey, DayAvailability] = {}
+        missing_courses, missing_dates = set(), set()
+        for course_id in course_ids:
+            for date in dates:
+                day = self._days.get((course_id, date))
+                if day is None:
+                    missing_courses.add(course_id)
+                    missing_dates.add(date)
+                else:
+                    days[(course_id, date)] = day
+
+        if missing_courses:
+            loaded = await self._load(tee_times, sorted(missing_courses), sorted(missing_dates))
+            days.update(loaded)
+
+        results = []
+        for date in dates:
+            matches = []
+            for course_id in course_ids:
+                day = days.get((course_id, date))
+                if day is not None:
+                    matches.extend(day.bookable(min_slots, time_from, time_to))
+            matches.sort(key=lambda tee_time: (tee_time["time"], tee_time["courseId"]))
+            results.extend(matches)
+            if limit is not None and len(results) >= limit:
+                return results[:limit]
+        return results
+
+    def apply(
+        self, course_id: str, date: str, tee_time_id: str, delta: int, booked_delta: Optional[int] = None
+    ) -> None:
+        day = self._days.get((course_id, date))
+        if day is not None:
+            day.apply(tee_time_id, delta, booked_delta)
+
+    def invalidate(self, course_id: str, date: str) -> None:
+        self._days.pop((course_id, date))
+
+    def stats(self) -> dict:
+        return self._days.stats()
+
+
+def date_range(date_from: str, date_to: str) -> List[str]:
+    """Expand an inclusive YYYY-MM-DD range, raising ValueError on bad input"""
+    start = datetime.strptime(date_from, "%Y-%m-%d").date()
+    end = datetime.strptime(date_to, "%Y-%m-%d").date()
+    if end < start:
+        raise ValueError("dateTo is before dateFrom")
+    if (end - start).days >= AVAILABILITY_SEARCH_MAX_DAYS:
+        raise ValueError(f"Date range is limited to {AVAILABILITY_SEARCH_MAX_DAYS} days")
+    return [(start + timedelta(days=offset)).strftime("%Y-%m-%d") for offset in range((end - start).days + 1)]
@@ -0,0 +1,142 @@
+#!/usr/bin/env python3
+"""Stress test for POST /api/bookings: many players racing for one tee time.
+
+Runs the FastAPI app in-process against a real MongoDB (MONGO_URL) using a
+throwaway database, fires concurrent booking requests at a single tee time
+and checks that the slot counters never go past capacity.
+
+    cd backend && python -m benchmarks.booking_contention --requests 500 --concurrency 200
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import random
+import statistics
+import time
+import uuid
+from datetime import datetime
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=500, help="number of booking attempts")
+    parser.add_argument("--concurrency", type=int, default=200, help="requests in flight at once")
+    parser.add_argument("--max-slots", type=int, default=40, help="capacity of the contended tee time")
+    parser.add_argument("--players", type=int, default=4, help="max players per booking (picked at random)")
+    parser.add_argument("--db", default="teebook_bench", help="database to use, dropped before the run")
+    return parser.parse_args()
+
+
+def percentile(values, pct):
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))]
+
+
+async def run(args):
+    os.environ["DB_NAME"] = args.db
+
+    import httpx
+    import server
+    from auth import create_user_access_token
+
+    db = server.db
+    await server.client.drop_database(args.db)
+
+    users = [
+        {
+            "id": str(uuid.uuid4()),
+            "email": f"player{i}@bench.teebook",
+            "firstName": "Bench",
+            "lastName": f"Player {i}",
+            "role": "user",
+            "hashedPassword": "",
+            "tokenVersion": 0,
+            "createdAt": datetime.utcnow(),
+            "isActive": True,
+        }
+        for i in range(args.requests)
+    ]
+    await db.users.insert_many(users)
+    tokens = [create_user_access_token(user) for user in users]
+
+    tee_time_id = str(uuid.uuid4())
+    await db.tee_times.insert_one({
+        "id": tee_time_id,
+        "courseId": "bench-course",
+        "date": datetime.utcnow().strftime("%Y-%m-%d"),
+        "time": "08:00",
+        "maxSlots": args.max_slots,
+        "bookedSlots": 0,
+        "availableSlots": args.max_slots,
+        "createdAt": datetime.utcnow(),
+    })
+
+    semaphore = asyncio.Semaphore(args.concurrency)
+    latencies = []
+    statuses = {}
+
+    transport = httpx.ASGITransport(app=server.app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as http:
+        async def book(token):
+            payload = {"teeTimeId": tee_time_id, "playersCount": random.randint(1, args.players)}
+            async with semaphore:
+                started = time.perf_counter()
+                response = await http.post(
+                    "/api/bookings", json=payload, headers={"Authorization": f"Bearer {token}"}
+                )
+                latencies.append(time.perf_counter() - started)
+            statuses[response.status_code] = statuses.get(response.status_code, 0) + 1
+
+        started = time.perf_counter()
+        await asyncio.gather(*(book(token) for token in tokens))
+        elapsed = time.perf_counter() - started
+
+    tee_time = await db.tee_times.find_one({"id": tee_time_id})
+    booked = 0
+    async for booking in db.bookings.find({"teeTimeId": tee_time_id, "status": "confirmed"}):
+        booked += booking["playersCount"]
+
+    consistent = (
+        tee_time["bookedSlots"] == booked
+        and tee_time["bookedSlots"] <= tee_time["maxSlots"]
+        and tee_time["availableSlots"] >= 0
+        and tee_time["bookedSlots"] + tee_time["availableSlots"] == tee_time["maxSlots"]
+    )
+
+    report = {
+        "requests": args.requests,
+        "concurrency": args.concurrency,
+        "maxSlots": args.max_slots,
+        "statuses": statuses,
+        "bookedSlots": tee_time["bookedSlots"],
+        "availableSlots": tee_time["availableSlots"],
+        "playersInConfirmedBookings": booked,
+        "overbooked": not consistent,
+        "elapsedSeconds": round(elapsed, 3),
+        "requestsPerSecond": round(args.requests / elapsed, 1),
+        "latencyMs": {
+            "p50": round(percentile(latencies, 50) * 1000, 2),
+            "p95": round(percentile(latencies, 95) * 1000, 2),
+            "p99": round(percentile(latencies, 99) * 1000, 2),
+            "mean": round(statistics.mean(latencies) * 1000, 2),
+        },
+    }
+
+    await server.client.drop_database(args.db)
+    server.client.close()
+    return report
+
+
+def main():
+    args = parse_args()
+    report = asyncio.run(run(args))
+    print(json.dumps(report, indent=2))
+    raise SystemExit(1 if report["overbooked"] else 0)
+
+
+if __name__ == "__main__":
+    main()
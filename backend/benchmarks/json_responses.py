@@ -0,0 +1,116 @@
+#!/usr/bin/env python3
+"""Per-request CPU of a 1000-row GET /api/tee-times, standard vs FAST_JSON.
+
+Runs the FastAPI app in-process against a real MongoDB (MONGO_URL) using a
+throwaway database, seeds one course day with ``--rows`` tee times and
+requests the whole day repeatedly, first through the standard response path
+(model per row, response_model validation, stdlib encoder) and then through
+the orjson path (projected rows with field defaults filled in, no model
+built). CPU time is process time, so it also counts the driver's BSON
+decoding, which is the same in both modes.
+
+    cd backend && python -m benchmarks.json_responses --rows 1000 --iterations 200
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import time
+import uuid
+from datetime import datetime
+
+from benchmarks.booking_contention import percentile
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=1000, help="tee times in the listed day")
+    parser.add_argument("--iterations", type=int, default=200, help="measured requests per mode")
+    parser.add_argument("--warmup", type=int, default=20, help="unmeasured requests per mode")
+    parser.add_argument("--db", default="teebook_bench", help="database to use, dropped before the run")
+    return parser.parse_args()
+
+
+def summarize(cpu, wall, body_bytes):
+    return {
+        "cpuMsPerRequest": {
+            "mean": round(statistics.mean(cpu) * 1000, 3),
+            "p50": round(percentile(cpu, 50) * 1000, 3),
+            "p95": round(percentile(cpu, 95) * 1000, 3),
+        },
+        "latencyMs": {
+            "p50": round(percentile(wall, 50) * 1000, 3),
+            "p95": round(percentile(wall, 95) * 1000, 3),
+        },
+        "bodyBytes": body_bytes,
+    }
+
+
+async def run(args):
+    os.environ["DB_NAME"] = args.db
+
+    import httpx
+    import responses
+    import server
+
+    db = server.db
+    await server.client.drop_database(args.db)
+
+    course_id = str(uuid.uuid4())
+    date = datetime.utcnow().strftime("%Y-%m-%d")
+    await db.tee_times.insert_many([
+        {
+            "id": str(uuid.uuid4()),
+            "courseId": course_id,
+            "date": date,
+            "time": f"{i // 60:02d}:{i % 60:02d}",
+            "maxSlots": 4,
+            "bookedSlots": i % 5,
+            "availableSlots": 4 - i % 5,
+            "createdAt": datetime.utcnow(),
+        }
+        for i in range(args.rows)
+    ])
+
+    params = {"courseId": course_id, "date": date, "limit": args.rows}
+    report = {"rows": args.rows, "iterations": args.iterations}
+    bodies = {}
+
+    transport = httpx.ASGITransport(app=server.app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as http:
+        for mode, fast in (("standard", False), ("fastJson", True)):
+            responses.FAST_JSON = fast
+            for _ in range(args.warmup):
+                await http.get("/api/tee-times", params=params)
+
+            cpu, wall = [], []
+            for _ in range(args.iterations):
+                cpu_started, wall_started = time.process_time(), time.perf_counter()
+                response = await http.get("/api/tee-times", params=params)
+                cpu.append(time.process_time() - cpu_started)
+                wall.append(time.perf_counter() - wall_started)
+                response.raise_for_status()
+            bodies[mode] = response.json()
+            report[mode] = summarize(cpu, wall, len(response.content))
+
+    report["sameBody"] = bodies["standard"] == bodies["fastJson"]
+    report["cpuSpeedup"] = round(
+        report["standard"]["cpuMsPerRequest"]["mean"] / report["fastJson"]["cpuMsPerRequest"]["mean"], 2
+    )
+
+    await server.client.drop_database(args.db)
+    server.client.close()
+    return report
+
+
+def main():
+    args = parse_args()
+    report = asyncio.run(run(args))
+    print(json.dumps(report, indent=2))
+    raise SystemExit(0 if report["sameBody"] else 1)
+
+
+if __name__ == "__main__":
+    main()
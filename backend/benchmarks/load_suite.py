@@ -0,0 +1,341 @@
+#!/usr/bin/env python3
+"""Reproducible load-test suite for the API, reported as JSON.
+
+Boots the FastAPI app in-process against a local MongoDB (MONGO_URL) using a
+throwaway database - or, with ``--in-memory``, against mongomock-motor, which
+needs no server but is slower and does not implement every query the API
+runs (results are then only good for comparing runs with each other). Seeds
+realistic volumes with a fixed random seed, then drives concurrent
+scenarios and reports p50/p95/p99 latency and requests per second:
+
+    login       users signing in at once (bcrypt on the hashing pool)
+    browse      availability: day listings and multi-day searches
+    booking     players racing for tee times over the next days
+    export      admins streaming the whole bookings collection
+
+    cd backend && python -m benchmarks.load_suite --output bench.json
+    cd backend && python -m benchmarks.load_suite --bookings 100000 --baseline bench.json
+
+With ``--baseline`` every scenario also gets its change against a previous
+report, and the exit status is 1 if any p95 regressed by more than
+``--max-regression``.
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import platform
+import random
+import statistics
+import sys
+import time
+import uuid
+from datetime import datetime, timedelta
+
+from benchmarks.booking_contention import percentile
+
+SCENARIOS = ("login", "browse", "booking", "export")
+BENCH_PASSWORD = "bench-password"
+SEED_BATCH_SIZE = 10000
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--courses", type=int, default=20, help="courses to seed")
+    parser.add_argument("--days", type=int, default=90, help="days of tee times to seed per course")
+    parser.add_argument("--users", type=int, default=10000, help="users to seed")
+    parser.add_argument("--bookings", type=int, default=1000000, help="historical bookings to seed")
+    parser.add_argument("--requests", type=int, default=2000, help="requests per scenario (export: --exports)")
+    parser.add_argument("--exports", type=int, default=4, help="full exports in the export scenario")
+    parser.add_argument("--concurrency", type=int, default=100, help="requests in flight at once")
+    parser.add_argument("--scenarios", default=",".join(SCENARIOS), help="comma separated subset to run")
+    parser.add_argument("--seed", type=int, default=42, help="random seed, for reproducible data and traffic")
+    parser.add_argument("--in-memory", action="store_true", help="use mongomock-motor instead of MONGO_URL")
+    parser.add_argument("--db", default="teebook_bench", help="database to use, dropped before the run")
+    parser.add_argument("--output", help="also write the report to this file")
+    parser.add_argument("--baseline", help="previous report to compare against")
+    parser.add_argument("--max-regression", type=float, default=0.2, help="tolerated p95 increase vs baseline")
+    return parser.parse_args()
+
+
+def use_in_memory_mongo():
+    """Make the app's Motor client an in-memory fake; must run before ``server`` is imported"""
+    try:
+        from mongomock_motor import AsyncMongoMockClient
+    except ImportError:
+        raise SystemExit("--in-memory needs mongomock-motor: pip install mongomock-motor")
+
+    import motor.motor_asyncio
+    motor.motor_asyncio.AsyncIOMotorClient = AsyncMongoMockClient
+    os.environ.setdefault("MONGO_URL", "mongodb://in-memory")
+
+
+def latency_summary(latencies):
+    return {
+        "p50": round(percentile(latencies, 50) * 1000, 2),
+        "p95": round(percentile(latencies, 95) * 1000, 2),
+        "p99": round(percentile(latencies, 99) * 1000, 2),
+        "mean": round(statistics.mean(latencies) * 1000, 2) if latencies else 0.0,
+    }
+
+
+async def drive(calls, concurrency):
+    """Run ``calls`` (coroutine factories returning a status code) with bounded concurrency"""
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies = []
+    statuses = {}
+
+    async def one(call):
+        async with semaphore:
+            started = time.perf_counter()
+            status_code = await call()
+            latencies.append(time.perf_counter() - started)
+        statuses[status_code] = statuses.get(status_code, 0) + 1
+
+    started = time.perf_counter()
+    await asyncio.gather(*(one(call) for call in calls))
+    elapsed = time.perf_counter() - started
+    return {
+        "requests": len(calls),
+        "concurrency": concurrency,
+        "statuses": statuses,
+        "elapsedSeconds": round(elapsed, 3),
+        "requestsPerSecond": round(len(calls) / elapsed, 1) if elapsed else 0.0,
+        "latencyMs": latency_summary(latencies),
+    }
+
+
+def seeded_uuid(rng) -> str:
+    return str(uuid.UUID(int=rng.getrandbits(128), version=4))
+
+
+async def seed(db, args, rng):
+    from auth import get_password_hash
+    from schedule import generate_tee_times, horizon
+
+    timings = {}
+    started = time.perf_counter()
+    now = datetime.utcnow()
+
+    # One real bcrypt hash shared by everyone: verifying costs what it costs in production
+    hashed_password = get_password_hash(BENCH_PASSWORD)
+    users = [
+        {
+            "id": seeded_uuid(rng),
+            "email": f"player{i}@bench.teebook",
+            "firstName": "Bench",
+            "lastName": f"Player {i}",
+            "role": "admin" if i == 0 else "user",
+            "hashedPassword": hashed_password,
+            "tokenVersion": 0,
+            "createdAt": now - timedelta(minutes=args.users - i),
+            "isActive": True,
+        }
+        for i in range(args.users)
+    ]
+    for offset in range(0, len(users), SEED_BATCH_SIZE):
+        await db.users.insert_many(users[offset:offset + SEED_BATCH_SIZE])
+
+    await db.courses.insert_many([
+        {
+            "id": seeded_uuid(rng),
+            "name": f"Bench Course {i:02d}",
+            "description": None,
+            "holesCount": 18,
+            "createdAt": now,
+        }
+        for i in range(args.courses)
+    ])
+    timings["users"] = round(time.perf_counter() - started, 3)
+
+    started = time.perf_counter()
+    report = await generate_tee_times(db, horizon(now.strftime("%Y-%m-%d"), args.days))
+    timings["teeTimes"] = round(time.perf_counter() - started, 3)
+
+    started = time.perf_counter()
+    tee_time_ids = sorted(await db.tee_times.distinct("id"))
+    statuses = ("confirmed", "confirmed", "confirmed", "cancelled")
+    for offset in range(0, args.bookings, SEED_BATCH_SIZE):
+        await db.bookings.insert_many([
+            {
+                "id": seeded_uuid(rng),
+                "userId": users[rng.randrange(len(users))]["id"],
+                "teeTimeId": rng.choice(tee_time_ids),
+                "playersCount": rng.randint(1, 4),
+                "guestPlayers": [],
+                "status": rng.choice(statuses),
+                "createdAt": now - timedelta(seconds=rng.randrange(365 * 86400)),
+            }
+            for _ in range(min(SEED_BATCH_SIZE, args.bookings - offset))
+        ])
+    timings["bookings"] = round(time.perf_counter() - started, 3)
+
+    volumes = {
+        "users": len(users),
+        "courses": args.courses,
+        "teeTimes": report["created"],
+        "bookings": args.bookings,
+    }
+    return users, timings, volumes
+
+
+async def run(args):
+    if args.in_memory:
+        use_in_memory_mongo()
+    os.environ["DB_NAME"] = args.db
+
+    import httpx
+    import server
+    from auth import create_user_access_token
+    from indexes import ensure_indexes
+
+    rng = random.Random(args.seed)
+    db = server.db
+    await server.client.drop_database(args.db)
+
+    started = time.perf_counter()
+    users, seed_timings, volumes = await seed(db, args, rng)
+    index_started = time.perf_counter()
+    await ensure_indexes(db)
+    seed_timings["indexes"] = round(time.perf_counter() - index_started, 3)
+    seed_timings["total"] = round(time.perf_counter() - started, 3)
+
+    admin, players = users[0], users[1:]
+    tokens = {user["id"]: create_user_access_token(user) for user in users[:args.requests + 1]}
+    course_ids = await server.courses.ids()
+    today = datetime.utcnow().date()
+    dates = [(today + timedelta(days=offset)).strftime("%Y-%m-%d") for offset in range(args.days)]
+
+    scenarios = {}
+    selected = [name.strip() for name in args.scenarios.split(",") if name.strip()]
+    transport = httpx.ASGITransport(app=server.app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=None) as http:
+        def auth(user):
+            return {"Authorization": f"Bearer {tokens[user['id']]}"}
+
+        def login(user):
+            async def call():
+                response = await http.post(
+                    "/api/auth/login", json={"email": user["email"], "password": BENCH_PASSWORD}
+                )
+                return response.status_code
+            return call
+
+        def browse(course_id, day):
+            # Mostly one course's day, sometimes a week-long search across courses
+            if rng.random() < 0.7:
+                path, params = "/api/tee-times", {"courseId": course_id, "date": dates[day]}
+            else:
+                path, params = "/api/tee-times/search", {
+                    "dateFrom": dates[day],
+                    "dateTo": dates[min(day + 6, len(dates) - 1)],
+                    "minSlots": rng.randint(1, 4),
+                }
+
+            async def call():
+                response = await http.get(path, params=params)
+                return response.status_code
+            return call
+
+        def book(user, tee_time_id):
+            players = rng.randint(1, 4)
+
+            async def call():
+                response = await http.post(
+                    "/api/bookings",
+                    json={"teeTimeId": tee_time_id, "playersCount": players},
+                    headers={**auth(user), "Idempotency-Key": str(uuid.uuid4())}
+                )
+                return response.status_code
+            return call
+
+        def export():
+            async def call():
+                async with http.stream(
+                    "GET", "/api/admin/export/bookings", params={"format": "ndjson"}, headers=auth(admin)
+                ) as response:
+                    async for _ in response.aiter_bytes():
+                        pass
+                return response.status_code
+            return call
+
+        for name in selected:
+            if name == "login":
+                calls = [login(rng.choice(players)) for _ in range(args.requests)]
+            elif name == "browse":
+                calls = [
+                    browse(rng.choice(course_ids), rng.randrange(min(14, len(dates))))
+                    for _ in range(args.requests)
+                ]
+            elif name == "booking":
+                # Traffic concentrates on the coming week, like a Saturday-morning release
+                week = sorted(await db.tee_times.distinct("id", {"date": {"$in": dates[:7]}}))
+                calls = [book(rng.choice(players[:args.requests]), rng.choice(week)) for _ in range(args.requests)]
+            elif name == "export":
+                calls = [export() for _ in range(args.exports)]
+            else:
+                raise SystemExit(f"Unknown scenario {name!r}, pick from {', '.join(SCENARIOS)}")
+            scenarios[name] = await drive(calls, args.concurrency)
+
+    await server.client.drop_database(args.db)
+    server.client.close()
+
+    return {
+        "generatedAt": datetime.utcnow().isoformat(),
+        "environment": {
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "mongo": "in-memory" if args.in_memory else "MONGO_URL",
+            "fastJson": os.getenv("FAST_JSON", "false"),
+        },
+        "parameters": {
+            key: getattr(args, key)
+            for key in ("courses", "days", "users", "bookings", "requests", "exports", "concurrency", "seed")
+        },
+        "volumes": volumes,
+        "seedSeconds": seed_timings,
+        "scenarios": scenarios,
+    }
+
+
+def compare(report, baseline, max_regression):
+    """Annotate scenarios with their change against ``baseline``, returning the regressed ones"""
+    regressed = []
+    for name, result in report["scenarios"].items():
+        previous = baseline.get("scenarios", {}).get(name)
+        if not previous:
+            continue
+        p95, previous_p95 = result["latencyMs"]["p95"], previous["latencyMs"]["p95"]
+        rps, previous_rps = result["requestsPerSecond"], previous["requestsPerSecond"]
+        result["baseline"] = {
+            "p95Change": round(p95 / previous_p95 - 1, 4) if previous_p95 else None,
+            "requestsPerSecondChange": round(rps / previous_rps - 1, 4) if previous_rps else None,
+        }
+        if previous_p95 and p95 / previous_p95 - 1 > max_regression:
+            regressed.append(name)
+    report["regressed"] = regressed
+    return regressed
+
+
+def main():
+    args = parse_args()
+    report = asyncio.run(run(args))
+
+    regressed = []
+    if args.baseline:
+        with open(args.baseline) as baseline:
+            regressed = compare(report, json.load(baseline), args.max_regression)
+
+    output = json.dumps(report, indent=2)
+    print(output)
+    if args.output:
+        with open(args.output, "w") as destination:
+            destination.write(output + "\n")
+    if regressed:
+        print(f"p95 regressed beyond {args.max_regression:.0%}: {', '.join(regressed)}", file=sys.stderr)
+    raise SystemExit(1 if regressed else 0)
+
+
+if __name__ == "__main__":
+    main()
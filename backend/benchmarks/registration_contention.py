@@ -0,0 +1,177 @@
+#!/usr/bin/env python3
+"""Stress test for competition registration: a popular competition opening.
+
+Runs the FastAPI app in-process against a real MongoDB (MONGO_URL) using a
+throwaway database. Every registrant signs up at once (some twice), then a
+share of the entrants unregisters concurrently. Checks that the field never
+goes past capacity, that nobody holds two entries, that the counter matches
+the registrations and that freed places went to the waitlist in arrival
+order.
+
+    cd backend && python -m benchmarks.registration_contention --registrants 1000 --max-participants 120
+
+``--in-memory`` runs against mongomock-motor instead, as in the load suite.
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import random
+import statistics
+import time
+import uuid
+from datetime import datetime
+
+from benchmarks.booking_contention import percentile
+from benchmarks.load_suite import use_in_memory_mongo
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--registrants", type=int, default=1000, help="number of players signing up")
+    parser.add_argument("--concurrency", type=int, default=1000, help="requests in flight at once")
+    parser.add_argument("--max-participants", type=int, default=120, help="capacity of the competition")
+    parser.add_argument("--duplicates", type=float, default=0.1, help="share of players sending a second signup")
+    parser.add_argument("--unregister", type=int, default=30, help="registered players dropping out afterwards")
+    parser.add_argument("--db", default="teebook_bench", help="database to use, dropped before the run")
+    parser.add_argument("--in-memory", action="store_true", help="use mongomock-motor instead of MONGO_URL")
+    return parser.parse_args()
+
+
+async def run(args):
+    if args.in_memory:
+        use_in_memory_mongo()
+    os.environ["DB_NAME"] = args.db
+
+    import httpx
+    import server
+    from auth import create_user_access_token
+    from indexes import ensure_indexes
+
+    db = server.db
+    await server.client.drop_database(args.db)
+    # The unique (competitionId, userId) index is what rejects double entries
+    await ensure_indexes(db)
+
+    users = [
+        {
+            "id": str(uuid.uuid4()),
+            "email": f"player{i}@bench.teebook",
+            "firstName": "Bench",
+            "lastName": f"Player {i}",
+            "role": "user",
+            "hashedPassword": "",
+            "tokenVersion": 0,
+            "createdAt": datetime.utcnow(),
+            "isActive": True,
+        }
+        for i in range(args.registrants)
+    ]
+    await db.users.insert_many(users)
+    tokens = {user["id"]: create_user_access_token(user) for user in users}
+
+    competition_id = str(uuid.uuid4())
+    await db.competitions.insert_one({
+        "id": competition_id,
+        "name": "Bench Open",
+        "date": datetime.utcnow().strftime("%Y-%m-%d"),
+        "maxParticipants": args.max_participants,
+        "entryFee": 0.0,
+        "participantsCount": 0,
+        "status": "upcoming",
+        "createdAt": datetime.utcnow(),
+    })
+
+    semaphore = asyncio.Semaphore(args.concurrency)
+    latencies = []
+    statuses = {}
+
+    def count(key):
+        statuses[key] = statuses.get(key, 0) + 1
+
+    transport = httpx.ASGITransport(app=server.app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as http:
+        async def call(method, user_id):
+            async with semaphore:
+                started = time.perf_counter()
+                response = await http.request(
+                    method,
+                    f"/api/competitions/{competition_id}/{'register' if method == 'POST' else 'unregister'}",
+                    headers={"Authorization": f"Bearer {tokens[user_id]}"}
+                )
+                latencies.append(time.perf_counter() - started)
+            if response.status_code == 200 and method == "POST":
+                count(response.json()["status"])
+            else:
+                count(f"{method} {response.status_code}")
+
+        signups = [user["id"] for user in users]
+        signups += random.sample(signups, int(len(signups) * args.duplicates))
+        random.shuffle(signups)
+
+        started = time.perf_counter()
+        await asyncio.gather(*(call("POST", user_id) for user_id in signups))
+        elapsed = time.perf_counter() - started
+
+        waitlist_before = [
+            registration["userId"]
+            async for registration in db.registrations.find(
+                {"competitionId": competition_id, "status": "waitlisted"}
+            ).sort([("createdAt", 1), ("id", 1)])
+        ]
+        registered_before = await db.registrations.distinct(
+            "userId", {"competitionId": competition_id, "status": "registered"}
+        )
+        leaving = random.sample(registered_before, min(args.unregister, len(registered_before)))
+        await asyncio.gather(*(call("DELETE", user_id) for user_id in leaving))
+
+    competition = await db.competitions.find_one({"id": competition_id})
+    entries = await db.registrations.find({"competitionId": competition_id}).to_list(None)
+    registered = {entry["userId"] for entry in entries if entry["status"] == "registered"}
+    promoted = [user_id for user_id in waitlist_before if user_id in registered]
+
+    checks = {
+        "withinCapacity": competition["participantsCount"] <= competition["maxParticipants"],
+        "counterMatchesEntries": competition["participantsCount"] == len(registered),
+        "fieldFilled": len(registered) == min(competition["maxParticipants"], len(users) - len(leaving)),
+        "noDoubleEntries": len(entries) == len({entry["userId"] for entry in entries}),
+        "waitlistPromotedInOrder": promoted == waitlist_before[:len(promoted)],
+    }
+
+    report = {
+        "registrants": args.registrants,
+        "signupRequests": len(signups),
+        "concurrency": args.concurrency,
+        "maxParticipants": args.max_participants,
+        "unregistered": len(leaving),
+        "statuses": statuses,
+        "participantsCount": competition["participantsCount"],
+        "waitlisted": len(entries) - len(registered),
+        "promotedFromWaitlist": len(promoted),
+        "checks": checks,
+        "consistent": all(checks.values()),
+        "signupSeconds": round(elapsed, 3),
+        "signupsPerSecond": round(len(signups) / elapsed, 1),
+        "latencyMs": {
+            "p50": round(percentile(latencies, 50) * 1000, 2),
+            "p95": round(percentile(latencies, 95) * 1000, 2),
+            "p99": round(percentile(latencies, 99) * 1000, 2),
+            "mean": round(statistics.mean(latencies) * 1000, 2),
+        },
+    }
+
+    await server.client.drop_database(args.db)
+    server.client.close()
+    return report
+
+
+def main():
+    args = parse_args()
+    report = asyncio.run(run(args))
+    print(json.dumps(report, indent=2))
+    raise SystemExit(0 if report["consistent"] else 1)
+
+
+if __name__ == "__main__":
+    main()
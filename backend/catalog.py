@@ -0,0 +1,115 @@
+"""Versioned in-process cache for the catalog list endpoints.
+
+Courses and competitions are fetched on every app launch but change a few
+times a season. Each page is serialized once and kept as bytes together with
+a strong ETag derived from those bytes; requests carrying a matching
+``If-None-Match`` get an empty 304. Writes bump the catalog's version, which
+drops its cached pages on this worker. Other workers only notice when their
+copy expires, so ``CATALOG_CACHE_TTL_SECONDS`` bounds how stale a page can be
+- content-derived ETags keep 304s correct across workers in the meantime.
+
+Pages are normally loaded from a secondary, which may lag behind. For
+``CATALOG_PRIMARY_READ_SECONDS`` after a write on this worker they are
+loaded from the primary instead, so the reload right after a write can not
+cache the list from before it under the new version.
+"""
+
+import asyncio
+import hashlib
+import os
+import time
+from typing import Awaitable, Callable, Dict, List, Optional, Tuple, Type
+
+from fastapi import Request, Response, status
+from pydantic import BaseModel
+
+from cache import TTLCache
+from pagination import NEXT_CURSOR_HEADER
+from responses import render_model_list
+
+CATALOG_CACHE_SIZE = int(os.getenv("CATALOG_CACHE_SIZE", "256"))
+CATALOG_CACHE_TTL_SECONDS = float(os.getenv("CATALOG_CACHE_TTL_SECONDS", "30"))
+CATALOG_PRIMARY_READ_SECONDS = float(os.getenv("CATALOG_PRIMARY_READ_SECONDS", "10"))
+
+# Called with primary=True when the page must be read from the primary
+PageLoader = Callable[[bool], Awaitable[Tuple[List[dict], Optional[str]]]]
+
+
+class CatalogPage:
+    __slots__ = ("body", "etag", "next_cursor")
+
+    def __init__(self, body: bytes, next_cursor: Optional[str]):
+        self.body = body
+        self.etag = f'"{hashlib.sha256(body).hexdigest()[:32]}"'
+        self.next_cursor = next_cursor
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    # Weak comparison, as If-None-Match calls for
+    return etag in (tag.strip().removeprefix("W/") for tag in if_none_match.split(","))
+
+
+class CatalogCache:
+    def __init__(
+        self,
+        maxsize: int = CATALOG_CACHE_SIZE,
+        ttl: float = CATALOG_CACHE_TTL_SECONDS,
+        primary_read_seconds: float = CATALOG_PRIMARY_READ_SECONDS,
+    ):
+        self._pages = TTLCache(maxsize, ttl)
+        self._versions: Dict[str, int] = {}
+        self._written_at: Dict[str, float] = {}
+        self._loading: Dict[tuple, asyncio.Future] = {}
+        self.primary_read_seconds = primary_read_seconds
+        self.primary_loads = 0
+
+    def invalidate(self, catalog: str) -> None:
+        self._versions[catalog] = self._versions.get(catalog, 0) + 1
+        self._written_at[catalog] = time.monotonic()
+
+    def _recently_written(self, catalog: str) -> bool:
+        written_at = self._written_at.get(catalog)
+        return written_at is not None and time.monotonic() - written_at < self.primary_read_seconds
+
+    async def _load(self, key: tuple, model: Type[BaseModel], loader: PageLoader) -> CatalogPage:
+        primary = self._recently_written(key[0])
+        if primary:
+            self.primary_loads += 1
+        documents, next_cursor = await loader(primary)
+        page = CatalogPage(render_model_list(model, documents), next_cursor)
+        # A write that landed while loading makes this page stale already
+        if key[1] == self._versions.get(key[0], 0):
+            self._pages.set(key, page)
+        return page
+
+    async def get(
+        self, catalog: str, params: tuple, model: Type[BaseModel], loader: PageLoader
+    ) -> CatalogPage:
+        key = (catalog, self._versions.get(catalog, 0), params)
+        page = self._pages.get(key)
+        if page is not None:
+            return page
+
+        # Concurrent misses on one page share a single load
+        loading = self._loading.get(key)
+        if loading is None:
+            loading = asyncio.ensure_future(self._load(key, model, loader))
+            self._loading[key] = loading
+            loading.add_done_callback(lambda _: self._loading.pop(key, None))
+        return await asyncio.shield(loading)
+
+    def stats(self) -> dict:
+        return {**self._pages.stats(), "versions": dict(self._versions), "primaryLoads": self.primary_loads}
+
+
+def catalog_response(request: Request, page: CatalogPage) -> Response:
+    headers = {"ETag": page.etag, "Cache-Control": "no-cache"}
+    if page.next_cursor:
+        headers[NEXT_CURSOR_HEADER] = page.next_cursor
+    if etag_matches(request.headers.get("if-none-match"), page.etag):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+    return Response(page.body, media_type="application/json", headers=headers)
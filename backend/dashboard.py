@@ -0,0 +1,149 @@
+"""Admin dashboard figures, computed concurrently and served from a snapshot.
+
+All counts and aggregations are issued together with ``asyncio.gather`` and
+the result is kept in memory; a background task recomputes it every
+``DASHBOARD_REFRESH_SECONDS`` so page loads never wait on the database.
+"""
+
+import asyncio
+import logging
+import os
+import time
+from datetime import datetime, timedelta
+from typing import Optional
+
+from models import BookingStatus, CompetitionStatus, SubscriptionStatus
+
+logger = logging.getLogger(__name__)
+
+DASHBOARD_REFRESH_SECONDS = float(os.getenv("DASHBOARD_REFRESH_SECONDS", "60"))
+DASHBOARD_OCCUPANCY_DAYS = int(os.getenv("DASHBOARD_OCCUPANCY_DAYS", "14"))
+
+
+async def _occupancy(db, date_from: str, date_to: str) -> list:
+    pipeline = [
+        {"$match": {"date": {"$gte": date_from, "$lte": date_to}}},
+        {"$group": {
+            "_id": {"courseId": "$courseId", "date": "$date"},
+            "teeTimes": {"$sum": 1},
+            "maxSlots": {"$sum": "$maxSlots"},
+            "bookedSlots": {"$sum": "$bookedSlots"},
+        }},
+        {"$sort": {"_id.courseId": 1, "_id.date": 1}},
+    ]
+    rows = []
+    async for row in db.tee_times.aggregate(pipeline):
+        rows.append({
+            "courseId": row["_id"]["courseId"],
+            "date": row["_id"]["date"],
+            "teeTimes": row["teeTimes"],
+            "maxSlots": row["maxSlots"],
+            "bookedSlots": row["bookedSlots"],
+            "occupancy": round(row["bookedSlots"] / row["maxSlots"], 4) if row["maxSlots"] else 0.0,
+        })
+    return rows
+
+
+async def _competition_revenue(db) -> dict:
+    pipeline = [
+        {"$group": {
+            "_id": "$status",
+            "revenue": {"$sum": {"$multiply": [
+                {"$ifNull": ["$entryFee", 0]},
+                {"$ifNull": ["$participantsCount", 0]},
+            ]}},
+        }},
+    ]
+    by_status = {}
+    async for row in db.competitions.aggregate(pipeline):
+        by_status[row["_id"]] = row["revenue"]
+    return by_status
+
+
+async def _course_names(db) -> dict:
+    names = {}
+    async for course in db.courses.find({}, {"_id": 0, "id": 1, "name": 1}):
+        names[course["id"]] = course["name"]
+    return names
+
+
+async def compute_dashboard(db) -> dict:
+    today = datetime.utcnow().date()
+    date_from = today.strftime("%Y-%m-%d")
+    date_to = (today + timedelta(days=DASHBOARD_OCCUPANCY_DAYS - 1)).strftime("%Y-%m-%d")
+
+    (
+        total_users,
+        total_bookings,
+        active_subscriptions,
+        upcoming_competitions,
+        occupancy,
+        revenue_by_status,
+        course_names,
+    ) = await asyncio.gather(
+        db.users.count_documents({}),
+        db.bookings.count_documents({"status": BookingStatus.CONFIRMED}),
+        db.subscriptions.count_documents({"status": SubscriptionStatus.ACTIVE}),
+        db.competitions.count_documents({"status": CompetitionStatus.UPCOMING}),
+        _occupancy(db, date_from, date_to),
+        _competition_revenue(db),
+        _course_names(db),
+    )
+
+    for row in occupancy:
+        row["courseName"] = course_names.get(row["courseId"])
+
+    return {
+        "totalUsers": total_users,
+        "totalBookings": total_bookings,
+        "activeSubscriptions": active_subscriptions,
+        "upcomingCompetitions": upcoming_competitions,
+        "occupancy": occupancy,
+        "revenue": {
+            "competitionEntryFees": sum(
+                amount for status, amount in revenue_by_status.items()
+                if status != CompetitionStatus.CANCELLED
+            ),
+            "competitionEntryFeesByStatus": revenue_by_status,
+        },
+        "generatedAt": datetime.utcnow().isoformat(),
+    }
+
+
+class DashboardSnapshot:
+    def __init__(self, refresh_seconds: float):
+        self.refresh_seconds = refresh_seconds
+        self._snapshot: Optional[dict] = None
+        self._computed_at = 0.0
+        self._lock = asyncio.Lock()
+        self.last_duration: Optional[float] = None
+
+    async def refresh(self, db) -> dict:
+        async with self._lock:
+            started = time.perf_counter()
+            self._snapshot = await compute_dashboard(db)
+            self._computed_at = time.monotonic()
+            self.last_duration = time.perf_counter() - started
+            return self._snapshot
+
+    async def get(self, db) -> dict:
+        # Only compute inline when the background refresher has not produced
+        # anything recent (first request after startup, refresher stalled)
+        if self._snapshot is None or time.monotonic() - self._computed_at > 2 * self.refresh_seconds:
+            return await self.refresh(db)
+        return self._snapshot
+
+    async def run(self, db):
+        while True:
+            try:
+                await self.refresh(db)
+            except Exception:
+                logger.exception("Failed to refresh dashboard snapshot")
+            await asyncio.sleep(self.refresh_seconds)
+
+    def stats(self) -> dict:
+        return {
+            "refreshSeconds": self.refresh_seconds,
+            "ageSeconds": round(time.monotonic() - self._computed_at, 3) if self._snapshot else None,
+            "lastDurationMs": round(self.last_duration * 1000, 3) if self.last_duration is not None else None,
+        }
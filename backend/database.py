@@ -0,0 +1,223 @@
+"""MongoDB client settings shared by the API and the maintenance scripts.
+
+Every Motor client is created by ``create_client`` so pool sizing, timeouts
+and wire compression come from one place. Each ``MONGO_*`` variable that is
+set overrides the same option in ``MONGO_URL``; unset ones leave the URL and
+the driver defaults alone. Size the pool per worker: the maximum pool size
+times the number of workers must stay below what the server accepts, and
+with ``MONGO_WAIT_QUEUE_TIMEOUT_MS`` a request that cannot get a connection
+fails instead of queueing forever.
+
+Reads go to the primary unless a handler uses ``replica_database``, whose
+read preference is ``MONGO_REPLICA_READ_PREFERENCE`` (secondary-preferred by
+default). Only reads that tolerate replication lag use it: the course and
+competition catalog (except right after a local write, see catalog.py), the
+dashboard, exports and the admin lists. Bookings, registrations and
+everything read back after a write stay on the primary.
+
+``PoolMetrics`` listens to the connection pools and reports open, in-use
+and waiting connections per server, time spent waiting for a connection and
+failed check-outs, in ``/admin/metrics`` and ``/metrics``.
+"""
+
+import os
+import threading
+import time
+from typing import Iterable, List, Optional
+
+from motor.motor_asyncio import AsyncIOMotorClient
+from pymongo import monitoring
+from pymongo.common import MAX_POOL_SIZE
+from pymongo.read_preferences import Nearest, Primary, PrimaryPreferred, Secondary, SecondaryPreferred
+
+from instrumentation import Counter, Gauge
+
+
+def _optional_int(name: str) -> Optional[int]:
+    value = os.getenv(name, "")
+    return int(value) if value else None
+
+
+# Client options, each only passed to the driver when set
+MONGO_MAX_POOL_SIZE = _optional_int("MONGO_MAX_POOL_SIZE")
+MONGO_MIN_POOL_SIZE = _optional_int("MONGO_MIN_POOL_SIZE")
+MONGO_MAX_IDLE_TIME_MS = _optional_int("MONGO_MAX_IDLE_TIME_MS")
+MONGO_WAIT_QUEUE_TIMEOUT_MS = _optional_int("MONGO_WAIT_QUEUE_TIMEOUT_MS")
+MONGO_SERVER_SELECTION_TIMEOUT_MS = _optional_int("MONGO_SERVER_SELECTION_TIMEOUT_MS")
+MONGO_CONNECT_TIMEOUT_MS = _optional_int("MONGO_CONNECT_TIMEOUT_MS")
+# Per network round trip, not per cursor; 0 means no limit
+MONGO_SOCKET_TIMEOUT_MS = _optional_int("MONGO_SOCKET_TIMEOUT_MS")
+# Comma separated, in order of preference, e.g. "zstd,snappy"; needs the zstandard / python-snappy packages
+MONGO_COMPRESSORS = os.getenv("MONGO_COMPRESSORS") or None
+MONGO_APP_NAME = os.getenv("MONGO_APP_NAME") or None
+
+MONGO_REPLICA_READ_PREFERENCE = os.getenv("MONGO_REPLICA_READ_PREFERENCE", "secondaryPreferred")
+# -1 means no limit, otherwise at least 90 seconds
+MONGO_REPLICA_MAX_STALENESS_SECONDS = int(os.getenv("MONGO_REPLICA_MAX_STALENESS_SECONDS", "-1"))
+
+READ_PREFERENCES = {
+    "primary": Primary,
+    "primaryPreferred": PrimaryPreferred,
+    "secondary": Secondary,
+    "secondaryPreferred": SecondaryPreferred,
+    "nearest": Nearest,
+}
+
+
+def read_preference(name: str, max_staleness: int = MONGO_REPLICA_MAX_STALENESS_SECONDS):
+    try:
+        mode = READ_PREFERENCES[name]
+    except KeyError:
+        raise ValueError(f"Unknown read preference {name!r}, pick from {', '.join(READ_PREFERENCES)}")
+    # The primary has no staleness to bound
+    return mode() if mode is Primary else mode(max_staleness=max_staleness)
+
+
+def client_options() -> dict:
+    """The options configured through the environment, leaving the rest to ``MONGO_URL``"""
+    options = {
+        "maxPoolSize": MONGO_MAX_POOL_SIZE,
+        "minPoolSize": MONGO_MIN_POOL_SIZE,
+        "maxIdleTimeMS": MONGO_MAX_IDLE_TIME_MS,
+        "waitQueueTimeoutMS": MONGO_WAIT_QUEUE_TIMEOUT_MS,
+        "serverSelectionTimeoutMS": MONGO_SERVER_SELECTION_TIMEOUT_MS,
+        "connectTimeoutMS": MONGO_CONNECT_TIMEOUT_MS,
+        "socketTimeoutMS": MONGO_SOCKET_TIMEOUT_MS,
+        "compressors": MONGO_COMPRESSORS,
+        "appname": MONGO_APP_NAME,
+    }
+    return {name: value for name, value in options.items() if value is not None}
+
+
+def create_client(url: str, event_listeners: Iterable = ()) -> AsyncIOMotorClient:
+    return AsyncIOMotorClient(url, event_listeners=list(event_listeners), **client_options())
+
+
+def replica_database(client, name: str, preference: str = MONGO_REPLICA_READ_PREFERENCE):
+    """``name`` on ``client`` for reads that may be served by a lagging secondary"""
+    return client.get_database(name, read_preference=read_preference(preference))
+
+
+def _address(event) -> str:
+    host, port = event.address
+    return f"{host}:{port}"
+
+
+class PoolMetrics(monitoring.ConnectionPoolListener):
+    """Connection pool usage per server.
+
+    pymongo calls the listener from whichever thread checks connections out,
+    hence the lock; a check-out's start and end happen on the same thread,
+    which is how its wait time is measured.
+    """
+
+    def __init__(self):
+        # Learnt from the pools themselves, wherever the setting came from
+        self.max_pool_size = MAX_POOL_SIZE
+        self._lock = threading.Lock()
+        self._waiting_since = threading.local()
+        labels = ("address",)
+        self.open = Gauge("teebook_mongo_pool_connections", "Open pooled connections", labels)
+        self.in_use = Gauge("teebook_mongo_pool_connections_in_use", "Connections checked out", labels)
+        self.waiting = Gauge("teebook_mongo_pool_waiting", "Operations waiting for a connection", labels)
+        self.check_outs = Counter("teebook_mongo_pool_check_outs_total", "Connections checked out", labels)
+        self.wait_seconds = Counter(
+            "teebook_mongo_pool_wait_seconds_total", "Time spent waiting to check a connection out", labels
+        )
+        self.failures = Counter(
+            "teebook_mongo_pool_check_out_failures_total", "Failed check-outs by reason", labels + ("reason",)
+        )
+        self.cleared = Counter("teebook_mongo_pool_cleared_total", "Pools cleared after errors", labels)
+        self.max_wait = 0.0
+
+    def pool_created(self, event) -> None:
+        with self._lock:
+            # Only non-default options are reported
+            self.max_pool_size = event.options.get("maxPoolSize", MAX_POOL_SIZE)
+            self.open.set((_address(event),), 0)
+
+    def pool_ready(self, event) -> None:
+        pass
+
+    def pool_cleared(self, event) -> None:
+        with self._lock:
+            self.cleared.inc((_address(event),))
+
+    def pool_closed(self, event) -> None:
+        pass
+
+    def connection_created(self, event) -> None:
+        with self._lock:
+            self.open.inc((_address(event),))
+
+    def connection_ready(self, event) -> None:
+        pass
+
+    def connection_closed(self, event) -> None:
+        with self._lock:
+            self.open.inc((_address(event),), -1)
+
+    def connection_check_out_started(self, event) -> None:
+        self._waiting_since.started = time.perf_counter()
+        with self._lock:
+            self.waiting.inc((_address(event),))
+
+    def _waited(self, address: str) -> None:
+        started = getattr(self._waiting_since, "started", None)
+        self._waiting_since.started = None
+        self.waiting.inc((address,), -1)
+        if started is not None:
+            waited = time.perf_counter() - started
+            self.wait_seconds.inc((address,), waited)
+            self.max_wait = max(self.max_wait, waited)
+
+    def connection_check_out_failed(self, event) -> None:
+        address = _address(event)
+        with self._lock:
+            self._waited(address)
+            self.failures.inc((address, str(event.reason)))
+
+    def connection_checked_out(self, event) -> None:
+        address = _address(event)
+        with self._lock:
+            self._waited(address)
+            self.check_outs.inc((address,))
+            self.in_use.inc((address,))
+
+    def connection_checked_in(self, event) -> None:
+        with self._lock:
+            self.in_use.inc((_address(event),), -1)
+
+    def render(self) -> List[str]:
+        with self._lock:
+            lines = [
+                "# HELP teebook_mongo_pool_max_size Configured maximum connections per server",
+                "# TYPE teebook_mongo_pool_max_size gauge",
+                f"teebook_mongo_pool_max_size {self.max_pool_size}",
+            ]
+            for metric in (
+                self.open, self.in_use, self.waiting, self.check_outs, self.wait_seconds, self.failures, self.cleared
+            ):
+                lines.extend(metric.render())
+            return lines
+
+    def stats(self) -> dict:
+        with self._lock:
+            servers = {
+                address: {
+                    "open": int(open_connections),
+                    "inUse": int(self.in_use.get((address,))),
+                    "waiting": int(self.waiting.get((address,))),
+                    "utilization": round(self.in_use.get((address,)) / self.max_pool_size, 3)
+                    if self.max_pool_size else None,
+                }
+                for (address,), open_connections in self.open.by_labels().items()
+            }
+            return {
+                "maxPoolSize": self.max_pool_size,
+                "servers": servers,
+                "checkOuts": int(self.check_outs.total()),
+                "checkOutFailures": int(self.failures.total()),
+                "waitSeconds": round(self.wait_seconds.total(), 3),
+                "maxWaitMs": round(self.max_wait * 1000, 3),
+            }
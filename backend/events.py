@@ -0,0 +1,167 @@
+"""Publish/subscribe fan-out for live tee-time availability.
+
+Handlers publish one event per availability change to a topic (one topic per
+course and day); every open SSE / WebSocket stream subscribed to that topic
+receives it. Events meant for one player, such as a waitlist promotion, go
+to that player's own topic. ``LocalBroker`` fans out inside a single
+process. With several workers, ``MongoBroker`` also appends each event to a
+capped collection and tails it, so streams connected to one worker see
+changes made on another.
+"""
+
+import asyncio
+import json
+import logging
+import os
+import uuid
+from collections import defaultdict
+from typing import Dict, Optional, Set
+
+from pymongo import CursorType
+from pymongo.errors import CollectionInvalid, PyMongoError
+
+logger = logging.getLogger(__name__)
+
+AVAILABILITY_BROKER = os.getenv("AVAILABILITY_BROKER", "local")
+SUBSCRIBER_QUEUE_SIZE = int(os.getenv("AVAILABILITY_SUBSCRIBER_QUEUE_SIZE", "100"))
+EVENTS_COLLECTION = "availability_events"
+EVENTS_COLLECTION_BYTES = int(os.getenv("AVAILABILITY_EVENTS_COLLECTION_BYTES", str(16 * 1024 * 1024)))
+STREAM_HEARTBEAT_SECONDS = float(os.getenv("AVAILABILITY_STREAM_HEARTBEAT_SECONDS", "15"))
+
+
+def availability_topic(course_id: str, date: str) -> str:
+    return f"{course_id}:{date}"
+
+
+def user_topic(user_id: str) -> str:
+    return f"user:{user_id}"
+
+
+class LocalBroker:
+    def __init__(self, queue_size: int = SUBSCRIBER_QUEUE_SIZE):
+        self.queue_size = queue_size
+        self._subscribers: Dict[str, Set[asyncio.Queue]] = defaultdict(set)
+        self.published = 0
+        self.dropped = 0
+
+    async def start(self) -> None:
+        pass
+
+    async def stop(self) -> None:
+        pass
+
+    def _deliver(self, topic: str, event: dict) -> None:
+        for queue in self._subscribers.get(topic, ()):
+            if queue.full():
+                # Slow consumer: keep the newest state rather than blocking publishers
+                queue.get_nowait()
+                self.dropped += 1
+            queue.put_nowait(event)
+
+    async def publish(self, topic: str, event: dict) -> None:
+        self.published += 1
+        self._deliver(topic, event)
+
+    def subscribe(self, topic: str) -> "Subscription":
+        """Register immediately so nothing published after this call is missed"""
+        return Subscription(self, topic)
+
+    def _unsubscribe(self, topic: str, queue: asyncio.Queue) -> None:
+        queues = self._subscribers.get(topic)
+        if queues is None:
+            return
+        queues.discard(queue)
+        if not queues:
+            del self._subscribers[topic]
+
+    def stats(self) -> dict:
+        return {
+            "broker": type(self).__name__,
+            "topics": len(self._subscribers),
+            "subscribers": sum(len(queues) for queues in self._subscribers.values()),
+            "published": self.published,
+            "dropped": self.dropped,
+        }
+
+
+class Subscription:
+    def __init__(self, broker: LocalBroker, topic: str):
+        self.broker = broker
+        self.topic = topic
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=broker.queue_size)
+        broker._subscribers[topic].add(self.queue)
+
+    async def get(self, timeout: Optional[float] = None) -> Optional[dict]:
+        """Next event, or None when nothing arrived within ``timeout`` seconds"""
+        try:
+            return await asyncio.wait_for(self.queue.get(), timeout)
+        except asyncio.TimeoutError:
+            return None
+
+    def close(self) -> None:
+        self.broker._unsubscribe(self.topic, self.queue)
+
+    def __enter__(self) -> "Subscription":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+
+class MongoBroker(LocalBroker):
+    def __init__(self, db, queue_size: int = SUBSCRIBER_QUEUE_SIZE):
+        super().__init__(queue_size)
+        self.db = db
+        self.origin = uuid.uuid4().hex
+        self._task = None
+
+    async def start(self) -> None:
+        try:
+            await self.db.create_collection(EVENTS_COLLECTION, capped=True, size=EVENTS_COLLECTION_BYTES)
+        except CollectionInvalid:
+            pass
+        self._task = asyncio.create_task(self._tail())
+
+    async def stop(self) -> None:
+        if self._task:
+            self._task.cancel()
+
+    async def publish(self, topic: str, event: dict) -> None:
+        self.published += 1
+        self._deliver(topic, event)
+        try:
+            await self.db[EVENTS_COLLECTION].insert_one({"origin": self.origin, "topic": topic, "event": event})
+        except PyMongoError:
+            logger.exception("Failed to relay availability event")
+
+    async def _tail(self) -> None:
+        collection = self.db[EVENTS_COLLECTION]
+        # A tailable cursor on an empty capped collection dies immediately
+        await collection.insert_one({"origin": self.origin, "topic": None})
+        last = await collection.find_one(sort=[("$natural", -1)])
+        last_id = last["_id"]
+
+        while True:
+            try:
+                cursor = collection.find({"_id": {"$gt": last_id}}, cursor_type=CursorType.TAILABLE_AWAIT)
+                while cursor.alive:
+                    async for document in cursor:
+                        last_id = document["_id"]
+                        if document["origin"] != self.origin and document.get("topic"):
+                            self._deliver(document["topic"], document["event"])
+                    await asyncio.sleep(0.1)
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                logger.exception("Availability event tail failed, retrying")
+            await asyncio.sleep(1)
+
+
+def format_sse(event: str, data) -> bytes:
+    return f"event: {event}\ndata: {json.dumps(data, default=str)}\n\n".encode()
+
+
+def create_broker(db) -> LocalBroker:
+    if AVAILABILITY_BROKER == "mongo":
+        return MongoBroker(db)
+    return LocalBroker()
@@ -0,0 +1,123 @@
+"""Streaming NDJSON / CSV exports of the admin collections.
+
+Documents are pulled from the Motor cursor one batch at a time and written
+out as soon as the batch is full, so memory stays constant however large the
+collection is.
+"""
+
+import csv
+import io
+import json
+import os
+from datetime import datetime
+from enum import Enum
+from typing import AsyncIterator, Optional
+
+from pymongo import ASCENDING
+
+EXPORT_BATCH_SIZE = int(os.getenv("EXPORT_BATCH_SIZE", "1000"))
+MAX_EXPORT_BATCH_SIZE = 10000
+
+
+class ExportFormat(str, Enum):
+    NDJSON = "ndjson"
+    CSV = "csv"
+
+
+MEDIA_TYPES = {
+    ExportFormat.NDJSON: "application/x-ndjson",
+    ExportFormat.CSV: "text/csv",
+}
+
+# Fields written for each dataset, in CSV column order. Exports are ordered by
+# createdAt so date-range filters and ordering share the createdAt_id indexes.
+EXPORT_DATASETS = {
+    "bookings": [
+        "id", "userId", "teeTimeId", "playersCount", "guestPlayers", "status", "createdAt",
+    ],
+    "users": [
+        "id", "email", "firstName", "lastName", "handicapIndex", "role", "isActive", "createdAt",
+    ],
+    "subscriptions": [
+        "id", "userId", "type", "status", "startDate", "endDate", "createdAt",
+    ],
+}
+
+
+def _json_default(value):
+    if isinstance(value, datetime):
+        return value.isoformat()
+    return str(value)
+
+
+def _csv_value(value):
+    if value is None:
+        return ""
+    if isinstance(value, datetime):
+        return value.isoformat()
+    if isinstance(value, (list, dict)):
+        return json.dumps(value, default=_json_default)
+    if isinstance(value, Enum):
+        return value.value
+    return value
+
+
+def build_export_cursor(
+    db,
+    dataset: str,
+    batch_size: int,
+    date_from: Optional[datetime] = None,
+    date_to: Optional[datetime] = None,
+):
+    query = {}
+    if date_from or date_to:
+        query["createdAt"] = {}
+        if date_from:
+            query["createdAt"]["$gte"] = date_from
+        if date_to:
+            query["createdAt"]["$lt"] = date_to
+
+    projection = {"_id": 0, **{field: 1 for field in EXPORT_DATASETS[dataset]}}
+    return (
+        db[dataset]
+        .find(query, projection)
+        .sort([("createdAt", ASCENDING), ("id", ASCENDING)])
+        .batch_size(batch_size)
+    )
+
+
+async def _batches(cursor, batch_size: int) -> AsyncIterator[list]:
+    batch = []
+    async for document in cursor:
+        batch.append(document)
+        if len(batch) >= batch_size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+async def stream_ndjson(cursor, batch_size: int) -> AsyncIterator[bytes]:
+    async for batch in _batches(cursor, batch_size):
+        lines = [json.dumps(document, default=_json_default) for document in batch]
+        yield ("\n".join(lines) + "\n").encode()
+
+
+async def stream_csv(cursor, fields: list, batch_size: int) -> AsyncIterator[bytes]:
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(fields)
+    yield buffer.getvalue().encode()
+
+    async for batch in _batches(cursor, batch_size):
+        buffer.seek(0)
+        buffer.truncate()
+        for document in batch:
+            writer.writerow([_csv_value(document.get(field)) for field in fields])
+        yield buffer.getvalue().encode()
+
+
+def stream_export(cursor, dataset: str, export_format: ExportFormat, batch_size: int) -> AsyncIterator[bytes]:
+    if export_format == ExportFormat.CSV:
+        return stream_csv(cursor, EXPORT_DATASETS[dataset], batch_size)
+    return stream_ndjson(cursor, batch_size)
@@ -0,0 +1,83 @@
+"""Bounded worker pool for password hashing.
+
+bcrypt is deliberately slow (~250 ms per round), so running it inline in an
+async handler stalls the whole event loop. The pool runs hashing on dedicated
+threads (bcrypt releases the GIL) and rejects work once the queue is full so
+login bursts fail fast instead of piling up.
+"""
+
+import asyncio
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable
+
+
+class HashingPoolFull(Exception):
+    """Raised when the hashing queue has no room for another job."""
+
+
+class HashingPool:
+    def __init__(self, workers: int, queue_depth: int):
+        self.workers = workers
+        self.queue_depth = queue_depth
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="hashing")
+        self._lock = threading.Lock()
+        self._pending = 0
+        self._completed = 0
+        self._rejected = 0
+        self._queue_wait_total = 0.0
+        self._queue_wait_max = 0.0
+        self._hash_time_total = 0.0
+        self._hash_time_max = 0.0
+
+    async def run(self, fn: Callable[..., Any], *args: Any) -> Any:
+        with self._lock:
+            if self._pending >= self.workers + self.queue_depth:
+                self._rejected += 1
+                raise HashingPoolFull()
+            self._pending += 1
+
+        submitted_at = time.perf_counter()
+
+        def job():
+            started_at = time.perf_counter()
+            try:
+                return fn(*args)
+            finally:
+                self._record(started_at - submitted_at, time.perf_counter() - started_at)
+
+        future = self._executor.submit(job)
+        future.add_done_callback(self._release)
+        return await asyncio.wrap_future(future)
+
+    def _release(self, _future) -> None:
+        # Runs once the worker is really done, even if the awaiting request was cancelled
+        with self._lock:
+            self._pending -= 1
+
+    def _record(self, queue_wait: float, hash_time: float) -> None:
+        with self._lock:
+            self._completed += 1
+            self._queue_wait_total += queue_wait
+            self._queue_wait_max = max(self._queue_wait_max, queue_wait)
+            self._hash_time_total += hash_time
+            self._hash_time_max = max(self._hash_time_max, hash_time)
+
+    def stats(self) -> dict:
+        with self._lock:
+            completed = self._completed or 1
+            return {
+                "workers": self.workers,
+                "queueDepth": self.queue_depth,
+                "inFlight": self._pending,
+                "completed": self._completed,
+                "rejected": self._rejected,
+                "queueWaitAvgMs": round(self._queue_wait_total / completed * 1000, 3),
+                "queueWaitMaxMs": round(self._queue_wait_max * 1000, 3),
+                "hashTimeAvgMs": round(self._hash_time_total / completed * 1000, 3),
+                "hashTimeMaxMs": round(self._hash_time_max * 1000, 3),
+            }
+
+    def shutdown(self) -> None:
+        self._executor.shutdown(wait=False, cancel_futures=True)
@@ -0,0 +1,137 @@
+"""Idempotency keys for the write endpoints clients retry.
+
+A client sends an ``Idempotency-Key`` header with a write; the first request
+carrying a key records its outcome in ``idempotency_keys`` (expired by a TTL
+index after ``IDEMPOTENCY_TTL_SECONDS``) and every replay of the same key gets
+that stored response back instead of booking or registering again. Keys are
+scoped per user and endpoint, and reusing one with a different payload is
+rejected. Completed outcomes never change, so they are also kept in a small
+in-memory cache that answers most replays without a database hit.
+"""
+
+import hashlib
+import json
+import os
+from datetime import datetime, timedelta
+from typing import Any, Awaitable, Callable, Optional
+
+from fastapi import Header, HTTPException, status
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+from pymongo.errors import DuplicateKeyError
+
+from cache import TTLCache
+
+IDEMPOTENCY_TTL_SECONDS = float(os.getenv("IDEMPOTENCY_TTL_SECONDS", str(24 * 3600)))
+# An unfinished record (worker died, request cancelled) blocks its key this long
+IDEMPOTENCY_PENDING_TTL_SECONDS = float(os.getenv("IDEMPOTENCY_PENDING_TTL_SECONDS", "120"))
+IDEMPOTENCY_CACHE_SIZE = int(os.getenv("IDEMPOTENCY_CACHE_SIZE", "10000"))
+IDEMPOTENCY_CACHE_TTL_SECONDS = float(os.getenv("IDEMPOTENCY_CACHE_TTL_SECONDS", "600"))
+IDEMPOTENCY_KEY_MAX_LENGTH = 255
+
+REPLAYED_HEADER = "Idempotent-Replayed"
+
+IdempotencyKey = Header(None, alias="Idempotency-Key", max_length=IDEMPOTENCY_KEY_MAX_LENGTH)
+
+
+def fingerprint(payload: Any) -> str:
+    return hashlib.sha256(
+        json.dumps(jsonable_encoder(payload), sort_keys=True, separators=(",", ":")).encode()
+    ).hexdigest()
+
+
+class IdempotencyStore:
+    def __init__(
+        self, db, cache_size: int = IDEMPOTENCY_CACHE_SIZE, cache_ttl: float = IDEMPOTENCY_CACHE_TTL_SECONDS
+    ):
+        self.collection = db.idempotency_keys
+        self._completed = TTLCache(cache_size, cache_ttl)
+        self.replayed = 0
+
+    @staticmethod
+    def _check_fingerprint(record: dict, request_fingerprint: str) -> None:
+        if record["fingerprint"] != request_fingerprint:
+            raise HTTPException(
+                status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+                detail="Idempotency-Key was already used with a different request"
+            )
+
+    def _replay(self, record: dict, request_fingerprint: str) -> JSONResponse:
+        self._check_fingerprint(record, request_fingerprint)
+        self.replayed += 1
+        return JSONResponse(
+            status_code=record["statusCode"], content=record["body"], headers={REPLAYED_HEADER: "true"}
+        )
+
+    async def _complete(self, record_id: str, request_fingerprint: str, status_code: int, body: Any) -> None:
+        record = {"fingerprint": request_fingerprint, "statusCode": status_code, "body": body}
+        await self.collection.update_one({"_id": record_id}, {"$set": {
+            **record,
+            "completed": True,
+            "expiresAt": datetime.utcnow() + timedelta(seconds=IDEMPOTENCY_TTL_SECONDS),
+        }})
+        self._completed.set(record_id, record)
+
+    async def run(
+        self,
+        key: Optional[str],
+        user_id: str,
+        scope: str,
+        payload: Any,
+        operation: Callable[[], Awaitable[Any]],
+        status_code: int = status.HTTP_200_OK,
+    ) -> Any:
+        """Run ``operation`` once per key, replaying its stored response afterwards.
+
+        Without a key the operation simply runs. Client errors are stored and
+        replayed like successes; any other failure forgets the key so the
+        request can be retried. Concurrent duplicates get a 409 while the
+        first one is still running.
+        """
+        if not key:
+            return await operation()
+
+        record_id = f"{user_id}:{scope}:{key}"
+        request_fingerprint = fingerprint(payload)
+        cached = self._completed.get(record_id)
+        if cached is not None:
+            return self._replay(cached, request_fingerprint)
+
+        now = datetime.utcnow()
+        try:
+            await self.collection.insert_one({
+                "_id": record_id,
+                "fingerprint": request_fingerprint,
+                "completed": False,
+                "createdAt": now,
+                "expiresAt": now + timedelta(seconds=IDEMPOTENCY_PENDING_TTL_SECONDS),
+            })
+        except DuplicateKeyError:
+            record = await self.collection.find_one({"_id": record_id})
+            if record:
+                self._check_fingerprint(record, request_fingerprint)
+            if not record or not record["completed"]:
+                raise HTTPException(
+                    status_code=status.HTTP_409_CONFLICT,
+                    detail="A request with this Idempotency-Key is still in progress"
+                )
+            self._completed.set(record_id, record)
+            return self._replay(record, request_fingerprint)
+
+        try:
+            result = await operation()
+        except HTTPException as exc:
+            if exc.status_code < 500:
+                await self._complete(record_id, request_fingerprint, exc.status_code, {"detail": exc.detail})
+            else:
+                await self.collection.delete_one({"_id": record_id})
+            raise
+        except Exception:
+            await self.collection.delete_one({"_id": record_id})
+            raise
+
+        await self._complete(record_id, request_fingerprint, status_code, jsonable_encoder(result))
+        return result
+
+    def stats(self) -> dict:
+        return {"replayed": self.replayed, "cache": self._completed.stats()}
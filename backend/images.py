@@ -0,0 +1,139 @@
+"""Content-addressed image store for profile pictures.
+
+Images live in a GridFS bucket instead of inside user documents, keyed by the
+SHA-256 of the uploaded bytes: identical uploads are stored once and the
+digest doubles as a strong ETag, so image URLs can be cached forever. Each
+upload is stored as the original plus a server-side resized thumbnail.
+"""
+
+import asyncio
+import base64
+import binascii
+import hashlib
+import io
+import logging
+import os
+from typing import Optional, Tuple
+
+from gridfs.errors import NoFile
+from motor.motor_asyncio import AsyncIOMotorGridFSBucket
+from PIL import Image, ImageOps, UnidentifiedImageError
+
+logger = logging.getLogger(__name__)
+
+IMAGE_BUCKET = "images"
+PROFILE_IMAGE_MAX_BYTES = int(os.getenv("PROFILE_IMAGE_MAX_BYTES", str(5 * 1024 * 1024)))
+THUMBNAIL_SIZE = int(os.getenv("THUMBNAIL_SIZE", "256"))
+ACCEPTED_FORMATS = {"JPEG", "PNG", "WEBP", "GIF"}
+
+ORIGINAL = "original"
+THUMBNAIL = "thumbnail"
+VARIANTS = (ORIGINAL, THUMBNAIL)
+
+
+class InvalidImage(ValueError):
+    pass
+
+
+class ImageTooLarge(InvalidImage):
+    pass
+
+
+def decode_base64_image(data: str) -> bytes:
+    """Accept both raw base64 and ``data:image/...;base64,`` URIs"""
+    if data.startswith("data:"):
+        data = data.split(",", 1)[-1]
+    try:
+        return base64.b64decode(data, validate=True)
+    except (binascii.Error, ValueError):
+        raise InvalidImage("Image is not valid base64")
+
+
+def _prepare(data: bytes) -> Tuple[str, bytes]:
+    """Validate the upload and render its thumbnail (CPU bound, run in a thread)"""
+    try:
+        with Image.open(io.BytesIO(data)) as image:
+            if image.format not in ACCEPTED_FORMATS:
+                raise InvalidImage(f"Unsupported image format {image.format}")
+            content_type = Image.MIME[image.format]
+            thumbnail = ImageOps.exif_transpose(image).convert("RGB")
+    except (UnidentifiedImageError, OSError):
+        raise InvalidImage("File is not a readable image")
+
+    thumbnail.thumbnail((THUMBNAIL_SIZE, THUMBNAIL_SIZE))
+    output = io.BytesIO()
+    thumbnail.save(output, format="JPEG", quality=85, optimize=True)
+    return content_type, output.getvalue()
+
+
+class ImageStore:
+    def __init__(self, db):
+        self.db = db
+        self._bucket = None
+
+    @property
+    def bucket(self) -> AsyncIOMotorGridFSBucket:
+        # Created on first use so importing the app works with any Motor-compatible client
+        if self._bucket is None:
+            self._bucket = AsyncIOMotorGridFSBucket(self.db, bucket_name=IMAGE_BUCKET)
+        return self._bucket
+
+    @staticmethod
+    def _filename(digest: str, variant: str) -> str:
+        return f"{digest}/{variant}"
+
+    async def exists(self, digest: str) -> bool:
+        return bool(await self.db[f"{IMAGE_BUCKET}.files"].count_documents(
+            {"filename": self._filename(digest, ORIGINAL)}, limit=1
+        ))
+
+    async def save(self, data: bytes) -> str:
+        """Store an image and its thumbnail, returning the content digest"""
+        if len(data) > PROFILE_IMAGE_MAX_BYTES:
+            raise ImageTooLarge(f"Image is larger than {PROFILE_IMAGE_MAX_BYTES} bytes")
+
+        digest = hashlib.sha256(data).hexdigest()
+        if await self.exists(digest):
+            return digest
+
+        content_type, thumbnail = await asyncio.to_thread(_prepare, data)
+        # Thumbnail first: the original is what marks the image as present
+        await self.bucket.upload_from_stream(
+            self._filename(digest, THUMBNAIL), thumbnail,
+            metadata={"hash": digest, "variant": THUMBNAIL, "contentType": "image/jpeg"},
+        )
+        await self.bucket.upload_from_stream(
+            self._filename(digest, ORIGINAL), data,
+            metadata={"hash": digest, "variant": ORIGINAL, "contentType": content_type},
+        )
+        return digest
+
+    async def load(self, digest: str, variant: str) -> Optional[Tuple[bytes, str]]:
+        try:
+            stream = await self.bucket.open_download_stream_by_name(self._filename(digest, variant))
+        except NoFile:
+            return None
+        data = await stream.read()
+        return data, stream.metadata.get("contentType", "application/octet-stream")
+
+
+def image_url(digest: Optional[str]) -> Optional[str]:
+    return f"/api/images/{digest}" if digest else None
+
+
+async def migrate_inline_profile_images(db, store: ImageStore) -> int:
+    """Move base64 images still embedded in user documents into the store"""
+    migrated = 0
+    async for user in db.users.find(
+        {"profileImage": {"$exists": True}}, {"_id": 0, "id": 1, "profileImage": 1}
+    ):
+        update = {"$unset": {"profileImage": ""}}
+        if user["profileImage"]:
+            try:
+                digest = await store.save(decode_base64_image(user["profileImage"]))
+                update["$set"] = {"profileImageId": digest}
+            except InvalidImage as exc:
+                logger.warning("Dropping unreadable profile image of user %s: %s", user["id"], exc)
+        await db.users.update_one({"id": user["id"]}, update)
+        migrated += 1
+    return migrated
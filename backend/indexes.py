@@ -0,0 +1,178 @@
+"""Declarative MongoDB index manifest, applied at startup.
+
+Every query the API runs should be backed by one of these indexes. Applying
+the manifest is idempotent: missing indexes are built, matching ones are left
+alone and indexes whose definition differs from the manifest are reported as
+drift rather than dropped, so an operator decides how to migrate them.
+"""
+
+import logging
+from typing import Dict, List
+
+from pymongo import ASCENDING, DESCENDING
+from pymongo.errors import PyMongoError
+
+logger = logging.getLogger(__name__)
+
+# Options compared when looking for drift between the manifest and the server
+COMPARED_OPTIONS = ("unique", "sparse", "expireAfterSeconds", "partialFilterExpression")
+
+INDEX_MANIFEST: Dict[str, List[dict]] = {
+    "users": [
+        {"name": "email_unique", "keys": [("email", ASCENDING)], "unique": True},
+        {"name": "id_unique", "keys": [("id", ASCENDING)], "unique": True},
+        {"name": "createdAt_id", "keys": [("createdAt", ASCENDING), ("id", ASCENDING)]},
+        {
+            # Only users whose tokens were ever revoked, for the revocation refresh
+            "name": "tokenVersionChangedAt_revoked",
+            "keys": [("tokenVersionChangedAt", ASCENDING)],
+            "partialFilterExpression": {"tokenVersion": {"$gt": 0}},
+        },
+    ],
+    "courses": [
+        {"name": "id_unique", "keys": [("id", ASCENDING)], "unique": True},
+        {"name": "name_id", "keys": [("name", ASCENDING), ("id", ASCENDING)]},
+    ],
+    "tee_times": [
+        {"name": "id_unique", "keys": [("id", ASCENDING)], "unique": True},
+        {
+            "name": "courseId_date_time_unique",
+            "keys": [("courseId", ASCENDING), ("date", ASCENDING), ("time", ASCENDING)],
+            "unique": True,
+        },
+        {"name": "date_courseId", "keys": [("date", ASCENDING), ("courseId", ASCENDING)]},
+        {"name": "date_time_id", "keys": [("date", ASCENDING), ("time", ASCENDING), ("id", ASCENDING)]},
+        {
+            "name": "heldSlots_partial",
+            "keys": [("heldSlots", ASCENDING)],
+            "partialFilterExpression": {"heldSlots": {"$gt": 0}},
+        },
+    ],
+    "tee_time_waitlist": [
+        {"name": "id_unique", "keys": [("id", ASCENDING)], "unique": True},
+        {"name": "teeTimeId_createdAt", "keys": [("teeTimeId", ASCENDING), ("createdAt", ASCENDING), ("id", ASCENDING)]},
+        {"name": "teeTimeId_userId_unique", "keys": [("teeTimeId", ASCENDING), ("userId", ASCENDING)], "unique": True},
+        {
+            "name": "userId_createdAt_id",
+            "keys": [("userId", ASCENDING), ("createdAt", DESCENDING), ("id", DESCENDING)],
+        },
+    ],
+    "bookings": [
+        {"name": "id_unique", "keys": [("id", ASCENDING)], "unique": True},
+        {
+            "name": "userId_createdAt_id",
+            "keys": [("userId", ASCENDING), ("createdAt", DESCENDING), ("id", DESCENDING)],
+        },
+        {"name": "createdAt_id", "keys": [("createdAt", DESCENDING), ("id", DESCENDING)]},
+        {"name": "teeTimeId", "keys": [("teeTimeId", ASCENDING)]},
+    ],
+    "competitions": [
+        {"name": "id_unique", "keys": [("id", ASCENDING)], "unique": True},
+        {"name": "status", "keys": [("status", ASCENDING)]},
+        {"name": "date_id", "keys": [("date", ASCENDING), ("id", ASCENDING)]},
+    ],
+    "registrations": [
+        {"name": "id_unique", "keys": [("id", ASCENDING)], "unique": True},
+        {
+            "name": "competitionId_userId_unique",
+            "keys": [("competitionId", ASCENDING), ("userId", ASCENDING)],
+            "unique": True,
+        },
+        {
+            "name": "competitionId_status_createdAt_id",
+            "keys": [("competitionId", ASCENDING), ("status", ASCENDING), ("createdAt", ASCENDING), ("id", ASCENDING)],
+        },
+        {
+            "name": "userId_createdAt_id",
+            "keys": [("userId", ASCENDING), ("createdAt", DESCENDING), ("id", DESCENDING)],
+        },
+    ],
+    "subscriptions": [
+        {"name": "id_unique", "keys": [("id", ASCENDING)], "unique": True},
+        {
+            "name": "userId_createdAt_id",
+            "keys": [("userId", ASCENDING), ("createdAt", DESCENDING), ("id", DESCENDING)],
+        },
+        {"name": "createdAt_id", "keys": [("createdAt", DESCENDING), ("id", DESCENDING)]},
+        {"name": "status", "keys": [("status", ASCENDING)]},
+    ],
+    "idempotency_keys": [
+        {"name": "expiresAt_ttl", "keys": [("expiresAt", ASCENDING)], "expireAfterSeconds": 0},
+    ],
+    "token_revocations": [
+        {"name": "jti_unique", "keys": [("jti", ASCENDING)], "unique": True},
+        {"name": "expiresAt_ttl", "keys": [("expiresAt", ASCENDING)], "expireAfterSeconds": 0},
+    ],
+}
+
+
+def _options(spec: dict) -> dict:
+    return {key: value for key, value in spec.items() if key not in ("name", "keys")}
+
+
+def _drift(spec: dict, existing: dict) -> List[str]:
+    differences = []
+    if [tuple(key) for key in existing["key"]] != [tuple(key) for key in spec["keys"]]:
+        differences.append(f"keys {existing['key']} != {spec['keys']}")
+    for option in COMPARED_OPTIONS:
+        if existing.get(option) != spec.get(option):
+            differences.append(f"{option} {existing.get(option)!r} != {spec.get(option)!r}")
+    return differences
+
+
+async def ensure_indexes(db, create: bool = True) -> dict:
+    """Apply the manifest and return what was created, what drifted and what failed"""
+    report = {"created": [], "drift": [], "unmanaged": [], "errors": []}
+
+    for collection_name, specs in INDEX_MANIFEST.items():
+        collection = db[collection_name]
+        try:
+            existing = await collection.index_information()
+        except PyMongoError as exc:
+            report["errors"].append({"collection": collection_name, "error": str(exc)})
+            logger.error("Could not read indexes of %s: %s", collection_name, exc)
+            continue
+
+        by_keys = {tuple(tuple(key) for key in info["key"]): name for name, info in existing.items()}
+        managed = {"_id_"}
+
+        for spec in specs:
+            name = spec["name"]
+            keys = tuple(tuple(key) for key in spec["keys"])
+            # An equivalent index may already exist under another name
+            current_name = name if name in existing else by_keys.get(keys)
+
+            if current_name is not None:
+                managed.add(current_name)
+                differences = _drift(spec, existing[current_name])
+                if current_name != name:
+                    differences.append(f"name {current_name!r} != {name!r}")
+                if differences:
+                    report["drift"].append({
+                        "collection": collection_name,
+                        "index": name,
+                        "differences": differences,
+                    })
+                    logger.warning("Index drift on %s.%s: %s", collection_name, name, "; ".join(differences))
+                continue
+
+            if not create:
+                report["drift"].append({"collection": collection_name, "index": name, "differences": ["missing"]})
+                continue
+
+            try:
+                await collection.create_index(list(spec["keys"]), name=name, background=True, **_options(spec))
+            except PyMongoError as exc:
+                report["errors"].append({"collection": collection_name, "index": name, "error": str(exc)})
+                logger.error("Could not create index %s.%s: %s", collection_name, name, exc)
+                continue
+
+            managed.add(name)
+            report["created"].append(f"{collection_name}.{name}")
+            logger.info("Created index %s.%s", collection_name, name)
+
+        for name in existing:
+            if name not in managed:
+                report["unmanaged"].append(f"{collection_name}.{name}")
+
+    return report
@@ -0,0 +1,312 @@
+"""Per-request timing and MongoDB command instrumentation.
+
+``CommandMetrics`` is a pymongo command listener registered on the Motor
+client; ``InstrumentationMiddleware`` wraps the ASGI app. The middleware puts
+a fresh ``RequestStats`` in a context variable for every HTTP request, and
+because Motor copies the caller's context into the thread that runs each
+command, the listener can charge round trips, documents returned and time in
+MongoDB to the request that issued them. Background tasks get their own
+context and only show up in the per-command totals.
+
+Each response carries a ``Server-Timing`` header (total, db and app time, the
+round-trip count as the db description) and ``/metrics`` renders per-route
+latency, db time and round-trip histograms in the Prometheus text format, so
+a handler doing one ``find_one`` per item stands out by its command count.
+Db time is the sum of command durations: requests running commands
+concurrently can report more db time than wall time, and their app time is
+then clamped to zero.
+"""
+
+import contextvars
+import os
+import threading
+import time
+from collections import defaultdict
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from pymongo import monitoring
+
+INSTRUMENTATION_SERVER_TIMING = os.getenv("INSTRUMENTATION_SERVER_TIMING", "true").lower() in ("1", "true", "yes")
+# Optional bearer token the Prometheus scraper must present on /metrics
+METRICS_TOKEN = os.getenv("METRICS_TOKEN", "")
+
+SERVER_TIMING_HEADER = "Server-Timing"
+METRICS_CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+COMMAND_COUNT_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100)
+
+# Routes nobody matched get one label instead of one per probed path
+UNMATCHED_ROUTE = "unmatched"
+
+Labels = Tuple[str, ...]
+
+
+class RequestStats:
+    __slots__ = ("commands", "documents", "db_seconds")
+
+    def __init__(self):
+        self.commands = 0
+        self.documents = 0
+        self.db_seconds = 0.0
+
+
+_current_request: contextvars.ContextVar[Optional[RequestStats]] = contextvars.ContextVar(
+    "instrumented_request", default=None
+)
+
+
+class Histogram:
+    def __init__(self, name: str, help_text: str, label_names: Labels, buckets: Iterable[float]):
+        self.name = name
+        self.help_text = help_text
+        self.label_names = label_names
+        self.buckets = tuple(buckets)
+        self._counts: Dict[Labels, List[int]] = {}
+        self._sums: Dict[Labels, float] = defaultdict(float)
+
+    def observe(self, labels: Labels, value: float) -> None:
+        counts = self._counts.get(labels)
+        if counts is None:
+            counts = self._counts[labels] = [0] * (len(self.buckets) + 1)
+        for index, bound in enumerate(self.buckets):
+            if value <= bound:
+                counts[index] += 1
+        counts[-1] += 1
+        self._sums[labels] += value
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} histogram"]
+        for labels, counts in sorted(self._counts.items()):
+            for bound, count in zip(self.buckets, counts):
+                bucket_labels = format_labels(self.label_names + ("le",), labels + (format_value(bound),))
+                lines.append(f"{self.name}_bucket{bucket_labels} {count}")
+            inf_labels = format_labels(self.label_names + ("le",), labels + ("+Inf",))
+            lines.append(f"{self.name}_bucket{inf_labels} {counts[-1]}")
+            lines.append(f"{self.name}_sum{format_labels(self.label_names, labels)} {format_value(self._sums[labels])}")
+            lines.append(f"{self.name}_count{format_labels(self.label_names, labels)} {counts[-1]}")
+        return lines
+
+
+class Counter:
+    metric_type = "counter"
+
+    def __init__(self, name: str, help_text: str, label_names: Labels):
+        self.name = name
+        self.help_text = help_text
+        self.label_names = label_names
+        self._values: Dict[Labels, float] = defaultdict(float)
+
+    def inc(self, labels: Labels, amount: float = 1) -> None:
+        self._values[labels] += amount
+
+    def total(self) -> float:
+        return sum(self._values.values())
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} {self.metric_type}"]
+        for labels, value in sorted(self._values.items()):
+            lines.append(f"{self.name}{format_labels(self.label_names, labels)} {format_value(value)}")
+        return lines
+
+
+class Gauge(Counter):
+    """A counter that may go down: ``inc`` with a negative amount, or ``set``"""
+    metric_type = "gauge"
+
+    def set(self, labels: Labels, value: float) -> None:
+        self._values[labels] = value
+
+    def get(self, labels: Labels) -> float:
+        return self._values.get(labels, 0)
+
+    def by_labels(self) -> Dict[Labels, float]:
+        return dict(self._values)
+
+
+def format_value(value: float) -> str:
+    return repr(float(value)) if isinstance(value, float) and not value.is_integer() else str(int(value))
+
+
+def format_labels(names: Labels, values: Labels) -> str:
+    if not names:
+        return ""
+    escaped = (
+        value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+        for value in values
+    )
+    return "{" + ",".join(f'{name}="{value}"' for name, value in zip(names, escaped)) + "}"
+
+
+def returned_documents(reply) -> int:
+    """Documents a command reply hands back: cursor batches and findAndModify values"""
+    cursor = reply.get("cursor")
+    if isinstance(cursor, dict):
+        return len(cursor.get("firstBatch", cursor.get("nextBatch", ())))
+    if "value" in reply:
+        return 0 if reply["value"] is None else 1
+    return 0
+
+
+class CommandMetrics(monitoring.CommandListener):
+    """Counts every MongoDB command and charges it to the current request, if any.
+
+    pymongo calls the listener from Motor's executor threads, hence the lock
+    around the shared counters.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._collections: Dict[Tuple[int, object], str] = {}
+        self.commands = Counter(
+            "teebook_mongo_commands_total", "MongoDB commands by name, collection and outcome",
+            ("command", "collection", "outcome")
+        )
+        self.seconds = Counter(
+            "teebook_mongo_command_seconds_total", "Time spent in MongoDB commands",
+            ("command", "collection")
+        )
+        self.documents = Counter(
+            "teebook_mongo_documents_returned_total", "Documents returned by MongoDB commands",
+            ("command", "collection")
+        )
+
+    @staticmethod
+    def _key(event) -> Tuple[int, object]:
+        return event.request_id, event.connection_id
+
+    def started(self, event) -> None:
+        target = event.command.get(event.command_name)
+        collection = target if isinstance(target, str) else event.command.get("collection", "")
+        with self._lock:
+            self._collections[self._key(event)] = collection if isinstance(collection, str) else ""
+
+    def _finish(self, event, outcome: str, documents: int) -> None:
+        seconds = event.duration_micros / 1e6
+        with self._lock:
+            collection = self._collections.pop(self._key(event), "")
+            self.commands.inc((event.command_name, collection, outcome))
+            self.seconds.inc((event.command_name, collection), seconds)
+            if documents:
+                self.documents.inc((event.command_name, collection), documents)
+
+            request = _current_request.get()
+            if request is not None:
+                request.commands += 1
+                request.documents += documents
+                request.db_seconds += seconds
+
+    def succeeded(self, event) -> None:
+        self._finish(event, "success", returned_documents(event.reply))
+
+    def failed(self, event) -> None:
+        self._finish(event, "failure", 0)
+
+    def render(self) -> List[str]:
+        with self._lock:
+            return self.commands.render() + self.seconds.render() + self.documents.render()
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "commands": int(self.commands.total()),
+                "seconds": round(self.seconds.total(), 3),
+                "documentsReturned": int(self.documents.total()),
+            }
+
+
+class RequestMetrics:
+    """Per-route request histograms, only updated from the event loop thread"""
+
+    def __init__(self):
+        labels = ("method", "route")
+        self.requests = Counter("teebook_http_requests_total", "HTTP requests by route and status", labels + ("status",))
+        self.duration = Histogram(
+            "teebook_http_request_duration_seconds", "Request latency", labels, LATENCY_BUCKETS
+        )
+        self.db_seconds = Histogram(
+            "teebook_http_request_db_seconds", "Time a request spent in MongoDB", labels, LATENCY_BUCKETS
+        )
+        self.app_seconds = Histogram(
+            "teebook_http_request_app_seconds", "Time a request spent outside MongoDB", labels, LATENCY_BUCKETS
+        )
+        self.commands = Histogram(
+            "teebook_http_request_mongo_commands", "MongoDB round trips per request", labels, COMMAND_COUNT_BUCKETS
+        )
+        self.documents = Counter(
+            "teebook_http_request_mongo_documents_total", "Documents MongoDB returned to requests", labels
+        )
+
+    def record(self, method: str, route: str, status_code: int, seconds: float, request: RequestStats) -> None:
+        labels = (method, route)
+        self.requests.inc(labels + (str(status_code),))
+        self.duration.observe(labels, seconds)
+        self.db_seconds.observe(labels, request.db_seconds)
+        self.app_seconds.observe(labels, max(seconds - request.db_seconds, 0.0))
+        self.commands.observe(labels, request.commands)
+        self.documents.inc(labels, request.documents)
+
+    def render(self) -> List[str]:
+        lines = []
+        for metric in (self.requests, self.duration, self.db_seconds, self.app_seconds, self.commands, self.documents):
+            lines.extend(metric.render())
+        return lines
+
+
+def server_timing(seconds: float, request: RequestStats) -> str:
+    app_seconds = max(seconds - request.db_seconds, 0.0)
+    return (
+        f'db;dur={request.db_seconds * 1000:.1f};desc="{request.commands} queries", '
+        f"app;dur={app_seconds * 1000:.1f}, total;dur={seconds * 1000:.1f}"
+    )
+
+
+def route_label(scope) -> str:
+    route = scope.get("route")
+    return getattr(route, "path", None) or UNMATCHED_ROUTE
+
+
+class InstrumentationMiddleware:
+    """Pure ASGI middleware, so streamed responses are timed to their last byte"""
+
+    def __init__(self, app, metrics: RequestMetrics, server_timing_header: bool = INSTRUMENTATION_SERVER_TIMING):
+        self.app = app
+        self.metrics = metrics
+        self.server_timing_header = server_timing_header
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        request = RequestStats()
+        token = _current_request.set(request)
+        started = time.perf_counter()
+        status_code = 500
+
+        async def send_with_timing(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+                if self.server_timing_header:
+                    # Headers leave before a streamed body, so this is the time to first byte
+                    value = server_timing(time.perf_counter() - started, request)
+                    message["headers"] = list(message.get("headers", [])) + [
+                        (SERVER_TIMING_HEADER.lower().encode(), value.encode())
+                    ]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_timing)
+        finally:
+            _current_request.reset(token)
+            self.metrics.record(
+                scope["method"], route_label(scope), status_code, time.perf_counter() - started, request
+            )
+
+
+def render_metrics(*sources) -> str:
+    lines = []
+    for source in sources:
+        lines.extend(source.render())
+    return "\n".join(lines) + "\n"
@@ -1,5 +1,5 @@
-from pydantic import BaseModel, Field, EmailStr
-from typing import Optional, List
+from pydantic import BaseModel, Field, EmailStr, model_validator
+from typing import Annotated, Optional, List
 from datetime import datetime
 from enum import Enum
 
@@ -21,6 +21,10 @@ class CompetitionStatus(str, Enum):
     COMPLETED = "completed"
     CANCELLED = "cancelled"
 
+class RegistrationStatus(str, Enum):
+    REGISTERED = "registered"
+    WAITLISTED = "waitlisted"
+
 # User Models
 class UserBase(BaseModel):
     email: EmailStr
@@ -28,7 +32,7 @@ class UserBase(BaseModel):
     lastName: str
     handicapIndex: Optional[float] = None
     role: UserRole = UserRole.USER
-    profileImage: Optional[str] = None  # Base64 image
+    profileImage: Optional[str] = None  # URL of the image, see GET /api/images/{digest}
 
 class UserCreate(UserBase):
     password: str
@@ -47,6 +51,10 @@ class User(UserBase):
 
 class UserInDB(User):
     hashedPassword: str
+    tokenVersion: int = 0
+
+class UserStatusUpdate(BaseModel):
+    isActive: bool
 
 # Token Models
 class Token(BaseModel):
@@ -56,6 +64,18 @@ class Token(BaseModel):
 
 class TokenData(BaseModel):
     email: Optional[str] = None
+    userId: Optional[str] = None
+    role: Optional[UserRole] = None
+    tokenVersion: int = 0
+    jti: Optional[str] = None
+    exp: Optional[int] = None
+
+class Principal(BaseModel):
+    """Authenticated caller, resolved once per request"""
+    id: str
+    email: str
+    role: UserRole = UserRole.USER
+    isActive: bool = True
 
 # Subscription Models
 class SubscriptionBase(BaseModel):
@@ -76,10 +96,57 @@ class Subscription(SubscriptionBase):
         json_encoders = {datetime: lambda v: v.isoformat()}
 
 # Course Models
+# Schedule template formats, checked on input so a bad template cannot break generation for every course
+TIME_PATTERN = r"^([01][0-9]|2[0-3]):[0-5][0-9]$"  # HH:MM
+MONTH_DAY_PATTERN = r"^(0[1-9]|1[0-2])-(0[1-9]|[12][0-9]|3[01])$"  # MM-DD
+DATE_PATTERN = r"^[0-9]{4}-(0[1-9]|1[0-2])-(0[1-9]|[12][0-9]|3[01])$"  # YYYY-MM-DD
+
+class OpeningWindow(BaseModel):
+    start: str = Field(pattern=TIME_PATTERN)  # First tee time
+    end: str = Field(pattern=TIME_PATTERN)  # Last tee time
+
+    @model_validator(mode="after")
+    def check_order(self):
+        if self.start >= self.end:
+            raise ValueError(f"Opening window must start before it ends, got {self.start}-{self.end}")
+        return self
+
+class SeasonalRule(BaseModel):
+    name: Optional[str] = None
+    startDate: str = Field(pattern=MONTH_DAY_PATTERN)  # Inclusive
+    endDate: str = Field(pattern=MONTH_DAY_PATTERN)  # Inclusive
+    wrapsNewYear: bool = False  # Required for seasons such as 11-01 .. 02-28
+    closed: bool = False
+    openingHours: Optional[List[OpeningWindow]] = None
+    intervalMinutes: Optional[int] = Field(None, ge=5)
+    maxSlots: Optional[int] = Field(None, ge=1)
+
+    @model_validator(mode="after")
+    def check_order(self):
+        if (self.startDate > self.endDate) != self.wrapsNewYear:
+            if self.wrapsNewYear:
+                raise ValueError(f"Season {self.startDate} .. {self.endDate} does not wrap over the new year")
+            raise ValueError(
+                f"Season {self.startDate} .. {self.endDate} is reversed, set wrapsNewYear if it spans the new year"
+            )
+        return self
+
+class ScheduleTemplate(BaseModel):
+    openingHours: List[OpeningWindow] = [
+        OpeningWindow(start="07:00", end="12:00"),
+        OpeningWindow(start="14:00", end="17:30")
+    ]
+    intervalMinutes: int = Field(30, ge=5)
+    maxSlots: int = Field(4, ge=1)
+    closedWeekdays: List[Annotated[int, Field(ge=0, le=6)]] = []  # 0 = Monday
+    blackoutDates: List[Annotated[str, Field(pattern=DATE_PATTERN)]] = []
+    seasons: List[SeasonalRule] = []  # First matching rule wins
+
 class CourseBase(BaseModel):
     name: str
     description: Optional[str] = None
     holesCount: int = 18
+    schedule: Optional[ScheduleTemplate] = None  # Tee-time generation template, defaults apply when unset
 
 class CourseCreate(CourseBase):
     pass
@@ -105,11 +172,18 @@ class TeeTime(TeeTimeBase):
     id: str
     bookedSlots: int = 0
     availableSlots: int = 4
+    waitlistCount: int = 0  # Parties queued for slots to free up
     createdAt: datetime = Field(default_factory=datetime.utcnow)
 
     class Config:
         json_encoders = {datetime: lambda v: v.isoformat()}
 
+class TeeTimeGenerationRequest(BaseModel):
+    dateFrom: Optional[str] = None  # Format: YYYY-MM-DD, defaults to today
+    days: int = Field(15, ge=1)
+    courseIds: Optional[List[str]] = None  # All courses when unset
+    dryRun: bool = False
+
 # Booking Models
 class GuestPlayer(BaseModel):
     name: str
@@ -132,6 +206,19 @@ class Booking(BookingBase):
     class Config:
         json_encoders = {datetime: lambda v: v.isoformat()}
 
+class WaitlistEntryCreate(BaseModel):
+    playersCount: int = 1
+    guestPlayers: List[GuestPlayer] = []
+
+class WaitlistEntry(WaitlistEntryCreate):
+    id: str
+    teeTimeId: str
+    userId: str
+    createdAt: datetime = Field(default_factory=datetime.utcnow)  # Queue order
+
+    class Config:
+        json_encoders = {datetime: lambda v: v.isoformat()}
+
 # Competition Models
 class CompetitionBase(BaseModel):
     name: str
@@ -145,9 +232,19 @@ class CompetitionCreate(CompetitionBase):
 
 class Competition(CompetitionBase):
     id: str
-    participants: List[str] = []  # List of user IDs
+    participantsCount: int = 0  # Entrants live in the registrations collection
     status: CompetitionStatus = CompetitionStatus.UPCOMING
     createdAt: datetime = Field(default_factory=datetime.utcnow)
 
     class Config:
         json_encoders = {datetime: lambda v: v.isoformat()}
+
+class CompetitionRegistration(BaseModel):
+    id: str
+    competitionId: str
+    userId: str
+    status: RegistrationStatus = RegistrationStatus.REGISTERED
+    createdAt: datetime = Field(default_factory=datetime.utcnow)  # Waitlist order
+
+    class Config:
+        json_encoders = {datetime: lambda v: v.isoformat()}
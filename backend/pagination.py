@@ -0,0 +1,93 @@
+"""Keyset (cursor) pagination for list endpoints.
+
+Pages are fetched with a range condition on the sort key instead of ``skip``,
+so every page costs the same index seek however deep the client walks. The
+cursor handed back to clients is an opaque, URL-safe encoding of the sort key
+values of the last document on the page.
+"""
+
+import base64
+import json
+import os
+from datetime import datetime
+from typing import List, Optional, Sequence, Tuple
+
+from fastapi import HTTPException, Response, status
+from pymongo import ASCENDING
+
+# The limit lists had before they were paginated, so clients that ignore the cursor see no change
+DEFAULT_PAGE_SIZE = int(os.getenv("DEFAULT_PAGE_SIZE", "1000"))
+MAX_PAGE_SIZE = int(os.getenv("MAX_PAGE_SIZE", "1000"))
+
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+
+SortSpec = Sequence[Tuple[str, int]]
+
+
+def _encode_value(value):
+    if isinstance(value, datetime):
+        return {"$date": value.isoformat()}
+    return value
+
+
+def _decode_value(value):
+    if isinstance(value, dict) and "$date" in value:
+        return datetime.fromisoformat(value["$date"])
+    return value
+
+
+def encode_cursor(document: dict, sort: SortSpec) -> str:
+    values = [_encode_value(document.get(field)) for field, _ in sort]
+    raw = json.dumps(values, separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str, sort: SortSpec) -> List:
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        values = json.loads(raw)
+    except ValueError:
+        values = None
+
+    if not isinstance(values, list) or len(values) != len(sort):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Invalid pagination cursor"
+        )
+    return [_decode_value(value) for value in values]
+
+
+def keyset_filter(sort: SortSpec, values: List) -> dict:
+    """Match documents strictly after ``values`` in ``sort`` order"""
+    clauses = []
+    for index, (field, direction) in enumerate(sort):
+        clause = {prefix: values[i] for i, (prefix, _) in enumerate(sort[:index])}
+        clause[field] = {"$gt" if direction == ASCENDING else "$lt": values[index]}
+        clauses.append(clause)
+    return {"$or": clauses}
+
+
+async def paginate(
+    collection,
+    query: dict,
+    sort: SortSpec,
+    limit: int,
+    after: Optional[str] = None,
+    projection: Optional[dict] = None,
+) -> Tuple[List[dict], Optional[str]]:
+    """Fetch one page and the cursor of the next one (None on the last page)"""
+    if after:
+        after_filter = keyset_filter(sort, decode_cursor(after, sort))
+        query = {"$and": [query, after_filter]} if query else after_filter
+
+    # One extra document tells whether another page exists
+    documents = await collection.find(query, projection).sort(list(sort)).limit(limit + 1).to_list(limit + 1)
+    if len(documents) > limit:
+        documents = documents[:limit]
+        return documents, encode_cursor(documents[-1], sort)
+    return documents, None
+
+
+def set_next_cursor(response: Response, cursor: Optional[str]) -> None:
+    if cursor:
+        response.headers[NEXT_CURSOR_HEADER] = cursor
@@ -0,0 +1,82 @@
+"""Competition entrants, stored one document per entry.
+
+Each entry lives in the ``registrations`` collection, unique on
+``(competitionId, userId)``, and the competition only keeps a
+``participantsCount`` counter. Registering costs the same whatever the size
+of the field and listing competitions never ships entrant lists.
+
+Entrants join as waitlisted and are then promoted in arrival order for as
+long as a place can be claimed on the counter, so a place freed by an
+unregistration goes to the head of the waitlist rather than to whoever
+registers next.
+"""
+
+import logging
+import uuid
+from datetime import datetime
+from typing import List
+
+from pymongo import UpdateOne
+
+from models import RegistrationStatus
+
+logger = logging.getLogger(__name__)
+
+
+async def promote_waitlist(competitions, registrations, competition_id: str) -> List[dict]:
+    """Fill free places from the head of the waitlist, returning who got in.
+
+    Each round flips the oldest waitlisted entry first and only then claims
+    a place with the capacity-checked counter update, putting the entry back
+    at the head of the waitlist when the competition is full. A crash
+    between the two writes leaves one entrant registered but uncounted,
+    rather than a place claimed that nobody holds. After a failed claim the
+    counter is looked at again: a place freed while this pass held the
+    entry found no one on the waitlist to give it to.
+    """
+    promoted = []
+    while True:
+        registration = await registrations.promote_next(competition_id)
+        if not registration:
+            break
+        if await competitions.claim_place(competition_id):
+            promoted.append(registration)
+            continue
+        await registrations.demote(registration["id"])
+        if not await competitions.has_free_place(competition_id):
+            break
+    return promoted
+
+
+async def migrate_embedded_participants(db) -> int:
+    """Move ``participants`` lists still embedded in competitions into registrations"""
+    migrated = 0
+    async for competition in db.competitions.find(
+        {"participants": {"$exists": True}}, {"_id": 0, "id": 1, "participants": 1}
+    ):
+        now = datetime.utcnow()
+        operations = [
+            UpdateOne(
+                {"competitionId": competition["id"], "userId": user_id},
+                {"$setOnInsert": {
+                    "id": str(uuid.uuid4()),
+                    "status": RegistrationStatus.REGISTERED,
+                    "createdAt": now,
+                }},
+                upsert=True
+            )
+            for user_id in dict.fromkeys(competition["participants"] or [])
+        ]
+        if operations:
+            await db.registrations.bulk_write(operations, ordered=False)
+        count = await db.registrations.count_documents(
+            {"competitionId": competition["id"], "status": {"$ne": RegistrationStatus.WAITLISTED}}
+        )
+        await db.competitions.update_one(
+            {"id": competition["id"]},
+            {"$set": {"participantsCount": count}, "$unset": {"participants": ""}}
+        )
+        migrated += 1
+    if migrated:
+        logger.info("Moved the participants of %d competitions into registrations", migrated)
+    return migrated
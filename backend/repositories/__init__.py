@@ -0,0 +1,31 @@
+"""Per-collection data access for the API handlers.
+
+Every read goes through a method with an explicit projection (always
+excluding ``_id``), so a handler only pays transfer and BSON decode cost for
+the fields it actually uses.
+"""
+
+from repositories.base import model_projection, projection
+from repositories.bookings import BookingRepository
+from repositories.competitions import CompetitionRepository
+from repositories.courses import CourseRepository
+from repositories.registrations import RegistrationRepository
+from repositories.revocations import TokenRevocationRepository
+from repositories.subscriptions import SubscriptionRepository
+from repositories.tee_times import TeeTimeRepository
+from repositories.users import UserRepository
+from repositories.waitlist import WaitlistRepository
+
+__all__ = [
+    "BookingRepository",
+    "CompetitionRepository",
+    "CourseRepository",
+    "RegistrationRepository",
+    "SubscriptionRepository",
+    "TeeTimeRepository",
+    "TokenRevocationRepository",
+    "UserRepository",
+    "WaitlistRepository",
+    "model_projection",
+    "projection",
+]
@@ -0,0 +1,35 @@
+from typing import List, Optional, Tuple, Type
+
+from pydantic import BaseModel
+
+from pagination import SortSpec, paginate
+
+
+def projection(*fields: str) -> dict:
+    return {"_id": 0, **{field: 1 for field in fields}}
+
+
+def model_projection(model: Type[BaseModel], *extra: str) -> dict:
+    """Exactly the fields ``model`` is built from"""
+    return projection(*model.model_fields, *extra)
+
+
+class Repository:
+    collection_name: str
+    # Keyset order for ``page``, each backed by an index in indexes.py
+    sort: SortSpec
+
+    def __init__(self, db):
+        self.db = db
+
+    @property
+    def collection(self):
+        return self.db[self.collection_name]
+
+    async def insert(self, document: dict) -> None:
+        await self.collection.insert_one(document)
+
+    async def _page(
+        self, query: dict, limit: int, after: Optional[str], fields: dict
+    ) -> Tuple[List[dict], Optional[str]]:
+        return await paginate(self.collection, query, self.sort, limit, after, projection=fields)
@@ -0,0 +1,34 @@
+from typing import List, Optional, Tuple
+
+from pymongo import DESCENDING
+
+from models import Booking, BookingStatus
+from repositories.base import Repository, model_projection, projection
+
+BOOKING_PROJECTION = model_projection(Booking)
+
+
+class BookingRepository(Repository):
+    collection_name = "bookings"
+    sort = [("createdAt", DESCENDING), ("id", DESCENDING)]
+
+    async def exists(self, booking_id: str, user_id: str) -> bool:
+        return bool(await self.collection.count_documents({"id": booking_id, "userId": user_id}, limit=1))
+
+    async def cancel(self, booking_id: str, user_id: str) -> Optional[dict]:
+        """Flip a live booking to cancelled.
+
+        The status change is atomic, so of several concurrent cancellations
+        only one gets the booking back (its teeTimeId and playersCount).
+        """
+        return await self.collection.find_one_and_update(
+            {"id": booking_id, "userId": user_id, "status": {"$ne": BookingStatus.CANCELLED}},
+            {"$set": {"status": BookingStatus.CANCELLED}},
+            projection=projection("teeTimeId", "playersCount")
+        )
+
+    async def page(
+        self, limit: int, after: Optional[str] = None, user_id: Optional[str] = None
+    ) -> Tuple[List[dict], Optional[str]]:
+        query = {"userId": user_id} if user_id else {}
+        return await self._page(query, limit, after, BOOKING_PROJECTION)
@@ -0,0 +1,42 @@
+from typing import List, Optional, Tuple
+
+from pymongo import ASCENDING
+
+from models import Competition
+from repositories.base import Repository, model_projection
+
+COMPETITION_PROJECTION = model_projection(Competition)
+
+
+class CompetitionRepository(Repository):
+    collection_name = "competitions"
+    sort = [("date", ASCENDING), ("id", ASCENDING)]
+
+    async def exists(self, competition_id: str) -> bool:
+        return bool(await self.collection.count_documents({"id": competition_id}, limit=1))
+
+    async def claim_place(self, competition_id: str) -> bool:
+        """Take one place if the competition is not full yet.
+
+        Capacity check and increment are a single conditional update, so
+        concurrent registrations can never overfill a competition.
+        """
+        result = await self.collection.update_one(
+            {"id": competition_id, "$expr": {"$lt": [{"$ifNull": ["$participantsCount", 0]}, "$maxParticipants"]}},
+            {"$inc": {"participantsCount": 1}}
+        )
+        return result.modified_count == 1
+
+    async def has_free_place(self, competition_id: str) -> bool:
+        return bool(await self.collection.count_documents(
+            {"id": competition_id, "$expr": {"$lt": [{"$ifNull": ["$participantsCount", 0]}, "$maxParticipants"]}},
+            limit=1
+        ))
+
+    async def release_place(self, competition_id: str) -> None:
+        await self.collection.update_one(
+            {"id": competition_id, "participantsCount": {"$gt": 0}}, {"$inc": {"participantsCount": -1}}
+        )
+
+    async def page(self, limit: int, after: Optional[str] = None) -> Tuple[List[dict], Optional[str]]:
+        return await self._page({}, limit, after, COMPETITION_PROJECTION)
@@ -0,0 +1,29 @@
+from typing import List, Optional, Tuple
+
+from pymongo import ASCENDING, ReturnDocument
+
+from models import Course
+from repositories.base import Repository, model_projection, projection
+
+COURSE_PROJECTION = model_projection(Course)
+
+
+class CourseRepository(Repository):
+    collection_name = "courses"
+    sort = [("name", ASCENDING), ("id", ASCENDING)]
+
+    async def ids(self) -> List[str]:
+        courses = await self.collection.find({}, projection("id")).to_list(None)
+        return [course["id"] for course in courses]
+
+    async def set_schedule(self, course_id: str, schedule: Optional[dict]) -> Optional[dict]:
+        """Replace a course's generation template, returning the updated course"""
+        return await self.collection.find_one_and_update(
+            {"id": course_id},
+            {"$set": {"schedule": schedule}},
+            projection=COURSE_PROJECTION,
+            return_document=ReturnDocument.AFTER
+        )
+
+    async def page(self, limit: int, after: Optional[str] = None) -> Tuple[List[dict], Optional[str]]:
+        return await self._page({}, limit, after, COURSE_PROJECTION)
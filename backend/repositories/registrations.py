@@ -0,0 +1,56 @@
+from typing import List, Optional, Tuple
+
+from pymongo import ASCENDING, DESCENDING
+
+from models import CompetitionRegistration, RegistrationStatus
+from repositories.base import Repository, model_projection, projection
+
+REGISTRATION_PROJECTION = model_projection(CompetitionRegistration)
+
+
+class RegistrationRepository(Repository):
+    collection_name = "registrations"
+    sort = [("createdAt", DESCENDING), ("id", DESCENDING)]
+
+    async def exists(self, competition_id: str, user_id: str) -> bool:
+        return bool(await self.collection.count_documents(
+            {"competitionId": competition_id, "userId": user_id}, limit=1
+        ))
+
+    async def status(self, registration_id: str) -> Optional[RegistrationStatus]:
+        registration = await self.collection.find_one({"id": registration_id}, projection("status"))
+        if not registration:
+            return None
+        return RegistrationStatus(registration.get("status", RegistrationStatus.REGISTERED))
+
+    async def remove(self, competition_id: str, user_id: str) -> Optional[dict]:
+        """Delete the entry, returning its status, or None when there was none"""
+        return await self.collection.find_one_and_delete(
+            {"competitionId": competition_id, "userId": user_id}, projection=projection("status")
+        )
+
+    async def promote_next(self, competition_id: str) -> Optional[dict]:
+        """Move the longest-waiting entrant off the waitlist.
+
+        The status flip is atomic, so concurrent promotions never pick the
+        same entry twice. Returns None once the waitlist is empty.
+        """
+        return await self.collection.find_one_and_update(
+            {"competitionId": competition_id, "status": RegistrationStatus.WAITLISTED},
+            {"$set": {"status": RegistrationStatus.REGISTERED}},
+            sort=[("createdAt", ASCENDING), ("id", ASCENDING)],
+            projection=projection("id", "userId")
+        )
+
+    async def demote(self, registration_id: str) -> None:
+        """Put a promoted entry back on the waitlist, where its ``createdAt`` keeps its turn"""
+        await self.collection.update_one(
+            {"id": registration_id, "status": RegistrationStatus.REGISTERED},
+            {"$set": {"status": RegistrationStatus.WAITLISTED}}
+        )
+
+    async def page(
+        self, limit: int, after: Optional[str] = None, user_id: Optional[str] = None
+    ) -> Tuple[List[dict], Optional[str]]:
+        query = {"userId": user_id} if user_id else {}
+        return await self._page(query, limit, after, REGISTRATION_PROJECTION)
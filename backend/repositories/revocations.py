@@ -0,0 +1,16 @@
+from datetime import datetime
+from typing import AsyncIterator, Optional
+
+from repositories.base import Repository, projection
+
+
+class TokenRevocationRepository(Repository):
+    """Single access tokens revoked before they expire, dropped by a TTL index"""
+
+    collection_name = "token_revocations"
+
+    async def revoke(self, jti: str, user_id: Optional[str], expires_at: datetime) -> None:
+        await self.insert({"jti": jti, "userId": user_id, "expiresAt": expires_at})
+
+    def active(self, now: datetime) -> AsyncIterator[dict]:
+        return self.collection.find({"expiresAt": {"$gt": now}}, projection("jti", "expiresAt"))
@@ -0,0 +1,19 @@
+from typing import List, Optional, Tuple
+
+from pymongo import DESCENDING
+
+from models import Subscription
+from repositories.base import Repository, model_projection
+
+SUBSCRIPTION_PROJECTION = model_projection(Subscription)
+
+
+class SubscriptionRepository(Repository):
+    collection_name = "subscriptions"
+    sort = [("createdAt", DESCENDING), ("id", DESCENDING)]
+
+    async def page(
+        self, limit: int, after: Optional[str] = None, user_id: Optional[str] = None
+    ) -> Tuple[List[dict], Optional[str]]:
+        query = {"userId": user_id} if user_id else {}
+        return await self._page(query, limit, after, SUBSCRIPTION_PROJECTION)
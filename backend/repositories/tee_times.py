@@ -0,0 +1,124 @@
+from typing import List, Optional, Tuple
+
+from pymongo import ASCENDING
+
+from models import TeeTime
+from repositories.base import Repository, model_projection, projection
+
+TEE_TIME_PROJECTION = model_projection(TeeTime)
+# Enough to locate the day and publish the new availability after a change
+TEE_TIME_CHANGE_PROJECTION = projection(
+    "courseId", "date", "time", "availableSlots", "bookedSlots", "heldSlots", "waitlistCount"
+)
+# Anyone queued for this tee time, for aggregation expressions
+QUEUED = {"$gt": [{"$ifNull": ["$waitlistCount", 0]}, 0]}
+
+
+class TeeTimeRepository(Repository):
+    collection_name = "tee_times"
+    sort = [("date", ASCENDING), ("time", ASCENDING), ("id", ASCENDING)]
+
+    async def exists(self, tee_time_id: str) -> bool:
+        return bool(await self.collection.count_documents({"id": tee_time_id}, limit=1))
+
+    async def day(self, course_id: str, date: str) -> List[dict]:
+        return await self.collection.find(
+            {"courseId": course_id, "date": date}, TEE_TIME_PROJECTION
+        ).sort("time", ASCENDING).to_list(None)
+
+    async def days(self, course_ids: List[str], dates: List[str]) -> List[dict]:
+        """Every tee time of these courses on these days, in courseId_date_time_unique order"""
+        return await self.collection.find(
+            {"courseId": {"$in": course_ids}, "date": {"$in": dates}}, TEE_TIME_PROJECTION
+        ).sort([("courseId", ASCENDING), ("date", ASCENDING), ("time", ASCENDING)]).to_list(None)
+
+    async def reserve(self, tee_time_id: str, players: int) -> Optional[dict]:
+        """Take ``players`` slots if that many are free.
+
+        Returns the tee time as it was before the change, or None when it does
+        not exist or is too full.
+        """
+        return await self.collection.find_one_and_update(
+            {"id": tee_time_id, "availableSlots": {"$gte": players}},
+            {"$inc": {"bookedSlots": players, "availableSlots": -players}},
+            projection=TEE_TIME_CHANGE_PROJECTION
+        )
+
+    async def release(self, tee_time_id: str, players: int) -> Optional[dict]:
+        """Hand ``players`` slots back, returning the tee time as it was before"""
+        return await self.collection.find_one_and_update(
+            {"id": tee_time_id},
+            {"$inc": {"bookedSlots": -players, "availableSlots": players}},
+            projection=TEE_TIME_CHANGE_PROJECTION
+        )
+
+    async def release_to_waitlist(self, tee_time_id: str, players: int) -> Optional[dict]:
+        """Hand ``players`` slots back, holding them for the waitlist if anyone is queued.
+
+        Returns the tee time as it was before; a positive ``waitlistCount``
+        means the slots went to ``heldSlots`` instead of back on sale, where
+        only waitlist promotion can take them.
+        """
+        held = {"$ifNull": ["$heldSlots", 0]}
+        return await self.collection.find_one_and_update(
+            {"id": tee_time_id},
+            [{"$set": {
+                "bookedSlots": {"$subtract": ["$bookedSlots", players]},
+                "heldSlots": {"$cond": [QUEUED, {"$add": [held, players]}, held]},
+                "availableSlots": {"$cond": [QUEUED, "$availableSlots", {"$add": ["$availableSlots", players]}]},
+            }}],
+            projection=TEE_TIME_CHANGE_PROJECTION
+        )
+
+    async def claim_held(self, tee_time_id: str, players: int) -> Optional[dict]:
+        """Turn ``players`` held slots into booked ones, returning the tee time as it was before"""
+        return await self.collection.find_one_and_update(
+            {"id": tee_time_id, "heldSlots": {"$gte": players}},
+            {"$inc": {"heldSlots": -players, "bookedSlots": players}},
+            projection=TEE_TIME_CHANGE_PROJECTION
+        )
+
+    async def release_held(self, tee_time_id: str) -> Optional[dict]:
+        """Put held slots nobody claimed back on sale, returning the tee time as it was before"""
+        return await self.collection.find_one_and_update(
+            {"id": tee_time_id, "heldSlots": {"$gt": 0}},
+            [{"$set": {"availableSlots": {"$add": ["$availableSlots", "$heldSlots"]}, "heldSlots": 0}}],
+            projection=TEE_TIME_CHANGE_PROJECTION
+        )
+
+    async def with_held_slots(self) -> List[str]:
+        tee_times = await self.collection.find({"heldSlots": {"$gt": 0}}, projection("id")).to_list(None)
+        return [tee_time["id"] for tee_time in tee_times]
+
+    async def free_slots(self, tee_time_id: str) -> int:
+        """Slots a waitlist promotion could take: on sale or held"""
+        tee_time = await self.collection.find_one({"id": tee_time_id}, projection("availableSlots", "heldSlots"))
+        if not tee_time:
+            return 0
+        return tee_time["availableSlots"] + tee_time.get("heldSlots", 0)
+
+    async def join_waitlist(self, tee_time_id: str, players: int) -> bool:
+        """Count one more queued party, only while ``players`` slots cannot be booked outright"""
+        result = await self.collection.update_one(
+            {"id": tee_time_id, "availableSlots": {"$lt": players}}, {"$inc": {"waitlistCount": 1}}
+        )
+        return result.modified_count == 1
+
+    async def leave_waitlist(self, tee_time_id: str) -> None:
+        await self.collection.update_one(
+            {"id": tee_time_id, "waitlistCount": {"$gt": 0}}, {"$inc": {"waitlistCount": -1}}
+        )
+
+    async def page(
+        self,
+        limit: int,
+        after: Optional[str] = None,
+        course_id: Optional[str] = None,
+        date: Optional[str] = None,
+    ) -> Tuple[List[dict], Optional[str]]:
+        query = {}
+        if date:
+            query["date"] = date
+        if course_id:
+            query["courseId"] = course_id
+        return await self._page(query, limit, after, TEE_TIME_PROJECTION)
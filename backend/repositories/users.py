@@ -0,0 +1,68 @@
+from datetime import datetime
+from typing import AsyncIterator, List, Optional, Tuple
+
+from pymongo import ASCENDING, ReturnDocument
+
+from models import User
+from repositories.base import Repository, model_projection, projection
+
+# What the API shows of a user: the stored image id stands in for the URL,
+# and neither the password hash nor a legacy inline image is ever read
+PROFILE_PROJECTION = model_projection(User, "profileImageId")
+PROFILE_PROJECTION.pop("profileImage")
+LOGIN_PROJECTION = {**PROFILE_PROJECTION, "hashedPassword": 1, "tokenVersion": 1}
+PRINCIPAL_PROJECTION = projection("id", "email", "role", "isActive")
+
+
+class UserRepository(Repository):
+    collection_name = "users"
+    sort = [("createdAt", ASCENDING), ("id", ASCENDING)]
+
+    async def email_exists(self, email: str) -> bool:
+        return bool(await self.collection.count_documents({"email": email}, limit=1))
+
+    async def find_for_login(self, email: str) -> Optional[dict]:
+        return await self.collection.find_one({"email": email}, LOGIN_PROJECTION)
+
+    async def find_profile_by_email(self, email: str) -> Optional[dict]:
+        return await self.collection.find_one({"email": email}, PROFILE_PROJECTION)
+
+    async def find_principal(self, email: str) -> Optional[dict]:
+        return await self.collection.find_one({"email": email}, PRINCIPAL_PROJECTION)
+
+    async def bump_token_version(self, user_id: str) -> Optional[dict]:
+        """Revoke every token issued so far, returning the email and new version"""
+        return await self.collection.find_one_and_update(
+            {"id": user_id},
+            {"$inc": {"tokenVersion": 1}, "$set": {"tokenVersionChangedAt": datetime.utcnow()}},
+            projection=projection("email", "tokenVersion"),
+            return_document=ReturnDocument.AFTER,
+        )
+
+    def revoked_token_versions(self, changed_since: Optional[datetime] = None) -> AsyncIterator[dict]:
+        """Users whose tokens were ever revoked, optionally only recent changes.
+
+        The query implies the partial filter of ``tokenVersionChangedAt_revoked``.
+        """
+        query = {"tokenVersion": {"$gt": 0}}
+        if changed_since is not None:
+            query["tokenVersionChangedAt"] = {"$gt": changed_since}
+        return self.collection.find(query, projection("id", "tokenVersion"))
+
+    async def set_profile_image(self, user_id: str, image_id: str) -> None:
+        await self.collection.update_one(
+            {"id": user_id},
+            {"$set": {"profileImageId": image_id}, "$unset": {"profileImage": ""}}
+        )
+
+    async def set_active(self, user_id: str, is_active: bool) -> Optional[str]:
+        """Enable or disable an account, returning its email (None when unknown)"""
+        user = await self.collection.find_one_and_update(
+            {"id": user_id},
+            {"$set": {"isActive": is_active}},
+            projection=projection("email")
+        )
+        return user["email"] if user else None
+
+    async def page(self, limit: int, after: Optional[str] = None) -> Tuple[List[dict], Optional[str]]:
+        return await self._page({}, limit, after, PROFILE_PROJECTION)
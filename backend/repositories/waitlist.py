@@ -0,0 +1,34 @@
+from typing import List, Optional, Tuple
+
+from pymongo import ASCENDING, DESCENDING
+
+from models import WaitlistEntry
+from repositories.base import Repository, model_projection, projection
+
+WAITLIST_PROJECTION = model_projection(WaitlistEntry)
+
+
+class WaitlistRepository(Repository):
+    collection_name = "tee_time_waitlist"
+    sort = [("createdAt", DESCENDING), ("id", DESCENDING)]
+
+    async def queue(self, tee_time_id: str, limit: int) -> List[dict]:
+        """The first ``limit`` parties waiting for a tee time, in arrival order"""
+        return await self.collection.find(
+            {"teeTimeId": tee_time_id}, WAITLIST_PROJECTION
+        ).sort([("createdAt", ASCENDING), ("id", ASCENDING)]).limit(limit).to_list(None)
+
+    async def take(self, entry_id: str) -> Optional[dict]:
+        """Remove an entry for promotion; of concurrent takers only one gets it"""
+        return await self.collection.find_one_and_delete({"id": entry_id}, projection=WAITLIST_PROJECTION)
+
+    async def remove(self, entry_id: str, user_id: str) -> Optional[dict]:
+        return await self.collection.find_one_and_delete(
+            {"id": entry_id, "userId": user_id}, projection=projection("teeTimeId")
+        )
+
+    async def page(
+        self, limit: int, after: Optional[str] = None, user_id: Optional[str] = None
+    ) -> Tuple[List[dict], Optional[str]]:
+        query = {"userId": user_id} if user_id else {}
+        return await self._page(query, limit, after, WAITLIST_PROJECTION)
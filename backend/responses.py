@@ -0,0 +1,76 @@
+"""Opt-in fast JSON path for list endpoints.
+
+By default a list endpoint builds one validated model per document, FastAPI
+validates the list again against ``response_model`` and the stdlib encoder
+serializes it. With ``FAST_JSON=1`` documents read from our own database -
+already shaped by the repositories' projections - are not validated:
+fields the model does not declare are dropped, its static field defaults
+are filled in and the rows go straight to orjson, which handles datetimes
+and enums natively. No model instance is built; ``model_construct`` walks
+the fields in Python and is slower than validating under Pydantic 2. The
+wire format is the same in both modes.
+"""
+
+import logging
+import os
+from functools import lru_cache
+from typing import Iterable, List, Type, Union
+
+from fastapi import Response
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse, ORJSONResponse
+from pydantic import BaseModel
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - orjson is optional
+    orjson = None
+
+logger = logging.getLogger(__name__)
+
+FAST_JSON = os.getenv("FAST_JSON", "false").lower() in ("1", "true", "yes")
+if FAST_JSON and orjson is None:
+    logger.warning("FAST_JSON is set but orjson is not installed, using the standard encoder")
+    FAST_JSON = False
+
+
+@lru_cache(maxsize=None)
+def _field_defaults(model: Type[BaseModel]) -> dict:
+    # Factory defaults (ids, createdAt) are always stored, only static ones can be missing
+    return {
+        name: field.default
+        for name, field in model.model_fields.items()
+        if not field.is_required() and field.default_factory is None
+    }
+
+
+def _fast_rows(model: Type[BaseModel], documents: Iterable[dict]) -> List[dict]:
+    defaults = _field_defaults(model)
+    fields = model.model_fields
+    return [
+        {**defaults, **{name: value for name, value in document.items() if name in fields}}
+        for document in documents
+    ]
+
+
+def default_response_class() -> Type[JSONResponse]:
+    return ORJSONResponse if FAST_JSON else JSONResponse
+
+
+def model_list(
+    model: Type[BaseModel], documents: Iterable[dict], response: Response
+) -> Union[List[BaseModel], Response]:
+    """Body of a list endpoint whose documents came straight from the database.
+
+    Headers already set on ``response`` (e.g. the next page cursor) are kept.
+    """
+    if not FAST_JSON:
+        return [model(**document) for document in documents]
+    return ORJSONResponse(_fast_rows(model, documents), headers=dict(response.headers))
+
+
+def render_model_list(model: Type[BaseModel], documents: Iterable[dict]) -> bytes:
+    """Serialized body ``model_list`` would send, for responses cached as bytes"""
+    if not FAST_JSON:
+        return JSONResponse(jsonable_encoder([model(**document) for document in documents])).body
+    return ORJSONResponse(_fast_rows(model, documents)).body
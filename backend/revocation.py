@@ -0,0 +1,67 @@
+"""In-memory token revocation list.
+
+Access tokens carry the user's ``tokenVersion`` and a unique ``jti``. Bumping
+``users.tokenVersion`` revokes every token issued before, and single tokens
+(e.g. on logout) are recorded in the ``token_revocations`` collection. Both are
+mirrored here so authorization never needs a database hit; the mirror is
+refreshed periodically so revocations made by other workers are picked up.
+
+Bumps also stamp ``tokenVersionChangedAt``. The first refresh loads every
+user with revoked tokens; later ones only ask for versions changed since the
+previous refresh, minus ``REVOCATION_REFRESH_OVERLAP_SECONDS`` to absorb
+clock skew between workers. Both walk a partial index holding only users
+whose tokens were ever revoked.
+"""
+
+import os
+import time
+from datetime import datetime, timedelta, timezone
+from typing import Dict, Optional
+
+REVOCATION_REFRESH_OVERLAP_SECONDS = float(os.getenv("REVOCATION_REFRESH_OVERLAP_SECONDS", "60"))
+
+
+class RevocationList:
+    def __init__(self):
+        self._min_versions: Dict[str, int] = {}
+        self._revoked_jtis: Dict[str, float] = {}
+        self._versions_since: Optional[datetime] = None
+        self.last_refresh: Optional[datetime] = None
+
+    def is_revoked(self, user_id: str, token_version: int, jti: Optional[str]) -> bool:
+        if token_version < self._min_versions.get(user_id, 0):
+            return True
+        return jti is not None and jti in self._revoked_jtis
+
+    def revoke_user(self, user_id: str, min_version: int) -> None:
+        if min_version > self._min_versions.get(user_id, 0):
+            self._min_versions[user_id] = min_version
+
+    def revoke_token(self, jti: str, expires_at: float) -> None:
+        self._revoked_jtis[jti] = expires_at
+
+    def _prune(self) -> None:
+        now = time.time()
+        self._revoked_jtis = {jti: exp for jti, exp in self._revoked_jtis.items() if exp > now}
+
+    async def refresh(self, users, token_revocations) -> None:
+        started = datetime.utcnow()
+        changed_since = None
+        if self._versions_since is not None:
+            changed_since = self._versions_since - timedelta(seconds=REVOCATION_REFRESH_OVERLAP_SECONDS)
+        async for user in users.revoked_token_versions(changed_since):
+            self.revoke_user(user["id"], user["tokenVersion"])
+        self._versions_since = started
+
+        async for entry in token_revocations.active(datetime.utcnow()):
+            self.revoke_token(entry["jti"], entry["expiresAt"].replace(tzinfo=timezone.utc).timestamp())
+
+        self._prune()
+        self.last_refresh = datetime.utcnow()
+
+    def stats(self) -> dict:
+        return {
+            "revokedUsers": len(self._min_versions),
+            "revokedTokens": len(self._revoked_jtis),
+            "lastRefresh": self.last_refresh.isoformat() if self.last_refresh else None,
+        }
@@ -0,0 +1,173 @@
+"""Background scheduler keeping tee times generated a rolling window ahead.
+
+Every ``TEE_TIME_HORIZON_CHECK_SECONDS`` the worker holding the lease tops up
+the next ``TEE_TIME_HORIZON_DAYS`` days with the schedule engine. Because the
+engine only writes what is missing, each run is incremental: usually just the
+day that entered the window. Runs are kept to quiet hours and write in small,
+paced batches so they do not compete with booking traffic; a run is forced
+outside quiet hours when the last successful one is older than
+``TEE_TIME_HORIZON_MAX_STALENESS_SECONDS`` (first run after startup included).
+
+In a multi-process deployment only one worker does the job: it holds a lease
+document in ``scheduler_leases`` that it renews on every tick and that other
+workers may take over once it expires.
+"""
+
+import asyncio
+import logging
+import os
+import socket
+import time
+import uuid
+from datetime import datetime, timedelta
+from typing import Awaitable, Callable, List, Optional, Tuple
+
+from pymongo import ReturnDocument
+from pymongo.errors import DuplicateKeyError
+
+from schedule import generate_tee_times, horizon
+
+logger = logging.getLogger(__name__)
+
+TEE_TIME_HORIZON_DAYS = int(os.getenv("TEE_TIME_HORIZON_DAYS", "30"))
+TEE_TIME_HORIZON_CHECK_SECONDS = float(os.getenv("TEE_TIME_HORIZON_CHECK_SECONDS", "900"))
+TEE_TIME_HORIZON_MAX_STALENESS_SECONDS = float(os.getenv("TEE_TIME_HORIZON_MAX_STALENESS_SECONDS", "86400"))
+# UTC hours, "start-end" with end exclusive, may wrap over midnight; empty means any time
+TEE_TIME_HORIZON_QUIET_HOURS = os.getenv("TEE_TIME_HORIZON_QUIET_HOURS", "1-6")
+TEE_TIME_HORIZON_BATCH_SIZE = int(os.getenv("TEE_TIME_HORIZON_BATCH_SIZE", "200"))
+TEE_TIME_HORIZON_PAUSE_SECONDS = float(os.getenv("TEE_TIME_HORIZON_PAUSE_SECONDS", "0.2"))
+
+LEASE_NAME = "tee_time_horizon"
+
+GeneratedCallback = Callable[[dict, list], Awaitable[None]]
+
+
+def parse_quiet_hours(value: str) -> Optional[Tuple[int, int]]:
+    if not value.strip():
+        return None
+    start, end = value.split("-")
+    return int(start) % 24, int(end) % 24
+
+
+def in_quiet_hours(quiet_hours: Optional[Tuple[int, int]], hour: int) -> bool:
+    if quiet_hours is None:
+        return True
+    start, end = quiet_hours
+    if start <= end:
+        return start <= hour < end
+    return hour >= start or hour < end
+
+
+class Lease:
+    """A named, expiring lock document shared by every worker"""
+
+    def __init__(self, db, name: str, ttl_seconds: float):
+        self.collection = db.scheduler_leases
+        self.name = name
+        self.ttl_seconds = ttl_seconds
+        self.owner = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+
+    async def acquire(self) -> bool:
+        """Take or renew the lease, returning whether this worker holds it"""
+        now = datetime.utcnow()
+        try:
+            lease = await self.collection.find_one_and_update(
+                {"_id": self.name, "$or": [{"owner": self.owner}, {"expiresAt": {"$lte": now}}]},
+                {"$set": {"owner": self.owner, "expiresAt": now + timedelta(seconds=self.ttl_seconds)}},
+                upsert=True,
+                return_document=ReturnDocument.AFTER
+            )
+        except DuplicateKeyError:
+            # The upsert lost against a live lease held by another worker
+            return False
+        return lease is not None and lease["owner"] == self.owner
+
+    async def release(self) -> None:
+        await self.collection.delete_one({"_id": self.name, "owner": self.owner})
+
+
+class RollingHorizon:
+    def __init__(
+        self,
+        db,
+        days: int = TEE_TIME_HORIZON_DAYS,
+        check_seconds: float = TEE_TIME_HORIZON_CHECK_SECONDS,
+        on_generated: Optional[GeneratedCallback] = None,
+    ):
+        self.db = db
+        self.days = days
+        self.check_seconds = check_seconds
+        self.on_generated = on_generated
+        self.quiet_hours = parse_quiet_hours(TEE_TIME_HORIZON_QUIET_HOURS)
+        # Outlives a tick so the holder keeps it between runs
+        self.lease = Lease(db, LEASE_NAME, 2 * check_seconds)
+        self.is_leader = False
+        self.last_run: Optional[datetime] = None
+        self.last_success: Optional[float] = None
+        self.last_duration: Optional[float] = None
+        self.last_created: Optional[int] = None
+        self.total_created = 0
+        self.last_error: Optional[str] = None
+
+    def _due(self) -> bool:
+        if self.last_success is None or time.monotonic() - self.last_success > TEE_TIME_HORIZON_MAX_STALENESS_SECONDS:
+            return True
+        return in_quiet_hours(self.quiet_hours, datetime.utcnow().hour)
+
+    async def top_up(self) -> dict:
+        days: List = horizon(None, self.days)
+        started = time.perf_counter()
+        self.last_run = datetime.utcnow()
+        report = await generate_tee_times(
+            self.db, days,
+            batch_size=TEE_TIME_HORIZON_BATCH_SIZE,
+            concurrency=1,
+            pause=TEE_TIME_HORIZON_PAUSE_SECONDS
+        )
+        self.last_duration = time.perf_counter() - started
+        self.last_created = report["created"]
+        self.total_created += report["created"]
+        self.last_success = time.monotonic()
+        self.last_error = None
+        if report["created"] and self.on_generated:
+            await self.on_generated(report, days)
+        return report
+
+    async def tick(self) -> Optional[dict]:
+        self.is_leader = await self.lease.acquire()
+        if not self.is_leader or not self._due():
+            return None
+        report = await self.top_up()
+        if report["created"]:
+            logger.info(
+                "Rolling horizon topped up %d tee times through %s in %.2fs",
+                report["created"], report["dateTo"], self.last_duration
+            )
+        return report
+
+    async def run(self):
+        while True:
+            try:
+                await self.tick()
+            except Exception as exc:
+                self.last_error = str(exc)
+                logger.exception("Failed to top up the tee-time horizon")
+            await asyncio.sleep(self.check_seconds)
+
+    async def stop(self) -> None:
+        """Hand the lease over right away instead of letting it expire"""
+        if self.is_leader:
+            self.is_leader = False
+            await self.lease.release()
+
+    def stats(self) -> dict:
+        return {
+            "days": self.days,
+            "checkSeconds": self.check_seconds,
+            "leader": self.is_leader,
+            "lastRun": self.last_run.isoformat() if self.last_run else None,
+            "lastDurationMs": round(self.last_duration * 1000, 3) if self.last_duration is not None else None,
+            "lastCreated": self.last_created,
+            "totalCreated": self.total_created,
+            "lastError": self.last_error,
+        }
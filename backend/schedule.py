@@ -0,0 +1,292 @@
+"""Bulk tee-time generation from per-course schedule templates.
+
+Each course may carry a ``ScheduleTemplate`` (opening hours, interval,
+closed weekdays, blackout dates, seasonal overrides). For a horizon the
+whole planned slot set is computed in memory in one pass, diffed against
+the slots already stored using a single aggregation, and only the missing
+ones are written - as unordered bulk upserts keyed on (courseId, date, time),
+several batches in flight at once. The unique ``courseId_date_time_unique``
+index keeps reruns and overlapping runs (the admin endpoint, the rolling
+horizon, the CLI) from duplicating slots: an upsert that loses the race to
+another run fails with a duplicate key and simply counts as existing.
+"""
+
+import asyncio
+import logging
+import os
+import time
+import uuid
+from datetime import date, datetime, timedelta
+from functools import lru_cache
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+from pymongo import UpdateOne
+from pymongo.errors import BulkWriteError, PyMongoError
+
+from models import OpeningWindow, ScheduleTemplate
+
+logger = logging.getLogger(__name__)
+
+GENERATION_BATCH_SIZE = int(os.getenv("TEE_TIME_GENERATION_BATCH_SIZE", "1000"))
+GENERATION_CONCURRENCY = int(os.getenv("TEE_TIME_GENERATION_CONCURRENCY", "4"))
+GENERATION_MAX_DAYS = int(os.getenv("TEE_TIME_GENERATION_MAX_DAYS", "400"))
+
+DUPLICATE_KEY = 11000
+SLOT_KEYS = [("courseId", 1), ("date", 1), ("time", 1)]
+
+DEFAULT_TEMPLATE = ScheduleTemplate()
+
+SlotKey = Tuple[str, str, str]
+
+
+def _minutes(value: str) -> int:
+    hours, minutes = value.split(":")
+    return int(hours) * 60 + int(minutes)
+
+
+@lru_cache(maxsize=256)
+def _slot_times(windows: Tuple[Tuple[str, str], ...], interval: int) -> Tuple[str, ...]:
+    times = []
+    for start, end in windows:
+        for minute in range(_minutes(start), _minutes(end) + 1, interval):
+            times.append(f"{minute // 60:02d}:{minute % 60:02d}")
+    return tuple(sorted(set(times)))
+
+
+def _window_key(windows: List[OpeningWindow]) -> Tuple[Tuple[str, str], ...]:
+    return tuple((window.start, window.end) for window in windows)
+
+
+def _in_season(month_day: str, start: str, end: str) -> bool:
+    if start <= end:
+        return start <= month_day <= end
+    # Season wrapping over the new year, e.g. 11-01 .. 02-28
+    return month_day >= start or month_day <= end
+
+
+def day_plan(template: ScheduleTemplate, day: date) -> Optional[Tuple[Tuple[str, ...], int]]:
+    """Tee times and capacity of ``day``, or None when the course is closed"""
+    date_str = day.strftime("%Y-%m-%d")
+    if date_str in template.blackoutDates or day.weekday() in template.closedWeekdays:
+        return None
+
+    windows, interval, max_slots = template.openingHours, template.intervalMinutes, template.maxSlots
+    month_day = date_str[5:]
+    for season in template.seasons:
+        if _in_season(month_day, season.startDate, season.endDate):
+            if season.closed:
+                return None
+            windows = season.openingHours or windows
+            interval = season.intervalMinutes or interval
+            max_slots = season.maxSlots or max_slots
+            break
+
+    return _slot_times(_window_key(windows), interval), max_slots
+
+
+def course_slots(course: dict, days: List[date]) -> Dict[SlotKey, int]:
+    template = ScheduleTemplate(**course["schedule"]) if course.get("schedule") else DEFAULT_TEMPLATE
+    slots = {}
+    for day in days:
+        plan = day_plan(template, day)
+        if plan is None:
+            continue
+        times, max_slots = plan
+        date_str = day.strftime("%Y-%m-%d")
+        for slot_time in times:
+            slots[(course["id"], date_str, slot_time)] = max_slots
+    return slots
+
+
+def planned_slots(courses: Iterable[dict], days: List[date]) -> Dict[SlotKey, int]:
+    """Every slot the templates call for over ``days``, mapped to its capacity.
+
+    A course whose stored template is invalid (saved before templates were
+    validated) is logged and skipped, so it cannot stop the other courses.
+    """
+    planned = {}
+    for course in courses:
+        try:
+            planned.update(course_slots(course, days))
+        except (ValueError, TypeError) as exc:
+            logger.error("Skipping tee-time generation for course %s, invalid schedule: %s", course.get("id"), exc)
+    return planned
+
+
+async def existing_slots(db, course_ids: List[str], date_from: str, date_to: str) -> Set[SlotKey]:
+    pipeline = [
+        {"$match": {"courseId": {"$in": course_ids}, "date": {"$gte": date_from, "$lte": date_to}}},
+        {"$group": {"_id": {"courseId": "$courseId", "date": "$date"}, "times": {"$addToSet": "$time"}}},
+    ]
+    existing = set()
+    async for row in db.tee_times.aggregate(pipeline):
+        course_id, date_str = row["_id"]["courseId"], row["_id"]["date"]
+        existing.update((course_id, date_str, slot_time) for slot_time in row["times"])
+    return existing
+
+
+def _upsert(key: SlotKey, max_slots: int, now: datetime) -> UpdateOne:
+    course_id, date_str, slot_time = key
+    return UpdateOne(
+        {"courseId": course_id, "date": date_str, "time": slot_time},
+        {"$setOnInsert": {
+            "id": str(uuid.uuid4()),
+            "maxSlots": max_slots,
+            "bookedSlots": 0,
+            "availableSlots": max_slots,
+            "createdAt": now,
+        }},
+        upsert=True,
+    )
+
+
+async def write_slots(
+    db,
+    slots: Dict[SlotKey, int],
+    batch_size: int = GENERATION_BATCH_SIZE,
+    concurrency: int = GENERATION_CONCURRENCY,
+    pause: float = 0.0,
+) -> int:
+    """Upsert ``slots`` in unordered batches, returning how many were created.
+
+    ``pause`` is slept after each batch by the worker that wrote it, to cap
+    the write rate of background runs.
+    """
+    now = datetime.utcnow()
+    operations = [_upsert(key, max_slots, now) for key, max_slots in sorted(slots.items())]
+    batches = [operations[i:i + batch_size] for i in range(0, len(operations), batch_size)]
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def write(batch) -> int:
+        async with semaphore:
+            try:
+                upserted = (await db.tee_times.bulk_write(batch, ordered=False)).upserted_count
+            except BulkWriteError as exc:
+                # Slots another run inserted first already exist; anything else is a real failure
+                if any(error["code"] != DUPLICATE_KEY for error in exc.details["writeErrors"]):
+                    raise
+                upserted = exc.details["nUpserted"]
+            if pause:
+                await asyncio.sleep(pause)
+            return upserted
+
+    return sum(await asyncio.gather(*(write(batch) for batch in batches)))
+
+
+def horizon(date_from: Optional[str], days: int) -> List[date]:
+    """Expand a start date and a number of days, raising ValueError on bad input"""
+    if days < 1:
+        raise ValueError("At least one day is required")
+    if days > GENERATION_MAX_DAYS:
+        raise ValueError(f"Generation is limited to {GENERATION_MAX_DAYS} days")
+    start = datetime.strptime(date_from, "%Y-%m-%d").date() if date_from else datetime.utcnow().date()
+    return [start + timedelta(days=offset) for offset in range(days)]
+
+
+async def generate_tee_times(
+    db,
+    days: List[date],
+    course_ids: Optional[List[str]] = None,
+    dry_run: bool = False,
+    batch_size: int = GENERATION_BATCH_SIZE,
+    concurrency: int = GENERATION_CONCURRENCY,
+    pause: float = 0.0,
+) -> dict:
+    started = time.perf_counter()
+    query = {"id": {"$in": course_ids}} if course_ids else {}
+    courses = await db.courses.find(query, {"_id": 0, "id": 1, "schedule": 1}).to_list(None)
+    ids = [course["id"] for course in courses]
+
+    planned = planned_slots(courses, days)
+    date_from, date_to = days[0].strftime("%Y-%m-%d"), days[-1].strftime("%Y-%m-%d")
+    existing = await existing_slots(db, ids, date_from, date_to) if ids else set()
+    missing = {key: max_slots for key, max_slots in planned.items() if key not in existing}
+
+    created = 0
+    if missing and not dry_run:
+        created = await write_slots(db, missing, batch_size, concurrency, pause)
+
+    return {
+        "courseIds": ids,
+        "dateFrom": date_from,
+        "dateTo": date_to,
+        "planned": len(planned),
+        "existing": len(planned) - len(missing),
+        "missing": len(missing),
+        "created": created,
+        "dryRun": dry_run,
+        "elapsedMs": round((time.perf_counter() - started) * 1000, 3),
+    }
+
+
+async def _merge_duplicate(db, keeper_id: str, duplicate_id: str) -> None:
+    """Delete a duplicate slot, moving its bookings and waitlist onto the kept one"""
+    duplicate = await db.tee_times.find_one_and_delete(
+        {"id": duplicate_id}, {"_id": 0, "bookedSlots": 1}
+    )
+    if not duplicate:
+        # Merged by another worker meanwhile
+        return
+
+    await db.bookings.update_many({"teeTimeId": duplicate_id}, {"$set": {"teeTimeId": keeper_id}})
+    moved = 0
+    async for entry in db.tee_time_waitlist.find({"teeTimeId": duplicate_id}, {"_id": 0, "id": 1, "userId": 1}):
+        if await db.tee_time_waitlist.count_documents({"teeTimeId": keeper_id, "userId": entry["userId"]}, limit=1):
+            # Queued on both copies: one entry is enough
+            await db.tee_time_waitlist.delete_one({"id": entry["id"]})
+            continue
+        await db.tee_time_waitlist.update_one({"id": entry["id"]}, {"$set": {"teeTimeId": keeper_id}})
+        moved += 1
+
+    # Bookings on both copies can take the kept one past capacity; it then simply stays full
+    booked = duplicate.get("bookedSlots", 0)
+    if booked or moved:
+        await db.tee_times.update_one(
+            {"id": keeper_id},
+            {"$inc": {"bookedSlots": booked, "availableSlots": -booked, "waitlistCount": moved}}
+        )
+
+
+async def migrate_unique_slots(db) -> int:
+    """Merge duplicate (courseId, date, time) slots and drop the old non-unique index.
+
+    Must run before the index manifest is applied, which then builds
+    ``courseId_date_time_unique``. Of each duplicate group the most booked
+    slot is kept. Returns how many duplicates were merged.
+    """
+    try:
+        indexes = await db.tee_times.index_information()
+    except PyMongoError as exc:
+        logger.error("Could not read tee_times indexes: %s", exc)
+        return 0
+
+    slot_indexes = {name: info for name, info in indexes.items() if [tuple(key) for key in info["key"]] == SLOT_KEYS}
+    if any(info.get("unique") for info in slot_indexes.values()):
+        return 0
+
+    merged = 0
+    groups = db.tee_times.aggregate([
+        {"$sort": {"bookedSlots": -1, "createdAt": 1, "id": 1}},
+        {"$group": {
+            "_id": {"courseId": "$courseId", "date": "$date", "time": "$time"},
+            "ids": {"$push": "$id"},
+            "count": {"$sum": 1},
+        }},
+        {"$match": {"count": {"$gt": 1}}},
+    ], allowDiskUse=True)
+    async for group in groups:
+        keeper_id, *duplicate_ids = group["ids"]
+        for duplicate_id in duplicate_ids:
+            await _merge_duplicate(db, keeper_id, duplicate_id)
+            merged += 1
+
+    for name in slot_indexes:
+        try:
+            await db.tee_times.drop_index(name)
+        except PyMongoError as exc:
+            # Already dropped by another worker
+            logger.info("Could not drop index tee_times.%s: %s", name, exc)
+
+    if merged:
+        logger.warning("Merged %d duplicate tee times before making their slots unique", merged)
+    return merged
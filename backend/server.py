@@ -1,26 +1,68 @@
-from fastapi import FastAPI, APIRouter, HTTPException, Depends, status
+from fastapi import (
+    FastAPI, APIRouter, HTTPException, Depends, Header, Query, Request, Response,
+    WebSocket, WebSocketDisconnect, status
+)
+from fastapi.encoders import jsonable_encoder
 from dotenv import load_dotenv
 from starlette.middleware.cors import CORSMiddleware
-from motor.motor_asyncio import AsyncIOMotorClient
+from starlette.responses import PlainTextResponse, StreamingResponse
+from pymongo.errors import DuplicateKeyError, PyMongoError
 import os
 import logging
 from pathlib import Path
-from typing import List
+from typing import List, Optional
 from datetime import datetime, timedelta
+import asyncio
 import uuid
 
 from models import (
     User, UserCreate, UserLogin, UserInDB, Token,
-    Course, CourseCreate,
-    TeeTime, TeeTimeCreate,
-    Booking, BookingCreate, BookingStatus,
-    Competition, CompetitionCreate, CompetitionStatus,
-    Subscription, SubscriptionCreate, SubscriptionStatus,
-    UserRole
+    Course, CourseCreate, ScheduleTemplate,
+    TeeTime, TeeTimeCreate, TeeTimeGenerationRequest,
+    Booking, BookingCreate, BookingStatus, WaitlistEntry, WaitlistEntryCreate,
+    Competition, CompetitionCreate, CompetitionStatus, CompetitionRegistration, RegistrationStatus,
+    Subscription, SubscriptionCreate,
+    UserRole, Principal, TokenData, UserStatusUpdate
 )
 from auth import (
-    get_password_hash, verify_password, create_access_token,
-    get_current_user, get_current_admin
+    hash_password_async, verify_password_async, create_user_access_token,
+    get_current_user, get_current_admin, get_current_principal, get_current_token,
+    invalidate_identity, revoke_user_tokens, revoke_access_token,
+    refresh_revocations_periodically, hashing_pool, identity_cache, revocation_list,
+    token_cache
+)
+from indexes import ensure_indexes
+from availability import (
+    AVAILABILITY_CACHE_SIZE, AVAILABILITY_CACHE_TTL_SECONDS, AvailabilityIndex, date_range
+)
+from schedule import generate_tee_times, horizon, migrate_unique_slots
+from rolling_horizon import RollingHorizon
+from registrations import migrate_embedded_participants, promote_waitlist
+from waitlist import WaitlistWorker
+from idempotency import IdempotencyKey, IdempotencyStore, REPLAYED_HEADER
+from catalog import CatalogCache, catalog_response
+from instrumentation import (
+    METRICS_CONTENT_TYPE, METRICS_TOKEN, SERVER_TIMING_HEADER,
+    CommandMetrics, InstrumentationMiddleware, RequestMetrics, render_metrics
+)
+from slow_queries import SlowQueryLog
+from database import PoolMetrics, create_client, replica_database
+from dashboard import DASHBOARD_REFRESH_SECONDS, DashboardSnapshot
+from events import STREAM_HEARTBEAT_SECONDS, availability_topic, create_broker, format_sse, user_topic
+from images import (
+    ORIGINAL, THUMBNAIL, ImageStore, ImageTooLarge, InvalidImage, decode_base64_image, image_url,
+    migrate_inline_profile_images
+)
+from exports import (
+    EXPORT_BATCH_SIZE, EXPORT_DATASETS, MAX_EXPORT_BATCH_SIZE, MEDIA_TYPES,
+    ExportFormat, build_export_cursor, stream_export
+)
+from responses import default_response_class, model_list
+from pagination import DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE, NEXT_CURSOR_HEADER, set_next_cursor
+from repositories import (
+    BookingRepository, CompetitionRepository, CourseRepository, RegistrationRepository,
+    SubscriptionRepository, TeeTimeRepository, TokenRevocationRepository, UserRepository,
+    WaitlistRepository
 )
 
 ROOT_DIR = Path(__file__).parent
@@ -28,11 +70,16 @@ load_dotenv(ROOT_DIR / '.env')
 
 # MongoDB connection
 mongo_url = os.environ['MONGO_URL']
-client = AsyncIOMotorClient(mongo_url)
+command_metrics = CommandMetrics()
+slow_query_log = SlowQueryLog()
+pool_metrics = PoolMetrics()
+client = create_client(mongo_url, [command_metrics, slow_query_log, pool_metrics])
 db = client[os.environ['DB_NAME']]
+# Catalog, dashboard, export and admin list reads, which tolerate replication lag
+replica_db = replica_database(client, os.environ['DB_NAME'])
 
 # Create the main app
-app = FastAPI(title="TeeBook API")
+app = FastAPI(title="TeeBook API", default_response_class=default_response_class())
 
 # Create a router with the /api prefix
 api_router = APIRouter(prefix="/api")
@@ -44,13 +91,73 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+# Handlers only reach the database through these
+users = UserRepository(db)
+courses = CourseRepository(db)
+tee_times = TeeTimeRepository(db)
+bookings = BookingRepository(db)
+competitions = CompetitionRepository(db)
+registrations = RegistrationRepository(db)
+subscriptions = SubscriptionRepository(db)
+waitlist = WaitlistRepository(db)
+token_revocations = TokenRevocationRepository(db)
+catalog_courses = CourseRepository(replica_db)
+catalog_competitions = CompetitionRepository(replica_db)
+admin_users = UserRepository(replica_db)
+admin_bookings = BookingRepository(replica_db)
+admin_subscriptions = SubscriptionRepository(replica_db)
+
+PageLimit = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE)
+
+dashboard_snapshot = DashboardSnapshot(DASHBOARD_REFRESH_SECONDS)
+availability_index = AvailabilityIndex(AVAILABILITY_CACHE_SIZE, AVAILABILITY_CACHE_TTL_SECONDS)
+availability_broker = create_broker(db)
+image_store = ImageStore(db)
+idempotency = IdempotencyStore(db)
+catalog = CatalogCache()
+
+async def _tee_times_generated(report: dict, days: list):
+    """Drop cached availability of the days new tee times were generated for"""
+    for course_id in report["courseIds"]:
+        for day in days:
+            availability_index.invalidate(course_id, day.strftime("%Y-%m-%d"))
+
+rolling_horizon = RollingHorizon(db, on_generated=_tee_times_generated)
+
+async def _tee_time_slots_changed(
+    tee_time: dict, tee_time_id: str, delta: int, booked_delta: Optional[int] = None
+):
+    """Propagate a slot change to the search cache and live streams.
+
+    ``tee_time`` is the document as it was before ``delta`` players were freed
+    (positive) or taken (negative). Booked slots move the other way unless
+    ``booked_delta`` says otherwise, e.g. when held slots go back on sale.
+    """
+    availability_index.apply(tee_time["courseId"], tee_time["date"], tee_time_id, delta, booked_delta)
+    await availability_broker.publish(
+        availability_topic(tee_time["courseId"], tee_time["date"]),
+        {
+            "type": "availability",
+            "teeTimeId": tee_time_id,
+            "courseId": tee_time["courseId"],
+            "date": tee_time["date"],
+            "time": tee_time["time"],
+            "availableSlots": tee_time["availableSlots"] + delta,
+            "bookedSlots": tee_time["bookedSlots"] + (-delta if booked_delta is None else booked_delta)
+        }
+    )
+
+waitlist_worker = WaitlistWorker(tee_times, waitlist, bookings, _tee_time_slots_changed, availability_broker)
+
+async def _tee_time_snapshot(course_id: str, date: str) -> list:
+    return jsonable_encoder([TeeTime(**tee_time) for tee_time in await tee_times.day(course_id, date)])
+
 # ============= AUTH ROUTES =============
 
 @api_router.post("/auth/register", response_model=Token, status_code=status.HTTP_201_CREATED)
 async def register(user_data: UserCreate):
     # Check if user already exists
-    existing_user = await db.users.find_one({"email": user_data.email})
-    if existing_user:
+    if await users.email_exists(user_data.email):
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="Email already registered"
@@ -58,7 +165,7 @@ async def register(user_data: UserCreate):
     
     # Create user
     user_id = str(uuid.uuid4())
-    hashed_password = get_password_hash(user_data.password)
+    hashed_password = await hash_password_async(user_data.password)
     
     user_dict = {
         "id": user_id,
@@ -68,14 +175,22 @@ async def register(user_data: UserCreate):
         "handicapIndex": user_data.handicapIndex,
         "role": user_data.role,
         "hashedPassword": hashed_password,
+        "tokenVersion": 0,
         "createdAt": datetime.utcnow(),
         "isActive": True
     }
     
-    await db.users.insert_one(user_dict)
+    try:
+        await users.insert(user_dict)
+    except DuplicateKeyError:
+        # Lost a race against a concurrent registration, caught by the unique email index
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Email already registered"
+        )
     
     # Create access token
-    access_token = create_access_token(data={"sub": user_data.email})
+    access_token = create_user_access_token(user_dict)
     
     user = User(
         id=user_id,
@@ -91,7 +206,7 @@ async def register(user_data: UserCreate):
 @api_router.post("/auth/login", response_model=Token)
 async def login(credentials: UserLogin):
     # Find user
-    user_dict = await db.users.find_one({"email": credentials.email})
+    user_dict = await users.find_for_login(credentials.email)
     if not user_dict:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
@@ -99,7 +214,7 @@ async def login(credentials: UserLogin):
         )
     
     # Verify password
-    if not verify_password(credentials.password, user_dict["hashedPassword"]):
+    if not await verify_password_async(credentials.password, user_dict["hashedPassword"]):
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Incorrect email or password"
@@ -113,7 +228,7 @@ async def login(credentials: UserLogin):
         )
     
     # Create access token
-    access_token = create_access_token(data={"sub": credentials.email})
+    access_token = create_user_access_token(user_dict)
     
     user = User(
         id=user_dict["id"],
@@ -123,14 +238,20 @@ async def login(credentials: UserLogin):
         handicapIndex=user_dict.get("handicapIndex"),
         role=user_dict["role"],
         createdAt=user_dict["createdAt"],
-        isActive=user_dict.get("isActive", True)
+        isActive=user_dict.get("isActive", True),
+        profileImage=image_url(user_dict.get("profileImageId"))
     )
     
     return Token(access_token=access_token, token_type="bearer", user=user)
 
+@api_router.post("/auth/logout")
+async def logout(token_data: TokenData = Depends(get_current_token)):
+    await revoke_access_token(token_data)
+    return {"message": "Logged out successfully"}
+
 @api_router.get("/auth/me", response_model=User)
 async def get_current_user_info(current_user_email: str = Depends(get_current_user)):
-    user_dict = await db.users.find_one({"email": current_user_email})
+    user_dict = await users.find_profile_by_email(current_user_email)
     if not user_dict:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -146,29 +267,66 @@ async def get_current_user_info(current_user_email: str = Depends(get_current_us
         role=user_dict["role"],
         createdAt=user_dict["createdAt"],
         isActive=user_dict.get("isActive", True),
-        profileImage=user_dict.get("profileImage")
+        profileImage=image_url(user_dict.get("profileImageId"))
     )
 
 @api_router.put("/auth/profile-image")
 async def update_profile_image(
-    profile_image: str,
-    current_user_email: str = Depends(get_current_user)
+    request: Request,
+    principal: Principal = Depends(get_current_principal)
 ):
-    """Update user profile image (base64)"""
-    user_dict = await db.users.find_one({"email": current_user_email})
-    if not user_dict:
+    """Update user profile image.
+
+    Accepts a raw image body, a multipart ``file`` upload or, for older
+    clients, JSON ``{"profile_image": "<base64 or data URI>"}``.
+    """
+    content_type = request.headers.get("content-type", "")
+    try:
+        if content_type.startswith("multipart/form-data"):
+            form = await request.form()
+            upload = form.get("file")
+            if upload is None or isinstance(upload, str):
+                raise InvalidImage("Missing file field")
+            data = await upload.read()
+        elif content_type.startswith("application/json"):
+            payload = await request.json()
+            data = decode_base64_image(str(payload.get("profile_image", "")))
+        else:
+            data = await request.body()
+        digest = await image_store.save(data)
+    except ImageTooLarge as exc:
         raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="User not found"
+            status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+            detail=str(exc)
+        )
+    except InvalidImage as exc:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(exc)
         )
     
-    # Update profile image
-    await db.users.update_one(
-        {"email": current_user_email},
-        {"$set": {"profileImage": profile_image}}
-    )
+    await users.set_profile_image(principal.id, digest)
+    invalidate_identity(principal.email)
+    
+    return {"message": "Profile image updated successfully", "profileImage": image_url(digest)}
+
+@api_router.get("/images/{digest}")
+async def get_image(digest: str, request: Request, size: str = Query(THUMBNAIL, pattern=f"^({ORIGINAL}|{THUMBNAIL})$")):
+    # Content addressed: a given URL always serves the same bytes
+    etag = f'"{digest}-{size}"'
+    headers = {"ETag": etag, "Cache-Control": "public, max-age=31536000, immutable"}
+    if request.headers.get("if-none-match") == etag:
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+    
+    image = await image_store.load(digest, size)
+    if image is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Image not found"
+        )
     
-    return {"message": "Profile image updated successfully"}
+    data, media_type = image
+    return Response(content=data, media_type=media_type, headers=headers)
 
 # ============= COURSES ROUTES =============
 
@@ -184,13 +342,33 @@ async def create_course(
         "createdAt": datetime.utcnow()
     }
     
-    await db.courses.insert_one(course_dict)
+    await courses.insert(course_dict)
+    catalog.invalidate("courses")
     return Course(**course_dict)
 
 @api_router.get("/courses", response_model=List[Course])
-async def get_courses():
-    courses = await db.courses.find().to_list(1000)
-    return [Course(**course) for course in courses]
+async def get_courses(request: Request, limit: int = PageLimit, after: Optional[str] = None):
+    page = await catalog.get(
+        "courses", (limit, after), Course,
+        lambda primary: (courses if primary else catalog_courses).page(limit, after)
+    )
+    return catalog_response(request, page)
+
+@api_router.put("/courses/{course_id}/schedule", response_model=Course)
+async def update_course_schedule(
+    course_id: str,
+    schedule: Optional[ScheduleTemplate] = None,
+    _: str = Depends(get_current_admin)
+):
+    """Set the template tee times are generated from (no body resets to the defaults)"""
+    course = await courses.set_schedule(course_id, schedule.dict() if schedule else None)
+    if not course:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Course not found"
+        )
+    catalog.invalidate("courses")
+    return Course(**course)
 
 # ============= TEE TIMES ROUTES =============
 
@@ -208,44 +386,228 @@ async def create_tee_time(
         "createdAt": datetime.utcnow()
     }
     
-    await db.tee_times.insert_one(tee_time_dict)
+    await tee_times.insert(tee_time_dict)
+    availability_index.invalidate(tee_time_dict["courseId"], tee_time_dict["date"])
     return TeeTime(**tee_time_dict)
 
 @api_router.get("/tee-times", response_model=List[TeeTime])
-async def get_tee_times(date: str = None, courseId: str = None):
-    query = {}
-    if date:
-        query["date"] = date
-    if courseId:
-        query["courseId"] = courseId
+async def get_tee_times(
+    response: Response,
+    date: str = None,
+    courseId: str = None,
+    limit: int = PageLimit,
+    after: Optional[str] = None
+):
+    page, next_cursor = await tee_times.page(limit, after, course_id=courseId, date=date)
+    set_next_cursor(response, next_cursor)
+    return model_list(TeeTime, page, response)
+
+@api_router.get("/tee-times/search", response_model=List[TeeTime])
+async def search_tee_times(
+    response: Response,
+    dateFrom: str,
+    dateTo: Optional[str] = None,
+    timeFrom: Optional[str] = Query(None, pattern=r"^\d{2}:\d{2}$"),
+    timeTo: Optional[str] = Query(None, pattern=r"^\d{2}:\d{2}$"),
+    minSlots: int = Query(1, ge=1),
+    courseIds: Optional[List[str]] = Query(None),
+    limit: int = PageLimit
+):
+    """Bookable tee times across courses and days, ordered by date and time"""
+    try:
+        dates = date_range(dateFrom, dateTo or dateFrom)
+    except ValueError as exc:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(exc)
+        )
+    
+    if not courseIds:
+        courseIds = await courses.ids()
+    
+    matches = await availability_index.search(tee_times, courseIds, dates, minSlots, timeFrom, timeTo, limit)
+    return model_list(TeeTime, matches, response)
+
+@api_router.get("/tee-times/stream")
+async def stream_tee_time_availability(request: Request, courseId: str, date: str):
+    """Server-sent events: a snapshot of the day, then one event per availability change"""
+    async def events():
+        with availability_broker.subscribe(availability_topic(courseId, date)) as subscription:
+            yield format_sse("snapshot", await _tee_time_snapshot(courseId, date))
+            while not await request.is_disconnected():
+                event = await subscription.get(timeout=STREAM_HEARTBEAT_SECONDS)
+                if event is None:
+                    yield b": keep-alive\n\n"
+                else:
+                    yield format_sse("availability", event)
+    
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+@api_router.websocket("/tee-times/stream")
+async def stream_tee_time_availability_ws(websocket: WebSocket, courseId: str, date: str):
+    """WebSocket flavour of the availability stream, for clients without EventSource"""
+    await websocket.accept()
+    with availability_broker.subscribe(availability_topic(courseId, date)) as subscription:
+        await websocket.send_json({"type": "snapshot", "teeTimes": await _tee_time_snapshot(courseId, date)})
+        receiver = asyncio.create_task(websocket.receive())
+        getter = None
+        try:
+            while True:
+                if getter is None:
+                    getter = asyncio.create_task(subscription.get(timeout=STREAM_HEARTBEAT_SECONDS))
+                await asyncio.wait({receiver, getter}, return_when=asyncio.FIRST_COMPLETED)
+                if receiver.done():
+                    if receiver.result()["type"] == "websocket.disconnect":
+                        break
+                    # Clients have nothing to say on this channel, ignore anything they send
+                    receiver = asyncio.create_task(websocket.receive())
+                if getter.done():
+                    await websocket.send_json(getter.result() or {"type": "ping"})
+                    getter = None
+        except WebSocketDisconnect:
+            pass
+        finally:
+            receiver.cancel()
+            if getter is not None:
+                getter.cancel()
+
+@api_router.post(
+    "/tee-times/{tee_time_id}/waitlist", response_model=WaitlistEntry, status_code=status.HTTP_201_CREATED
+)
+async def join_tee_time_waitlist(
+    tee_time_id: str,
+    entry_data: WaitlistEntryCreate,
+    principal: Principal = Depends(get_current_principal),
+    idempotency_key: Optional[str] = IdempotencyKey
+):
+    return await idempotency.run(
+        idempotency_key, principal.id, f"tee-times/{tee_time_id}/waitlist", entry_data,
+        lambda: _join_tee_time_waitlist(tee_time_id, entry_data, principal), status.HTTP_201_CREATED
+    )
+
+async def _join_tee_time_waitlist(
+    tee_time_id: str, entry_data: WaitlistEntryCreate, principal: Principal
+) -> WaitlistEntry:
+    if entry_data.playersCount < 1:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="At least one player is required"
+        )
+    
+    if not await tee_times.join_waitlist(tee_time_id, entry_data.playersCount):
+        if not await tee_times.exists(tee_time_id):
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="Tee time not found"
+            )
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Enough slots available, book the tee time directly"
+        )
+    
+    entry_dict = {
+        "id": str(uuid.uuid4()),
+        "teeTimeId": tee_time_id,
+        "userId": principal.id,
+        **entry_data.dict(),
+        "createdAt": datetime.utcnow()
+    }
+    
+    try:
+        await waitlist.insert(entry_dict)
+    except DuplicateKeyError:
+        await tee_times.leave_waitlist(tee_time_id)
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Already on the waitlist for this tee time"
+        )
+    except PyMongoError:
+        await tee_times.leave_waitlist(tee_time_id)
+        raise
+    
+    # Slots may have been put back on sale while this party was queuing
+    waitlist_worker.notify(tee_time_id)
+    return WaitlistEntry(**entry_dict)
+
+@api_router.get("/tee-times/waitlist/my", response_model=List[WaitlistEntry])
+async def get_my_waitlist_entries(
+    response: Response,
+    limit: int = PageLimit,
+    after: Optional[str] = None,
+    principal: Principal = Depends(get_current_principal)
+):
+    page, next_cursor = await waitlist.page(limit, after, user_id=principal.id)
+    set_next_cursor(response, next_cursor)
+    return model_list(WaitlistEntry, page, response)
+
+@api_router.get("/tee-times/waitlist/stream")
+async def stream_waitlist_promotions(request: Request, principal: Principal = Depends(get_current_principal)):
+    """Server-sent events: one event each time one of the player's waitlist entries is booked"""
+    async def events():
+        with availability_broker.subscribe(user_topic(principal.id)) as subscription:
+            while not await request.is_disconnected():
+                event = await subscription.get(timeout=STREAM_HEARTBEAT_SECONDS)
+                if event is None:
+                    yield b": keep-alive\n\n"
+                else:
+                    yield format_sse(event["type"], event)
+    
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+@api_router.delete("/tee-times/waitlist/{entry_id}")
+async def leave_tee_time_waitlist(
+    entry_id: str,
+    principal: Principal = Depends(get_current_principal)
+):
+    entry = await waitlist.remove(entry_id, principal.id)
+    if not entry:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Waitlist entry not found"
+        )
     
-    tee_times = await db.tee_times.find(query).to_list(1000)
-    return [TeeTime(**tee_time) for tee_time in tee_times]
+    await tee_times.leave_waitlist(entry["teeTimeId"])
+    # Slots held for this party may now be free for the next one, or for sale
+    waitlist_worker.notify(entry["teeTimeId"])
+    
+    return {"message": "Left the waitlist"}
 
 # ============= BOOKINGS ROUTES =============
 
 @api_router.post("/bookings", response_model=Booking, status_code=status.HTTP_201_CREATED)
 async def create_booking(
     booking_data: BookingCreate,
-    current_user_email: str = Depends(get_current_user)
+    principal: Principal = Depends(get_current_principal),
+    idempotency_key: Optional[str] = IdempotencyKey
 ):
-    # Get user info
-    user_dict = await db.users.find_one({"email": current_user_email})
-    if not user_dict:
+    return await idempotency.run(
+        idempotency_key, principal.id, "bookings", booking_data,
+        lambda: _create_booking(booking_data, principal), status.HTTP_201_CREATED
+    )
+
+async def _create_booking(booking_data: BookingCreate, principal: Principal) -> Booking:
+    if booking_data.playersCount < 1:
         raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="User not found"
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="At least one player is required"
         )
     
-    # Check tee time availability
-    tee_time = await db.tee_times.find_one({"id": booking_data.teeTimeId})
+    # Reserve the slots atomically, the conditional update is the single source of truth
+    tee_time = await tee_times.reserve(booking_data.teeTimeId, booking_data.playersCount)
     if not tee_time:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="Tee time not found"
-        )
-    
-    if tee_time["availableSlots"] < booking_data.playersCount:
+        if not await tee_times.exists(booking_data.teeTimeId):
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="Tee time not found"
+            )
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="Not enough available slots"
@@ -255,80 +617,59 @@ async def create_booking(
     booking_id = str(uuid.uuid4())
     booking_dict = {
         "id": booking_id,
-        "userId": user_dict["id"],
+        "userId": principal.id,
         **booking_data.dict(),
         "status": BookingStatus.CONFIRMED,
         "createdAt": datetime.utcnow()
     }
     
-    await db.bookings.insert_one(booking_dict)
-    
-    # Update tee time slots
-    await db.tee_times.update_one(
-        {"id": booking_data.teeTimeId},
-        {
-            "$inc": {
-                "bookedSlots": booking_data.playersCount,
-                "availableSlots": -booking_data.playersCount
-            }
-        }
-    )
+    try:
+        await bookings.insert(booking_dict)
+    except PyMongoError:
+        # Hand the reserved slots back so a failed insert never leaks capacity
+        await tee_times.release(booking_data.teeTimeId, booking_data.playersCount)
+        raise
     
+    await _tee_time_slots_changed(tee_time, booking_data.teeTimeId, -booking_data.playersCount)
     return Booking(**booking_dict)
 
 @api_router.get("/bookings", response_model=List[Booking])
-async def get_user_bookings(current_user_email: str = Depends(get_current_user)):
-    user_dict = await db.users.find_one({"email": current_user_email})
-    if not user_dict:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="User not found"
-        )
-    
-    bookings = await db.bookings.find({"userId": user_dict["id"]}).to_list(1000)
-    return [Booking(**booking) for booking in bookings]
+async def get_user_bookings(
+    response: Response,
+    limit: int = PageLimit,
+    after: Optional[str] = None,
+    principal: Principal = Depends(get_current_principal)
+):
+    page, next_cursor = await bookings.page(limit, after, user_id=principal.id)
+    set_next_cursor(response, next_cursor)
+    return model_list(Booking, page, response)
 
 @api_router.delete("/bookings/{booking_id}")
 async def cancel_booking(
     booking_id: str,
-    current_user_email: str = Depends(get_current_user)
+    principal: Principal = Depends(get_current_principal)
 ):
-    user_dict = await db.users.find_one({"email": current_user_email})
-    if not user_dict:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="User not found"
-        )
-    
-    booking = await db.bookings.find_one({"id": booking_id, "userId": user_dict["id"]})
+    # Only the cancellation that flips the status restores the slots
+    booking = await bookings.cancel(booking_id, principal.id)
     if not booking:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="Booking not found"
-        )
-    
-    if booking["status"] == BookingStatus.CANCELLED:
+        if not await bookings.exists(booking_id, principal.id):
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="Booking not found"
+            )
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="Booking already cancelled"
         )
     
-    # Update booking status
-    await db.bookings.update_one(
-        {"id": booking_id},
-        {"$set": {"status": BookingStatus.CANCELLED}}
-    )
-    
-    # Restore tee time slots
-    await db.tee_times.update_one(
-        {"id": booking["teeTimeId"]},
-        {
-            "$inc": {
-                "bookedSlots": -booking["playersCount"],
-                "availableSlots": booking["playersCount"]
-            }
-        }
-    )
+    # Restore tee time slots, held for the waitlist when anyone is queued
+    tee_time = await tee_times.release_to_waitlist(booking["teeTimeId"], booking["playersCount"])
+    if tee_time and tee_time.get("waitlistCount"):
+        waitlist_worker.notify(booking["teeTimeId"])
+        # Held, so still off sale, but no longer booked
+        await _tee_time_slots_changed(tee_time, booking["teeTimeId"], 0, booked_delta=-booking["playersCount"])
+    elif tee_time:
+        await _tee_time_slots_changed(tee_time, booking["teeTimeId"], booking["playersCount"])
     
     return {"message": "Booking cancelled successfully"}
 
@@ -343,86 +684,98 @@ async def create_competition(
     competition_dict = {
         "id": competition_id,
         **competition_data.dict(),
-        "participants": [],
+        "participantsCount": 0,
         "status": CompetitionStatus.UPCOMING,
         "createdAt": datetime.utcnow()
     }
     
-    await db.competitions.insert_one(competition_dict)
+    await competitions.insert(competition_dict)
+    catalog.invalidate("competitions")
     return Competition(**competition_dict)
 
 @api_router.get("/competitions", response_model=List[Competition])
-async def get_competitions():
-    competitions = await db.competitions.find().to_list(1000)
-    return [Competition(**competition) for competition in competitions]
+async def get_competitions(request: Request, limit: int = PageLimit, after: Optional[str] = None):
+    page = await catalog.get(
+        "competitions", (limit, after), Competition,
+        lambda primary: (competitions if primary else catalog_competitions).page(limit, after)
+    )
+    return catalog_response(request, page)
+
+@api_router.get("/competitions/registrations/my", response_model=List[CompetitionRegistration])
+async def get_my_registrations(
+    response: Response,
+    limit: int = PageLimit,
+    after: Optional[str] = None,
+    principal: Principal = Depends(get_current_principal)
+):
+    page, next_cursor = await registrations.page(limit, after, user_id=principal.id)
+    set_next_cursor(response, next_cursor)
+    return model_list(CompetitionRegistration, page, response)
 
 @api_router.post("/competitions/{competition_id}/register")
 async def register_for_competition(
     competition_id: str,
-    current_user_email: str = Depends(get_current_user)
+    principal: Principal = Depends(get_current_principal),
+    idempotency_key: Optional[str] = IdempotencyKey
 ):
-    user_dict = await db.users.find_one({"email": current_user_email})
-    if not user_dict:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="User not found"
-        )
-    
-    competition = await db.competitions.find_one({"id": competition_id})
-    if not competition:
+    return await idempotency.run(
+        idempotency_key, principal.id, f"competitions/{competition_id}/register", None,
+        lambda: _register_for_competition(competition_id, principal)
+    )
+
+async def _register_for_competition(competition_id: str, principal: Principal) -> dict:
+    if not await competitions.exists(competition_id):
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Competition not found"
         )
     
-    if user_dict["id"] in competition["participants"]:
+    # Everyone joins the waitlist, the unique index rejects a second entry
+    registration_id = str(uuid.uuid4())
+    try:
+        await registrations.insert({
+            "id": registration_id,
+            "competitionId": competition_id,
+            "userId": principal.id,
+            "status": RegistrationStatus.WAITLISTED,
+            "createdAt": datetime.utcnow()
+        })
+    except DuplicateKeyError:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="Already registered for this competition"
         )
     
-    if len(competition["participants"]) >= competition["maxParticipants"]:
-        raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail="Competition is full"
-        )
-    
-    await db.competitions.update_one(
-        {"id": competition_id},
-        {"$push": {"participants": user_dict["id"]}}
-    )
+    # Places go to the waitlist in arrival order, possibly to this entry
+    await promote_waitlist(competitions, registrations, competition_id)
+    catalog.invalidate("competitions")
     
-    return {"message": "Successfully registered for competition"}
+    if await registrations.status(registration_id) == RegistrationStatus.REGISTERED:
+        return {"message": "Successfully registered for competition", "status": RegistrationStatus.REGISTERED}
+    return {"message": "Competition is full, added to the waitlist", "status": RegistrationStatus.WAITLISTED}
 
 @api_router.delete("/competitions/{competition_id}/unregister")
 async def unregister_from_competition(
     competition_id: str,
-    current_user_email: str = Depends(get_current_user)
+    principal: Principal = Depends(get_current_principal)
 ):
-    user_dict = await db.users.find_one({"email": current_user_email})
-    if not user_dict:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="User not found"
-        )
-    
-    competition = await db.competitions.find_one({"id": competition_id})
-    if not competition:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="Competition not found"
-        )
-    
-    if user_dict["id"] not in competition["participants"]:
+    # Only the request that deletes the entry gives the place back
+    registration = await registrations.remove(competition_id, principal.id)
+    if not registration:
+        if not await competitions.exists(competition_id):
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="Competition not found"
+            )
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="Not registered for this competition"
         )
     
-    await db.competitions.update_one(
-        {"id": competition_id},
-        {"$pull": {"participants": user_dict["id"]}}
-    )
+    if registration.get("status", RegistrationStatus.REGISTERED) == RegistrationStatus.REGISTERED:
+        await competitions.release_place(competition_id)
+        await promote_waitlist(competitions, registrations, competition_id)
+        catalog.invalidate("competitions")
     
     return {"message": "Successfully unregistered from competition"}
 
@@ -440,26 +793,31 @@ async def create_subscription(
         "createdAt": datetime.utcnow()
     }
     
-    await db.subscriptions.insert_one(subscription_dict)
+    await subscriptions.insert(subscription_dict)
     return Subscription(**subscription_dict)
 
 @api_router.get("/subscriptions/my", response_model=List[Subscription])
-async def get_my_subscriptions(current_user_email: str = Depends(get_current_user)):
-    user_dict = await db.users.find_one({"email": current_user_email})
-    if not user_dict:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="User not found"
-        )
-    
-    subscriptions = await db.subscriptions.find({"userId": user_dict["id"]}).to_list(1000)
-    return [Subscription(**subscription) for subscription in subscriptions]
+async def get_my_subscriptions(
+    response: Response,
+    limit: int = PageLimit,
+    after: Optional[str] = None,
+    principal: Principal = Depends(get_current_principal)
+):
+    page, next_cursor = await subscriptions.page(limit, after, user_id=principal.id)
+    set_next_cursor(response, next_cursor)
+    return model_list(Subscription, page, response)
 
 # ============= ADMIN ROUTES =============
 
 @api_router.get("/admin/users", response_model=List[User])
-async def get_all_users(_: str = Depends(get_current_admin)):
-    users = await db.users.find().to_list(1000)
+async def get_all_users(
+    response: Response,
+    limit: int = PageLimit,
+    after: Optional[str] = None,
+    _: str = Depends(get_current_admin)
+):
+    page, next_cursor = await admin_users.page(limit, after)
+    set_next_cursor(response, next_cursor)
     return [User(
         id=user["id"],
         email=user["email"],
@@ -468,31 +826,130 @@ async def get_all_users(_: str = Depends(get_current_admin)):
         handicapIndex=user.get("handicapIndex"),
         role=user["role"],
         createdAt=user["createdAt"],
-        isActive=user.get("isActive", True)
-    ) for user in users]
+        isActive=user.get("isActive", True),
+        profileImage=image_url(user.get("profileImageId"))
+    ) for user in page]
+
+@api_router.put("/admin/users/{user_id}/status")
+async def update_user_status(
+    user_id: str,
+    status_data: UserStatusUpdate,
+    _: str = Depends(get_current_admin)
+):
+    email = await users.set_active(user_id, status_data.isActive)
+    if not email:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="User not found"
+        )
+    
+    invalidate_identity(email)
+    # Disabled accounts lose every token issued so far
+    if not status_data.isActive:
+        await revoke_user_tokens(user_id)
+    
+    return {"message": "User status updated successfully"}
 
 @api_router.get("/admin/bookings", response_model=List[Booking])
-async def get_all_bookings(_: str = Depends(get_current_admin)):
-    bookings = await db.bookings.find().to_list(1000)
-    return [Booking(**booking) for booking in bookings]
+async def get_all_bookings(
+    response: Response,
+    limit: int = PageLimit,
+    after: Optional[str] = None,
+    _: str = Depends(get_current_admin)
+):
+    page, next_cursor = await admin_bookings.page(limit, after)
+    set_next_cursor(response, next_cursor)
+    return model_list(Booking, page, response)
 
 @api_router.get("/admin/subscriptions", response_model=List[Subscription])
-async def get_all_subscriptions(_: str = Depends(get_current_admin)):
-    subscriptions = await db.subscriptions.find().to_list(1000)
-    return [Subscription(**subscription) for subscription in subscriptions]
+async def get_all_subscriptions(
+    response: Response,
+    limit: int = PageLimit,
+    after: Optional[str] = None,
+    _: str = Depends(get_current_admin)
+):
+    page, next_cursor = await admin_subscriptions.page(limit, after)
+    set_next_cursor(response, next_cursor)
+    return model_list(Subscription, page, response)
+
+@api_router.get("/admin/export/{dataset}")
+async def export_collection(
+    dataset: str,
+    format: ExportFormat = ExportFormat.NDJSON,
+    batchSize: int = Query(EXPORT_BATCH_SIZE, ge=1, le=MAX_EXPORT_BATCH_SIZE),
+    dateFrom: Optional[datetime] = None,
+    dateTo: Optional[datetime] = None,
+    _: str = Depends(get_current_admin)
+):
+    """Stream a whole admin collection as NDJSON or CSV, optionally limited to a createdAt range"""
+    if dataset not in EXPORT_DATASETS:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Unknown export dataset"
+        )
+    
+    cursor = build_export_cursor(replica_db, dataset, batchSize, dateFrom, dateTo)
+    filename = f"{dataset}-{datetime.utcnow():%Y%m%d%H%M%S}.{format.value}"
+    return StreamingResponse(
+        stream_export(cursor, dataset, format, batchSize),
+        media_type=MEDIA_TYPES[format],
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'}
+    )
 
 @api_router.get("/admin/dashboard")
-async def get_dashboard_stats(_: str = Depends(get_current_admin)):
-    total_users = await db.users.count_documents({})
-    total_bookings = await db.bookings.count_documents({"status": BookingStatus.CONFIRMED})
-    active_subscriptions = await db.subscriptions.count_documents({"status": SubscriptionStatus.ACTIVE})
-    upcoming_competitions = await db.competitions.count_documents({"status": CompetitionStatus.UPCOMING})
+async def get_dashboard_stats(refresh: bool = False, _: str = Depends(get_current_admin)):
+    if refresh:
+        return await dashboard_snapshot.refresh(replica_db)
+    return await dashboard_snapshot.get(replica_db)
+
+@api_router.post("/admin/tee-times/generate")
+async def generate_course_tee_times(
+    generation: TeeTimeGenerationRequest,
+    _: str = Depends(get_current_admin)
+):
+    """Create every missing tee time the course templates call for over a horizon"""
+    try:
+        days = horizon(generation.dateFrom, generation.days)
+    except ValueError as exc:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(exc)
+        )
     
+    report = await generate_tee_times(db, days, generation.courseIds, generation.dryRun)
+    if report["created"]:
+        await _tee_times_generated(report, days)
+    return report
+
+@api_router.get("/admin/indexes")
+async def get_index_report(_: str = Depends(get_current_admin)):
+    return await ensure_indexes(db, create=False)
+
+@api_router.get("/admin/slow-queries")
+async def get_slow_queries(
+    limit: int = PageLimit,
+    _: str = Depends(get_current_admin)
+):
+    """Slow MongoDB query shapes, costliest in total first"""
+    return slow_query_log.report(limit)
+
+@api_router.get("/admin/metrics")
+async def get_runtime_metrics(_: str = Depends(get_current_admin)):
     return {
-        "totalUsers": total_users,
-        "totalBookings": total_bookings,
-        "activeSubscriptions": active_subscriptions,
-        "upcomingCompetitions": upcoming_competitions
+        "hashing": hashing_pool.stats(),
+        "identityCache": identity_cache.stats(),
+        "revocations": revocation_list.stats(),
+        "tokenCache": token_cache.stats(),
+        "dashboard": dashboard_snapshot.stats(),
+        "availabilityCache": availability_index.stats(),
+        "availabilityStream": availability_broker.stats(),
+        "teeTimeHorizon": rolling_horizon.stats(),
+        "waitlist": waitlist_worker.stats(),
+        "idempotency": idempotency.stats(),
+        "catalogCache": catalog.stats(),
+        "mongo": command_metrics.stats(),
+        "mongoPool": pool_metrics.stats(),
+        "slowQueries": slow_query_log.stats()
     }
 
 # Include the router in the main app
@@ -504,8 +961,54 @@ app.add_middleware(
     allow_origins=["*"],
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=[NEXT_CURSOR_HEADER, REPLAYED_HEADER, "ETag", SERVER_TIMING_HEADER],
 )
 
+# Outermost, so the timings include every other middleware
+request_metrics = RequestMetrics()
+app.add_middleware(InstrumentationMiddleware, metrics=request_metrics)
+
+@app.get("/metrics", include_in_schema=False)
+async def get_prometheus_metrics(authorization: Optional[str] = Header(None)):
+    """Request and MongoDB metrics in the Prometheus text format"""
+    if METRICS_TOKEN and authorization != f"Bearer {METRICS_TOKEN}":
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Invalid metrics token"
+        )
+    
+    return PlainTextResponse(
+        render_metrics(request_metrics, command_metrics, pool_metrics), media_type=METRICS_CONTENT_TYPE
+    )
+
+@app.on_event("startup")
+async def apply_index_manifest():
+    # Duplicate slots would keep the unique slot index from being built
+    await migrate_unique_slots(db)
+    report = await ensure_indexes(db)
+    logger.info(
+        "Index manifest applied: %d created, %d drifted, %d errors",
+        len(report["created"]), len(report["drift"]), len(report["errors"])
+    )
+
+@app.on_event("startup")
+async def start_background_tasks():
+    await availability_broker.start()
+    app.state.background_tasks = [
+        asyncio.create_task(refresh_revocations_periodically(users, token_revocations)),
+        asyncio.create_task(dashboard_snapshot.run(replica_db)),
+        asyncio.create_task(migrate_inline_profile_images(db, image_store)),
+        asyncio.create_task(migrate_embedded_participants(db)),
+        asyncio.create_task(rolling_horizon.run()),
+        asyncio.create_task(waitlist_worker.run()),
+        asyncio.create_task(slow_query_log.run(client)),
+    ]
+
 @app.on_event("shutdown")
 async def shutdown_db_client():
+    for task in app.state.background_tasks:
+        task.cancel()
+    await availability_broker.stop()
+    await rolling_horizon.stop()
     client.close()
+    hashing_pool.shutdown()
@@ -0,0 +1,288 @@
+"""Slow MongoDB operation log with sampled explain plans.
+
+``SlowQueryLog`` is a pymongo command listener like ``CommandMetrics``. Any
+command slower than ``SLOW_QUERY_THRESHOLD_MS`` is logged with its collection,
+duration and query shape: the filter, sort and pipeline with every value
+replaced by ``"?"``, so the same query with different dates or ids lands
+under one shape. Shapes are aggregated (count, total and max time) and
+``/admin/slow-queries`` lists them by total time, which ranks missing
+indexes by what they actually cost.
+
+The first slow run of a shape, and then at most one per
+``SLOW_QUERY_EXPLAIN_INTERVAL_SECONDS``, is re-run through ``explain``
+(query planner only, nothing executes) and the winning plan is attached to
+the shape, e.g. ``FETCH <- IXSCAN courseId_1_date_1`` or ``COLLSCAN``.
+Listeners run on Motor's executor threads and cannot await, so the explains
+are queued to ``run`` on the event loop.
+"""
+
+import asyncio
+import json
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Tuple
+
+from pymongo import monitoring
+from pymongo.errors import PyMongoError
+
+logger = logging.getLogger(__name__)
+
+# Negative disables the log
+SLOW_QUERY_THRESHOLD_MS = float(os.getenv("SLOW_QUERY_THRESHOLD_MS", "100"))
+SLOW_QUERY_EXPLAIN_INTERVAL_SECONDS = float(os.getenv("SLOW_QUERY_EXPLAIN_INTERVAL_SECONDS", "300"))
+SLOW_QUERY_MAX_SHAPES = int(os.getenv("SLOW_QUERY_MAX_SHAPES", "500"))
+SLOW_QUERY_EXPLAIN_QUEUE_SIZE = 100
+
+PLACEHOLDER = "?"
+
+# Commands whose plan explain can show
+EXPLAINABLE = {"find", "aggregate", "count", "distinct", "findAndModify", "update", "delete"}
+# Driver and session fields that explain does not accept inside the wrapped command
+COMMAND_METADATA = {
+    "lsid", "$db", "$clusterTime", "$readPreference", "txnNumber", "autocommit",
+    "startTransaction", "readConcern", "writeConcern", "$readConcern", "apiVersion",
+    "apiStrict", "apiDeprecationErrors", "cursor", "bypassDocumentValidation", "ordered",
+}
+
+
+def query_shape(value: Any) -> Any:
+    """``value`` with its structure kept and every literal replaced by a placeholder"""
+    if isinstance(value, dict):
+        return {key: query_shape(item) for key, item in value.items()}
+    if isinstance(value, (list, tuple)) and value and all(isinstance(item, dict) for item in value):
+        # $and / $or branches; lists of literals ($in, $nin) collapse to one placeholder
+        return [query_shape(item) for item in value]
+    return PLACEHOLDER
+
+
+def pipeline_shape(pipeline: List[dict]) -> List[Any]:
+    """Stages that decide the plan keep their shape, the others only their name"""
+    stages = []
+    for stage in pipeline:
+        name = next(iter(stage), "")
+        if name == "$match":
+            stages.append({name: query_shape(stage[name])})
+        elif name == "$sort":
+            stages.append(stage)
+        else:
+            stages.append(name)
+    return stages
+
+
+def command_shape(name: str, command: dict) -> Any:
+    if name == "find":
+        return {"filter": query_shape(command.get("filter", {})), "sort": command.get("sort")}
+    if name == "aggregate":
+        return {"pipeline": pipeline_shape(command.get("pipeline", []))}
+    if name in ("count", "findAndModify"):
+        return {"query": query_shape(command.get("query", {})), "sort": command.get("sort")}
+    if name == "distinct":
+        return {"key": command.get("key"), "query": query_shape(command.get("query", {}))}
+    if name == "update":
+        return {"q": [query_shape(update.get("q", {})) for update in command.get("updates", [])[:1]]}
+    if name == "delete":
+        return {"q": [query_shape(delete.get("q", {})) for delete in command.get("deletes", [])[:1]]}
+    return None
+
+
+def explainable_command(name: str, command: dict) -> Optional[dict]:
+    """The command stripped down to what explain accepts, or None"""
+    if name not in EXPLAINABLE:
+        return None
+    explained = {key: value for key, value in command.items() if key not in COMMAND_METADATA}
+    # Multi-statement writes explain one statement at a time
+    for field in ("updates", "deletes"):
+        if field in explained:
+            explained[field] = explained[field][:1]
+    return explained
+
+
+def command_name(command: dict) -> str:
+    return next(iter(command), "")
+
+
+def _find_query_planner(document: Any) -> Optional[dict]:
+    if isinstance(document, dict):
+        if "queryPlanner" in document:
+            return document["queryPlanner"]
+        children = document.values()
+    elif isinstance(document, list):
+        children = document
+    else:
+        return None
+    for child in children:
+        planner = _find_query_planner(child)
+        if planner is not None:
+            return planner
+    return None
+
+
+def plan_summary(explain: dict) -> Optional[str]:
+    """The winning plan as a chain of stages, e.g. ``FETCH <- IXSCAN courseId_1_date_1``"""
+    planner = _find_query_planner(explain)
+    if not planner:
+        return None
+    stage = planner.get("winningPlan", {})
+    # Slot-based engine plans nest the classic-looking tree one level down
+    stage = stage.get("queryPlan", stage)
+    steps = []
+    while stage:
+        step = stage.get("stage", "?")
+        if stage.get("indexName"):
+            step += f" {stage['indexName']}"
+        steps.append(step)
+        children = stage.get("inputStages") or [stage.get("inputStage")]
+        stage = children[0] if children[0] else None
+    return " <- ".join(steps)
+
+
+class SlowQueryLog(monitoring.CommandListener):
+    def __init__(
+        self,
+        threshold_ms: float = SLOW_QUERY_THRESHOLD_MS,
+        explain_interval: float = SLOW_QUERY_EXPLAIN_INTERVAL_SECONDS,
+        max_shapes: int = SLOW_QUERY_MAX_SHAPES,
+    ):
+        self.threshold_ms = threshold_ms
+        self.explain_interval = explain_interval
+        self.max_shapes = max_shapes
+        self._lock = threading.Lock()
+        self._started: Dict[Tuple[int, object], Tuple[str, dict]] = {}
+        self._shapes: "OrderedDict[str, dict]" = OrderedDict()
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._explains: Optional[asyncio.Queue] = None
+        self.slow = 0
+        self.explained = 0
+        self.dropped_explains = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.threshold_ms >= 0
+
+    @staticmethod
+    def _key(event) -> Tuple[int, object]:
+        return event.request_id, event.connection_id
+
+    def started(self, event) -> None:
+        if self.enabled and event.command_name != "explain":
+            with self._lock:
+                self._started[self._key(event)] = (event.database_name, event.command)
+
+    def succeeded(self, event) -> None:
+        self._finish(event)
+
+    def failed(self, event) -> None:
+        self._finish(event)
+
+    def _finish(self, event) -> None:
+        with self._lock:
+            started = self._started.pop(self._key(event), None)
+        duration_ms = event.duration_micros / 1000
+        if started is None or duration_ms < self.threshold_ms:
+            return
+
+        database, command = started
+        name = event.command_name
+        target = command.get(name)
+        collection = target if isinstance(target, str) else command.get("collection", "")
+        shape = command_shape(name, command)
+        logger.warning(
+            "Slow MongoDB %s on %s.%s took %.1fms: %s",
+            name, database, collection, duration_ms, json.dumps(shape, default=str)
+        )
+
+        key = json.dumps([name, collection, shape], default=str)
+        now = time.time()
+        with self._lock:
+            self.slow += 1
+            entry = self._shapes.pop(key, None)
+            if entry is None:
+                entry = {
+                    "command": name,
+                    "collection": collection,
+                    "shape": shape,
+                    "count": 0,
+                    "totalMs": 0.0,
+                    "maxMs": 0.0,
+                    "plan": None,
+                    "explainedAt": None,
+                    "_explainRequested": 0.0,
+                }
+                if len(self._shapes) >= self.max_shapes:
+                    self._shapes.popitem(last=False)
+            self._shapes[key] = entry
+            entry["count"] += 1
+            entry["totalMs"] += duration_ms
+            entry["maxMs"] = max(entry["maxMs"], duration_ms)
+            entry["lastSeen"] = now
+            explain = now - entry["_explainRequested"] >= self.explain_interval
+            if explain:
+                entry["_explainRequested"] = now
+
+        explainable = explainable_command(name, command) if explain else None
+        if explainable is not None:
+            self._queue_explain(key, database, explainable)
+
+    def _queue_explain(self, key: str, database: str, command: dict) -> None:
+        if self._loop is None or self._loop.is_closed():
+            return
+
+        def put():
+            try:
+                self._explains.put_nowait((key, database, command))
+            except asyncio.QueueFull:
+                self.dropped_explains += 1
+        self._loop.call_soon_threadsafe(put)
+
+    async def explain(self, client, key: str, database: str, command: dict) -> Optional[str]:
+        result = await client[database].command({"explain": command, "verbosity": "queryPlanner"})
+        plan = plan_summary(result)
+        with self._lock:
+            entry = self._shapes.get(key)
+            if entry is not None:
+                entry["plan"] = plan
+                entry["explainedAt"] = time.time()
+        self.explained += 1
+        logger.warning("Slow MongoDB %s on %s winning plan: %s", command_name(command), database, plan)
+        return plan
+
+    async def run(self, client):
+        """Explain queued slow commands; started with the app's background tasks"""
+        self._loop = asyncio.get_running_loop()
+        self._explains = asyncio.Queue(SLOW_QUERY_EXPLAIN_QUEUE_SIZE)
+        while True:
+            key, database, command = await self._explains.get()
+            try:
+                await self.explain(client, key, database, command)
+            except PyMongoError as exc:
+                logger.info("Could not explain slow MongoDB command: %s", exc)
+            except Exception:
+                logger.exception("Failed to explain a slow MongoDB command")
+
+    def report(self, limit: int = 50) -> List[dict]:
+        """Aggregated shapes, costliest first"""
+        with self._lock:
+            entries = [dict(entry) for entry in self._shapes.values()]
+        entries.sort(key=lambda entry: entry["totalMs"], reverse=True)
+        report = []
+        for entry in entries[:limit]:
+            entry.pop("_explainRequested")
+            entry["meanMs"] = round(entry["totalMs"] / entry["count"], 3)
+            entry["totalMs"] = round(entry["totalMs"], 3)
+            entry["maxMs"] = round(entry["maxMs"], 3)
+            report.append(entry)
+        return report
+
+    def stats(self) -> dict:
+        with self._lock:
+            shapes = len(self._shapes)
+        return {
+            "thresholdMs": self.threshold_ms,
+            "slow": self.slow,
+            "shapes": shapes,
+            "explained": self.explained,
+            "droppedExplains": self.dropped_explains,
+        }
@@ -0,0 +1,172 @@
+"""Tee-time waitlist promotion, off the request path.
+
+Parties queue for a full tee time in ``tee_time_waitlist``. When a booking is
+cancelled on a tee time with a queue, the same atomic update that frees the
+slots moves them to ``heldSlots`` instead of back on sale, so nobody browsing
+can grab them, and the cancellation only drops the tee time id on this
+worker's queue. The worker books waiting parties in arrival order, skipping
+parties larger than what is free, then puts held slots nobody could use back
+on sale. A periodic sweep picks up held slots whose wake-up was lost, e.g.
+when a worker died mid-run.
+
+Every promotion is published twice on the events broker: to the promoted
+player's topic, so their app learns they got in, and as an availability
+change, so open streams see the new booked count even when the slots came
+from the held ones and availability did not move.
+"""
+
+import asyncio
+import logging
+import os
+import time
+import uuid
+from datetime import datetime
+from typing import Awaitable, Callable, Optional, Set
+
+from pymongo.errors import DuplicateKeyError, PyMongoError
+
+from events import LocalBroker, user_topic
+from models import BookingStatus
+
+logger = logging.getLogger(__name__)
+
+WAITLIST_SCAN_LIMIT = int(os.getenv("WAITLIST_SCAN_LIMIT", "50"))
+WAITLIST_SWEEP_SECONDS = float(os.getenv("WAITLIST_SWEEP_SECONDS", "60"))
+
+SlotsChangedCallback = Callable[..., Awaitable[None]]
+
+
+class WaitlistWorker:
+    def __init__(
+        self, tee_times, waitlist, bookings, on_slots_changed: SlotsChangedCallback, broker: LocalBroker
+    ):
+        self.tee_times = tee_times
+        self.waitlist = waitlist
+        self.bookings = bookings
+        self.on_slots_changed = on_slots_changed
+        self.broker = broker
+        self._queue: asyncio.Queue = asyncio.Queue()
+        self._pending: Set[str] = set()
+        self.promoted = 0
+        self.released = 0
+        self.last_duration: Optional[float] = None
+
+    def notify(self, tee_time_id: str) -> None:
+        """Ask for a promotion pass over ``tee_time_id``, coalescing repeats"""
+        if tee_time_id not in self._pending:
+            self._pending.add(tee_time_id)
+            self._queue.put_nowait(tee_time_id)
+
+    async def _requeue(self, entry: dict) -> None:
+        try:
+            await self.waitlist.insert(entry)
+        except DuplicateKeyError:
+            # The player queued again meanwhile, which counted a second party
+            await self.tee_times.leave_waitlist(entry["teeTimeId"])
+
+    async def _promote(self, entry: dict) -> Optional[dict]:
+        """Book one waiting party, returning the booking or None when it did not fit"""
+        entry = await self.waitlist.take(entry["id"])
+        if not entry:
+            # Left the waitlist, or promoted by another worker
+            return None
+
+        tee_time_id, players = entry["teeTimeId"], entry["playersCount"]
+        on_sale = False
+        tee_time = await self.tee_times.claim_held(tee_time_id, players)
+        if not tee_time:
+            tee_time = await self.tee_times.reserve(tee_time_id, players)
+            on_sale = True
+        if not tee_time:
+            await self._requeue(entry)
+            return None
+
+        booking = {
+            "id": str(uuid.uuid4()),
+            "userId": entry["userId"],
+            "teeTimeId": tee_time_id,
+            "playersCount": players,
+            "guestPlayers": entry["guestPlayers"],
+            "status": BookingStatus.CONFIRMED,
+            "createdAt": datetime.utcnow()
+        }
+        try:
+            await self.bookings.insert(booking)
+        except PyMongoError:
+            # Still counted as queued, so released slots are held again
+            if on_sale:
+                await self.tee_times.release(tee_time_id, players)
+            else:
+                await self.tee_times.release_to_waitlist(tee_time_id, players)
+            await self._requeue(entry)
+            raise
+
+        await self.tee_times.leave_waitlist(tee_time_id)
+        if on_sale:
+            await self.on_slots_changed(tee_time, tee_time_id, -players)
+        else:
+            # Held slots were already off sale, only the booked count moves
+            await self.on_slots_changed(tee_time, tee_time_id, 0, booked_delta=players)
+        await self.broker.publish(user_topic(entry["userId"]), {
+            "type": "waitlistPromoted",
+            "entryId": entry["id"],
+            "bookingId": booking["id"],
+            "teeTimeId": tee_time_id,
+            "courseId": tee_time["courseId"],
+            "date": tee_time["date"],
+            "time": tee_time["time"],
+            "playersCount": players,
+        })
+        return booking
+
+    async def process(self, tee_time_id: str) -> int:
+        """Promote what fits on one tee time, returning how many parties got in"""
+        promoted = 0
+        free = await self.tee_times.free_slots(tee_time_id)
+        if free:
+            for entry in await self.waitlist.queue(tee_time_id, WAITLIST_SCAN_LIMIT):
+                if entry["playersCount"] > free:
+                    continue
+                booking = await self._promote(entry)
+                if booking:
+                    promoted += 1
+                    free -= booking["playersCount"]
+                    logger.info("Promoted waitlist entry %s to booking %s", entry["id"], booking["id"])
+                if not free:
+                    break
+
+        tee_time = await self.tee_times.release_held(tee_time_id)
+        if tee_time:
+            self.released += tee_time["heldSlots"]
+            await self.on_slots_changed(tee_time, tee_time_id, tee_time["heldSlots"], booked_delta=0)
+
+        self.promoted += promoted
+        return promoted
+
+    async def sweep(self) -> None:
+        for tee_time_id in await self.tee_times.with_held_slots():
+            self.notify(tee_time_id)
+
+    async def run(self):
+        while True:
+            try:
+                try:
+                    tee_time_id = await asyncio.wait_for(self._queue.get(), WAITLIST_SWEEP_SECONDS)
+                except asyncio.TimeoutError:
+                    await self.sweep()
+                    continue
+                self._pending.discard(tee_time_id)
+                started = time.perf_counter()
+                await self.process(tee_time_id)
+                self.last_duration = time.perf_counter() - started
+            except Exception:
+                logger.exception("Failed to promote the tee-time waitlist")
+                await asyncio.sleep(1)
+
+    def stats(self) -> dict:
+        return {
+            "pending": len(self._pending),
+            "promoted": self.promoted,
+            "releasedSlots": self.released,
+            "lastDurationMs": round(self.last_duration * 1000, 3) if self.last_duration is not None else None,
+        }
@@ -449,7 +449,7 @@ def test_competitions_endpoints():
         if response and response.status_code == 200:
             competitions = response.json()
             competition = next((comp for comp in competitions if comp["id"] == competition_id), None)
-            if competition and len(competition["participants"]) == 1:
+            if competition and competition["participantsCount"] == 1:
                 print("  ✅ Participant added correctly")
             else:
                 print("  ❌ Participant not added properly")
@@ -490,7 +490,7 @@ def test_competition_unregister():
         if response and response.status_code == 200:
             competitions = response.json()
             competition = next((comp for comp in competitions if comp["id"] == competition_id), None)
-            if competition and len(competition["participants"]) == 0:
+            if competition and competition["participantsCount"] == 0:
                 print("  ✅ Participant removed correctly")
             else:
                 print("  ❌ Participant not removed properly")
@@ -42,9 +42,23 @@ export default function BookingsScreen() {
   }, [activeTab]);
 
   useEffect(() => {
-    if (selectedCourse && selectedDate) {
-      loadTeeTimes();
+    if (!selectedCourse || !selectedDate) {
+      return;
     }
+    loadTeeTimes();
+    // Keep slots up to date from the server instead of refetching
+    return bookingService.subscribeToAvailability(
+      selectedCourse.id,
+      selectedDate,
+      setTeeTimes,
+      (event) => {
+        setTeeTimes(current => current.map(teeTime =>
+          teeTime.id === event.teeTimeId
+            ? { ...teeTime, availableSlots: event.availableSlots, bookedSlots: event.bookedSlots }
+            : teeTime
+        ));
+      }
+    );
   }, [selectedCourse, selectedDate]);
 
   const loadCourses = async () => {
@@ -97,9 +111,31 @@ export default function BookingsScreen() {
     setRefreshing(false);
   };
 
+  const joinWaitlist = (teeTime: TeeTime, players: number, guests: GuestPlayer[]) => {
+    Alert.alert(
+      'Liste d\'attente',
+      `Le créneau de ${teeTime.time} n'a pas assez de places. Voulez-vous rejoindre la liste d'attente ? Votre réservation sera créée automatiquement dès qu'une place se libère.`,
+      [
+        { text: 'Annuler', style: 'cancel' },
+        {
+          text: 'Rejoindre',
+          onPress: async () => {
+            try {
+              await bookingService.joinWaitlist(teeTime.id, { playersCount: players, guestPlayers: guests });
+              Alert.alert('Succès', 'Vous êtes sur la liste d\'attente');
+              setShowBookingModal(false);
+            } catch (error: any) {
+              Alert.alert('Erreur', error.response?.data?.detail || 'Impossible de rejoindre la liste d\'attente');
+            }
+          }
+        }
+      ]
+    );
+  };
+
   const handleBookTeeTime = (teeTime: TeeTime) => {
     if (teeTime.availableSlots === 0) {
-      Alert.alert('Complet', 'Ce créneau est complet');
+      joinWaitlist(teeTime, 1, []);
       return;
     }
     setSelectedTeeTime(teeTime);
@@ -134,7 +170,7 @@ export default function BookingsScreen() {
     if (!selectedTeeTime) return;
 
     if (playersCount > selectedTeeTime.availableSlots) {
-      Alert.alert('Erreur', `Seulement ${selectedTeeTime.availableSlots} place(s) disponible(s)`);
+      joinWaitlist(selectedTeeTime, playersCount, guestPlayers.filter(g => g.name.trim() !== ''));
       return;
     }
 
@@ -147,7 +183,6 @@ export default function BookingsScreen() {
       });
       Alert.alert('Succès', 'Réservation confirmée!');
       setShowBookingModal(false);
-      loadTeeTimes();
     } catch (error: any) {
       Alert.alert('Erreur', error.response?.data?.detail || 'Impossible de créer la réservation');
     } finally {
@@ -250,7 +285,6 @@ export default function BookingsScreen() {
               key={teeTime.id}
               style={styles.teeTimeCard}
               onPress={() => handleBookTeeTime(teeTime)}
-              disabled={teeTime.availableSlots === 0}
             >
               <View style={styles.teeTimeLeft}>
                 <Ionicons name="time" size={24} color="#10b981" />
@@ -261,7 +295,9 @@ export default function BookingsScreen() {
                   styles.teeTimeSlots,
                   teeTime.availableSlots === 0 && styles.teeTimeFull
                 ]}>
-                  {teeTime.availableSlots === 0 ? 'Complet' : `${teeTime.availableSlots} place(s)`}
+                  {teeTime.availableSlots === 0
+                    ? `Complet${teeTime.waitlistCount > 0 ? ` · ${teeTime.waitlistCount} en attente` : ''}`
+                    : `${teeTime.availableSlots} place(s)`}
                 </Text>
                 <Ionicons
                   name={teeTime.availableSlots === 0 ? 'close-circle' : 'chevron-forward'}
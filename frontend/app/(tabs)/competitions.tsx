@@ -13,12 +13,11 @@ import {
 import { Ionicons } from '@expo/vector-icons';
 import { format, parseISO, isFuture } from 'date-fns';
 import { fr } from 'date-fns/locale';
-import { competitionService, Competition } from '../../services/competitionService';
-import { useAuth } from '../../contexts/AuthContext';
+import { competitionService, Competition, CompetitionRegistration } from '../../services/competitionService';
 
 export default function CompetitionsScreen() {
-  const { user } = useAuth();
   const [competitions, setCompetitions] = useState<Competition[]>([]);
+  const [entries, setEntries] = useState<Map<string, CompetitionRegistration['status']>>(new Map());
   const [loading, setLoading] = useState(false);
   const [refreshing, setRefreshing] = useState(false);
 
@@ -29,7 +28,11 @@ export default function CompetitionsScreen() {
   const loadCompetitions = async () => {
     try {
       setLoading(true);
-      const data = await competitionService.getCompetitions();
+      const [data, registrations] = await Promise.all([
+        competitionService.getCompetitions(),
+        competitionService.getMyRegistrations()
+      ]);
+      setEntries(new Map(registrations.map((registration) => [registration.competitionId, registration.status])));
       // Sort by date (upcoming first)
       const sorted = data.sort((a, b) => new Date(a.date).getTime() - new Date(b.date).getTime());
       setCompetitions(sorted);
@@ -47,28 +50,38 @@ export default function CompetitionsScreen() {
   };
 
   const isRegistered = (competition: Competition) => {
-    return competition.participants.includes(user?.id || '');
+    return entries.get(competition.id) === 'registered';
+  };
+
+  const isWaitlisted = (competition: Competition) => {
+    return entries.get(competition.id) === 'waitlisted';
   };
 
   const isFull = (competition: Competition) => {
-    return competition.participants.length >= competition.maxParticipants;
+    return competition.participantsCount >= competition.maxParticipants;
   };
 
   const handleRegister = async (competition: Competition) => {
-    if (isRegistered(competition)) {
+    if (isRegistered(competition) || isWaitlisted(competition)) {
       // Unregister
+      const waitlisted = isWaitlisted(competition);
       Alert.alert(
-        'Se désinscrire',
-        `Êtes-vous sûr de vouloir vous désinscrire de "${competition.name}" ?`,
+        waitlisted ? 'Quitter la liste d\'attente' : 'Se désinscrire',
+        waitlisted
+          ? `Êtes-vous sûr de vouloir quitter la liste d'attente de "${competition.name}" ?`
+          : `Êtes-vous sûr de vouloir vous désinscrire de "${competition.name}" ?`,
         [
           { text: 'Annuler', style: 'cancel' },
           {
-            text: 'Se désinscrire',
+            text: waitlisted ? 'Quitter' : 'Se désinscrire',
             style: 'destructive',
             onPress: async () => {
               try {
                 await competitionService.unregisterFromCompetition(competition.id);
-                Alert.alert('Succès', 'Vous êtes désinscrit de la compétition');
+                Alert.alert(
+                  'Succès',
+                  waitlisted ? 'Vous avez quitté la liste d\'attente' : 'Vous êtes désinscrit de la compétition'
+                );
                 loadCompetitions();
               } catch (error: any) {
                 Alert.alert('Erreur', error.response?.data?.detail || 'Impossible de se désinscrire');
@@ -78,23 +91,26 @@ export default function CompetitionsScreen() {
         ]
       );
     } else {
-      // Register
-      if (isFull(competition)) {
-        Alert.alert('Complet', 'Cette compétition est complète');
-        return;
-      }
-
+      // Register, or join the waitlist when the competition is full
+      const full = isFull(competition);
       Alert.alert(
-        'Inscription',
-        `Voulez-vous vous inscrire à "${competition.name}" ?${competition.entryFee > 0 ? `\n\nDroit de jeu: ${competition.entryFee} FCFA` : ''}`,
+        full ? 'Liste d\'attente' : 'Inscription',
+        full
+          ? `"${competition.name}" est complète. Voulez-vous rejoindre la liste d'attente ? Vous serez inscrit automatiquement dès qu'une place se libère.`
+          : `Voulez-vous vous inscrire à "${competition.name}" ?${competition.entryFee > 0 ? `\n\nDroit de jeu: ${competition.entryFee} FCFA` : ''}`,
         [
           { text: 'Annuler', style: 'cancel' },
           {
-            text: 'S\'inscrire',
+            text: full ? 'Rejoindre' : 'S\'inscrire',
             onPress: async () => {
               try {
-                await competitionService.registerForCompetition(competition.id);
-                Alert.alert('Succès', 'Vous êtes inscrit à la compétition!');
+                const status = await competitionService.registerForCompetition(competition.id);
+                Alert.alert(
+                  'Succès',
+                  status === 'waitlisted'
+                    ? 'Vous êtes sur la liste d\'attente'
+                    : 'Vous êtes inscrit à la compétition!'
+                );
                 loadCompetitions();
               } catch (error: any) {
                 Alert.alert('Erreur', error.response?.data?.detail || 'Impossible de s\'inscrire');
@@ -123,6 +139,8 @@ export default function CompetitionsScreen() {
 
   const renderCompetition = (competition: Competition) => {
     const registered = isRegistered(competition);
+    const waitlisted = isWaitlisted(competition);
+    const entered = registered || waitlisted;
     const full = isFull(competition);
     const upcoming = isFuture(parseISO(competition.date));
 
@@ -153,7 +171,7 @@ export default function CompetitionsScreen() {
           <View style={styles.detailRow}>
             <Ionicons name="people" size={16} color="#6b7280" />
             <Text style={styles.detailText}>
-              {competition.participants.length} / {competition.maxParticipants} participants
+              {competition.participantsCount} / {competition.maxParticipants} participants
             </Text>
           </View>
 
@@ -172,26 +190,35 @@ export default function CompetitionsScreen() {
           </View>
         )}
 
+        {waitlisted && (
+          <View style={[styles.registeredBanner, styles.waitlistedBanner]}>
+            <Ionicons name="time" size={16} color="#f59e0b" />
+            <Text style={[styles.registeredText, styles.waitlistedText]}>Vous êtes sur la liste d'attente</Text>
+          </View>
+        )}
+
         {upcoming && competition.status === 'upcoming' && (
           <TouchableOpacity
             style={[
               styles.actionButton,
-              registered ? styles.unregisterButton : styles.registerButton,
-              (!registered && full) && styles.buttonDisabled
+              entered ? styles.unregisterButton : styles.registerButton
             ]}
             onPress={() => handleRegister(competition)}
-            disabled={!registered && full}
           >
             <Ionicons
-              name={registered ? 'close-circle' : 'add-circle'}
+              name={entered ? 'close-circle' : 'add-circle'}
               size={20}
-              color={registered ? '#ef4444' : '#ffffff'}
+              color={entered ? '#ef4444' : '#ffffff'}
             />
             <Text style={[
               styles.actionButtonText,
-              registered && styles.unregisterButtonText
+              entered && styles.unregisterButtonText
             ]}>
-              {registered ? 'Se désinscrire' : full ? 'Complet' : 'S\'inscrire'}
+              {registered
+                ? 'Se désinscrire'
+                : waitlisted
+                  ? 'Quitter la liste d\'attente'
+                  : full ? 'Rejoindre la liste d\'attente' : 'S\'inscrire'}
             </Text>
           </TouchableOpacity>
         )}
@@ -340,6 +367,12 @@ const styles = StyleSheet.create({
     color: '#10b981',
     marginLeft: 8
   },
+  waitlistedBanner: {
+    backgroundColor: '#fffbeb'
+  },
+  waitlistedText: {
+    color: '#f59e0b'
+  },
   actionButton: {
     flexDirection: 'row',
     alignItems: 'center',
@@ -14,13 +14,13 @@ import { useRouter } from 'expo-router';
 import { useAuth } from '../../contexts/AuthContext';
 import { Ionicons } from '@expo/vector-icons';
 import * as ImagePicker from 'expo-image-picker';
-import api from '../../services/api';
+import api, { resolveMediaUrl } from '../../services/api';
 
 export default function ProfileScreen() {
   const { user, logout } = useAuth();
   const router = useRouter();
   const [uploading, setUploading] = useState(false);
-  const [profileImage, setProfileImage] = useState(user?.profileImage);
+  const [profileImage, setProfileImage] = useState(resolveMediaUrl(user?.profileImage));
 
   const pickImage = async () => {
     // Demander la permission
@@ -50,11 +50,11 @@ export default function ProfileScreen() {
       setUploading(true);
       const imageData = `data:image/jpeg;base64,${base64Image}`;
       
-      await api.put('/auth/profile-image', {
+      const response = await api.put('/auth/profile-image', {
         profile_image: imageData
       });
       
-      setProfileImage(imageData);
+      setProfileImage(resolveMediaUrl(response.data.profileImage));
       Alert.alert('Succès', 'Photo de profil mise à jour!');
     } catch (error: any) {
       Alert.alert('Erreur', 'Impossible de mettre à jour la photo');
@@ -10,6 +10,29 @@ const api = axios.create({
   }
 });
 
+// Writes the backend deduplicates by Idempotency-Key, so they are safe to retry
+const IDEMPOTENT_WRITES = [
+  /^\/bookings$/,
+  /^\/competitions\/[^/]+\/register$/,
+  /^\/tee-times\/[^/]+\/waitlist$/
+];
+const MAX_RETRIES = 3;
+
+const isIdempotentWrite = (config: any) =>
+  config.method === 'post' && IDEMPOTENT_WRITES.some((pattern) => pattern.test(config.url || ''));
+
+// Catalog lists the backend serves with an ETag: kept across launches and revalidated
+const CACHED_READS = [/^\/courses$/, /^\/competitions$/];
+const CACHE_PREFIX = 'httpCache:';
+
+const cacheKeyFor = (config: any) =>
+  config.method === 'get' && CACHED_READS.some((pattern) => pattern.test(config.url || ''))
+    ? `${CACHE_PREFIX}${config.url}?${JSON.stringify(config.params || {})}`
+    : null;
+
+const newIdempotencyKey = () =>
+  `${Date.now().toString(36)}-${Math.random().toString(36).slice(2)}${Math.random().toString(36).slice(2)}`;
+
 // Add token to requests
 api.interceptors.request.use(
   async (config) => {
@@ -17,6 +40,18 @@ api.interceptors.request.use(
     if (token) {
       config.headers.Authorization = `Bearer ${token}`;
     }
+    const cacheKey = cacheKeyFor(config);
+    if (cacheKey) {
+      const cached = await AsyncStorage.getItem(cacheKey);
+      if (cached) {
+        config.headers['If-None-Match'] = JSON.parse(cached).etag;
+        config.validateStatus = (status) => (status >= 200 && status < 300) || status === 304;
+      }
+    }
+    // One key per logical write, kept across retries of that write
+    if (isIdempotentWrite(config) && !config.headers['Idempotency-Key']) {
+      config.headers['Idempotency-Key'] = newIdempotencyKey();
+    }
     return config;
   },
   (error) => {
@@ -26,8 +61,28 @@ api.interceptors.request.use(
 
 // Handle errors
 api.interceptors.response.use(
-  (response) => response,
-  (error) => {
+  async (response) => {
+    const cacheKey = cacheKeyFor(response.config);
+    if (cacheKey && response.status === 304) {
+      const cached = await AsyncStorage.getItem(cacheKey);
+      if (cached) {
+        response.data = JSON.parse(cached).data;
+      }
+    } else if (cacheKey && response.headers.etag) {
+      await AsyncStorage.setItem(cacheKey, JSON.stringify({ etag: response.headers.etag, data: response.data }));
+    }
+    return response;
+  },
+  async (error) => {
+    const config = error.config;
+    // Lost connection or the first attempt still running: replaying the same key is safe
+    const retryable = !error.response || error.response.status === 409;
+    if (config && isIdempotentWrite(config) && retryable && (config.retryCount || 0) < MAX_RETRIES) {
+      config.retryCount = (config.retryCount || 0) + 1;
+      await new Promise((resolve) => setTimeout(resolve, 250 * 2 ** config.retryCount));
+      return api(config);
+    }
+
     if (error.response?.status === 401) {
       // Token expired or invalid
       AsyncStorage.removeItem('authToken');
@@ -37,4 +92,22 @@ api.interceptors.response.use(
   }
 );
 
+// List endpoints return one page at a time, with the next page's cursor in X-Next-Cursor
+const PAGE_SIZE = 100;
+
+export const getAllPages = async <T>(url: string, params: Record<string, any> = {}): Promise<T[]> => {
+  const items: T[] = [];
+  let after: string | undefined;
+  do {
+    const response = await api.get(url, { params: { ...params, limit: PAGE_SIZE, ...(after ? { after } : {}) } });
+    items.push(...response.data);
+    after = response.headers['x-next-cursor'];
+  } while (after);
+  return items;
+};
+
+// Media URLs returned by the API (e.g. profile images) are relative to the backend
+export const resolveMediaUrl = (path?: string | null) =>
+  path && path.startsWith('/') ? `${BACKEND_URL}${path}` : path || undefined;
+
 export default api;
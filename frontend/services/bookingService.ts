@@ -1,4 +1,4 @@
-import api from './api';
+import api, { getAllPages } from './api';
 
 export interface Course {
   id: string;
@@ -16,6 +16,7 @@ export interface TeeTime {
   maxSlots: number;
   bookedSlots: number;
   availableSlots: number;
+  waitlistCount: number;
   createdAt: string;
 }
 
@@ -34,6 +35,25 @@ export interface Booking {
   createdAt: string;
 }
 
+export interface WaitlistEntry {
+  id: string;
+  teeTimeId: string;
+  userId: string;
+  playersCount: number;
+  guestPlayers: GuestPlayer[];
+  createdAt: string;
+}
+
+export interface AvailabilityEvent {
+  type: 'availability';
+  teeTimeId: string;
+  courseId: string;
+  date: string;
+  time: string;
+  availableSlots: number;
+  bookedSlots: number;
+}
+
 export interface BookingWithDetails extends Booking {
   teeTime?: TeeTime;
   course?: Course;
@@ -42,8 +62,7 @@ export interface BookingWithDetails extends Booking {
 export const bookingService = {
   // Courses
   getCourses: async (): Promise<Course[]> => {
-    const response = await api.get('/courses');
-    return response.data;
+    return getAllPages<Course>('/courses');
   },
 
   // Tee Times
@@ -51,8 +70,30 @@ export const bookingService = {
     const params: any = {};
     if (date) params.date = date;
     if (courseId) params.courseId = courseId;
-    const response = await api.get('/tee-times', { params });
-    return response.data;
+    return getAllPages<TeeTime>('/tee-times', params);
+  },
+
+  // Live availability for one course/day: a snapshot, then one event per change.
+  // Returns a function that closes the stream.
+  subscribeToAvailability: (
+    courseId: string,
+    date: string,
+    onSnapshot: (teeTimes: TeeTime[]) => void,
+    onChange: (event: AvailabilityEvent) => void
+  ): (() => void) => {
+    const baseURL = (api.defaults.baseURL || '').replace(/^http/, 'ws');
+    const socket = new WebSocket(
+      `${baseURL}/tee-times/stream?courseId=${encodeURIComponent(courseId)}&date=${encodeURIComponent(date)}`
+    );
+    socket.onmessage = (message) => {
+      const data = JSON.parse(message.data);
+      if (data.type === 'snapshot') {
+        onSnapshot(data.teeTimes);
+      } else if (data.type === 'availability') {
+        onChange(data);
+      }
+    };
+    return () => socket.close();
   },
 
   // Bookings
@@ -66,11 +107,27 @@ export const bookingService = {
   },
 
   getMyBookings: async (): Promise<Booking[]> => {
-    const response = await api.get('/bookings');
-    return response.data;
+    return getAllPages<Booking>('/bookings');
   },
 
   cancelBooking: async (bookingId: string): Promise<void> => {
     await api.delete(`/bookings/${bookingId}`);
+  },
+
+  // Waitlist: queued parties are booked automatically when slots free up
+  joinWaitlist: async (teeTimeId: string, data: {
+    playersCount: number;
+    guestPlayers: GuestPlayer[];
+  }): Promise<WaitlistEntry> => {
+    const response = await api.post(`/tee-times/${teeTimeId}/waitlist`, data);
+    return response.data;
+  },
+
+  getMyWaitlist: async (): Promise<WaitlistEntry[]> => {
+    return getAllPages<WaitlistEntry>('/tee-times/waitlist/my');
+  },
+
+  leaveWaitlist: async (entryId: string): Promise<void> => {
+    await api.delete(`/tee-times/waitlist/${entryId}`);
   }
 };
@@ -1,4 +1,4 @@
-import api from './api';
+import api, { getAllPages } from './api';
 
 export interface Competition {
   id: string;
@@ -6,20 +6,32 @@ export interface Competition {
   description?: string;
   date: string;
   maxParticipants: number;
-  participants: string[];
+  participantsCount: number;
   entryFee: number;
   status: 'upcoming' | 'ongoing' | 'completed' | 'cancelled';
   createdAt: string;
 }
 
+export interface CompetitionRegistration {
+  id: string;
+  competitionId: string;
+  userId: string;
+  status: 'registered' | 'waitlisted';
+  createdAt: string;
+}
+
 export const competitionService = {
   getCompetitions: async (): Promise<Competition[]> => {
-    const response = await api.get('/competitions');
-    return response.data;
+    return getAllPages<Competition>('/competitions');
+  },
+
+  getMyRegistrations: async (): Promise<CompetitionRegistration[]> => {
+    return getAllPages<CompetitionRegistration>('/competitions/registrations/my');
   },
 
-  registerForCompetition: async (competitionId: string): Promise<void> => {
-    await api.post(`/competitions/${competitionId}/register`);
+  registerForCompetition: async (competitionId: string): Promise<CompetitionRegistration['status']> => {
+    const response = await api.post(`/competitions/${competitionId}/register`);
+    return response.data.status;
   },
 
   unregisterFromCompetition: async (competitionId: string): Promise<void> => {
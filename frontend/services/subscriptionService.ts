@@ -1,4 +1,4 @@
-import api from './api';
+import { getAllPages } from './api';
 
 export interface Subscription {
   id: string;
@@ -12,7 +12,6 @@ export interface Subscription {
 
 export const subscriptionService = {
   getMySubscriptions: async (): Promise<Subscription[]> => {
-    const response = await api.get('/subscriptions/my');
-    return response.data;
+    return getAllPages<Subscription>('/subscriptions/my');
   }
 };
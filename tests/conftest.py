@@ -0,0 +1,21 @@
+import os
+import sys
+
+import pytest
+
+# The backend modules import each other as top-level modules, as when run from backend/
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "backend"))
+
+
+@pytest.fixture(scope="session")
+def server():
+    """The app on an in-memory mongomock-motor database"""
+    pytest.importorskip("mongomock_motor")
+    from mongomock_motor import AsyncMongoMockClient
+    import motor.motor_asyncio
+
+    motor.motor_asyncio.AsyncIOMotorClient = AsyncMongoMockClient
+    os.environ.setdefault("MONGO_URL", "mongodb://in-memory")
+    os.environ.setdefault("DB_NAME", "teebook_test")
+    import server
+    return server
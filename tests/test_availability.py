@@ -0,0 +1,71 @@
+import asyncio
+
+import httpx
+
+from auth import create_user_access_token
+from availability import DayAvailability
+from tests.test_waitlist import _full_tee_time_with_queue
+
+
+def _day(available, booked):
+    return DayAvailability([{
+        "id": "tee-time-1", "courseId": "course-1", "date": "2030-06-01", "time": "08:00",
+        "maxSlots": 4, "availableSlots": available, "bookedSlots": booked,
+    }])
+
+
+def _slot(day):
+    tee_time = day.slots[0]
+    return tee_time["availableSlots"], tee_time["bookedSlots"]
+
+
+def test_booking_and_cancellation_move_booked_slots_the_other_way():
+    day = _day(4, 0)
+    day.apply("tee-time-1", -3)
+    assert _slot(day) == (1, 3)
+    day.apply("tee-time-1", 2)
+    assert _slot(day) == (3, 1)
+
+
+def test_hold_promotion_and_release_keep_booked_slots_apart():
+    day = _day(0, 4)
+    # Cancelled 4-ball held for the queue
+    day.apply("tee-time-1", 0, booked_delta=-4)
+    assert _slot(day) == (0, 0)
+    assert not day.bookable(1, None, None)
+    # A queued 2-ball promoted into held slots
+    day.apply("tee-time-1", 0, booked_delta=2)
+    assert _slot(day) == (0, 2)
+    # The two held slots nobody claimed go back on sale
+    day.apply("tee-time-1", 2, booked_delta=0)
+    assert _slot(day) == (2, 2)
+    assert day.bookable(2, None, None)
+
+
+def test_cached_day_matches_the_database_through_hold_and_promotion(server):
+    async def scenario():
+        player, _, tee_time, booking, _ = await _full_tee_time_with_queue(server)
+        await server.db.courses.insert_one({"id": tee_time["courseId"], "name": "Test"})
+        # Load the day into the search cache before anything changes
+        await server.availability_index.search(server.tee_times, [tee_time["courseId"]], [tee_time["date"]], 1)
+
+        async def snapshot():
+            cached = server.availability_index._days.get((tee_time["courseId"], tee_time["date"]))
+            stored = await server.db.tee_times.find_one({"id": tee_time["id"]})
+            return _slot(cached), (stored["availableSlots"], stored["bookedSlots"])
+
+        transport = httpx.ASGITransport(app=server.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            response = await client.delete(
+                f"/api/bookings/{booking['id']}",
+                headers={"Authorization": f"Bearer {create_user_access_token(player)}"},
+            )
+        assert response.status_code == 200
+        held = await snapshot()
+        await server.waitlist_worker.process(tee_time["id"])
+        return held, await snapshot()
+
+    held, promoted = asyncio.run(scenario())
+    # (cached, stored) as (availableSlots, bookedSlots)
+    assert held == ((0, 0), (0, 0))
+    assert promoted == ((2, 2), (2, 2))
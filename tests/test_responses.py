@@ -0,0 +1,40 @@
+import json
+from datetime import datetime
+
+import pytest
+from fastapi import Response
+
+import responses
+from models import TeeTime
+
+pytest.importorskip("orjson")
+
+# As stored: an internal field the model does not declare, a static default left unset
+TEE_TIME = {
+    "id": "tee-time-1",
+    "courseId": "course-1",
+    "date": "2030-06-01",
+    "time": "08:00",
+    "maxSlots": 4,
+    "bookedSlots": 2,
+    "availableSlots": 0,
+    "heldSlots": 2,
+    "createdAt": datetime(2030, 5, 1, 9, 30, 15, 123000),
+}
+
+
+def _standard_body():
+    return json.loads(responses.render_model_list(TeeTime, [dict(TEE_TIME)]))
+
+
+def test_fast_json_matches_the_model_path(monkeypatch):
+    standard = _standard_body()
+    monkeypatch.setattr(responses, "FAST_JSON", True)
+
+    fast = json.loads(responses.model_list(TeeTime, [dict(TEE_TIME)], Response()).body)
+    cached = json.loads(responses.render_model_list(TeeTime, [dict(TEE_TIME)]))
+
+    assert fast == standard
+    assert cached == standard
+    assert "heldSlots" not in fast[0]
+    assert fast[0]["waitlistCount"] == 0
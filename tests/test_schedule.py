@@ -0,0 +1,67 @@
+from datetime import date
+
+import pytest
+from pydantic import ValidationError
+
+from models import OpeningWindow, ScheduleTemplate, SeasonalRule
+from schedule import day_plan, planned_slots
+
+DAYS = [date(2030, 12, 24), date(2030, 12, 25)]
+
+
+@pytest.mark.parametrize("window", [
+    {"start": "7am", "end": "12:00"},
+    {"start": "07:00", "end": "24:00"},
+    {"start": "7:00", "end": "12:00"},
+    {"start": "12:00", "end": "07:00"},
+    {"start": "07:00", "end": "07:00"},
+])
+def test_invalid_opening_window_is_rejected(window):
+    with pytest.raises(ValidationError):
+        ScheduleTemplate(openingHours=[window])
+
+
+@pytest.mark.parametrize("blackout", ["25/12/2030", "2030-12-32", "2030-13-01", "12-25"])
+def test_invalid_blackout_date_is_rejected(blackout):
+    with pytest.raises(ValidationError):
+        ScheduleTemplate(blackoutDates=[blackout])
+
+
+@pytest.mark.parametrize("season", [
+    {"startDate": "11-01", "endDate": "02-28"},
+    {"startDate": "02-28", "endDate": "11-01", "wrapsNewYear": True},
+    {"startDate": "2030-11-01", "endDate": "12-31"},
+    {"startDate": "13-01", "endDate": "12-31"},
+])
+def test_invalid_season_is_rejected(season):
+    with pytest.raises(ValidationError):
+        SeasonalRule(**season)
+
+
+def test_closed_weekday_out_of_range_is_rejected():
+    with pytest.raises(ValidationError):
+        ScheduleTemplate(closedWeekdays=[7])
+
+
+def test_season_wrapping_over_the_new_year():
+    template = ScheduleTemplate(
+        seasons=[{"startDate": "11-01", "endDate": "02-28", "wrapsNewYear": True, "closed": True}]
+    )
+    assert day_plan(template, date(2030, 12, 24)) is None
+    assert day_plan(template, date(2031, 3, 1)) is not None
+
+
+def test_invalid_stored_template_skips_only_its_course():
+    courses = [
+        {"id": "broken", "schedule": {"openingHours": [{"start": "7am", "end": "12:00"}]}},
+        {"id": "valid", "schedule": {
+            "openingHours": [OpeningWindow(start="08:00", end="09:00").model_dump()],
+            "blackoutDates": ["2030-12-25"],
+        }},
+    ]
+    planned = planned_slots(courses, DAYS)
+    assert sorted(planned) == [
+        ("valid", "2030-12-24", "08:00"),
+        ("valid", "2030-12-24", "08:30"),
+        ("valid", "2030-12-24", "09:00"),
+    ]
@@ -0,0 +1,82 @@
+import asyncio
+import uuid
+from datetime import datetime
+
+import httpx
+
+from auth import create_user_access_token
+from events import availability_topic, user_topic
+
+
+def _user(name):
+    return {
+        "id": str(uuid.uuid4()),
+        "email": f"{name}-{uuid.uuid4().hex[:8]}@test.teebook",
+        "firstName": name,
+        "lastName": "Test",
+        "role": "user",
+        "hashedPassword": "",
+        "tokenVersion": 0,
+        "isActive": True,
+        "createdAt": datetime.utcnow(),
+    }
+
+
+async def _full_tee_time_with_queue(server):
+    """A full 4-slot tee time booked by one party, and a 2-ball queued for it"""
+    player, queued = _user("Player"), _user("Queued")
+    await server.db.users.insert_many([player, queued])
+    tee_time = {
+        "id": str(uuid.uuid4()), "courseId": str(uuid.uuid4()), "date": "2030-06-01", "time": "08:00",
+        "maxSlots": 4, "bookedSlots": 4, "availableSlots": 0, "waitlistCount": 1, "createdAt": datetime.utcnow(),
+    }
+    booking = {
+        "id": str(uuid.uuid4()), "userId": player["id"], "teeTimeId": tee_time["id"], "playersCount": 4,
+        "guestPlayers": [], "status": "confirmed", "createdAt": datetime.utcnow(),
+    }
+    entry = {
+        "id": str(uuid.uuid4()), "teeTimeId": tee_time["id"], "userId": queued["id"], "playersCount": 2,
+        "guestPlayers": [], "createdAt": datetime.utcnow(),
+    }
+    await server.db.tee_times.insert_one(tee_time)
+    await server.db.bookings.insert_one(booking)
+    await server.db.tee_time_waitlist.insert_one(entry)
+    return player, queued, tee_time, booking, entry
+
+
+def _drain(subscription):
+    events = []
+    while not subscription.queue.empty():
+        events.append(subscription.queue.get_nowait())
+    return events
+
+
+def test_promotion_is_published_to_the_player_and_the_availability_stream(server):
+    async def scenario():
+        player, queued, tee_time, booking, entry = await _full_tee_time_with_queue(server)
+        broker = server.availability_broker
+        with broker.subscribe(user_topic(queued["id"])) as promotions, \
+                broker.subscribe(availability_topic(tee_time["courseId"], tee_time["date"])) as availability:
+            transport = httpx.ASGITransport(app=server.app)
+            async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+                response = await client.delete(
+                    f"/api/bookings/{booking['id']}",
+                    headers={"Authorization": f"Bearer {create_user_access_token(player)}"},
+                )
+            assert response.status_code == 200
+
+            # Held for the queue: still off sale, no longer booked
+            cancelled = _drain(availability)
+            assert [(event["availableSlots"], event["bookedSlots"]) for event in cancelled] == [(0, 0)]
+
+            assert await server.waitlist_worker.process(tee_time["id"]) == 1
+            return _drain(promotions), _drain(availability)
+
+    promotions, availability = asyncio.run(scenario())
+
+    assert len(promotions) == 1
+    assert promotions[0]["type"] == "waitlistPromoted"
+    assert promotions[0]["entryId"]
+    assert promotions[0]["teeTimeId"] and promotions[0]["playersCount"] == 2
+    # The promoted party takes two held slots, the other two go back on sale
+    assert [(event["availableSlots"], event["bookedSlots"]) for event in availability] == [(0, 2), (2, 2)]